@@ -0,0 +1,32 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Earth to Mars porkchop plot for the 1979-1980 launch window
+'''
+
+# 3rd party libraries
+import spiceypy as spice
+import numpy    as np
+
+# AWP library
+import porkchop_tools as pct
+import plotting_tools as pt
+import spice_data     as sd
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0 = spice.str2et( '1979-10-01' )
+	et1 = spice.str2et( '1980-06-01' )
+
+	porkchop = pct.calc_porkchop( 3, 4,
+		np.linspace( et0, et0 + 200 * 86400.0, 500 ),
+		np.linspace( et1, et1 + 300 * 86400.0, 500 ) )
+
+	pt.plot_porkchop( porkchop, {
+		'title': 'Earth to Mars 1979-1980',
+		'show' : True
+		} )
@@ -0,0 +1,25 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Geostationary orbit eclipse seasons over a 15 year lifetime
+'''
+
+import orbit_calculations as oc
+import spice_data         as sd
+
+import numpy    as np
+import spiceypy as spice
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0   = spice.str2et( '2021-01-01' )
+	ets   = np.arange( et0, et0 + 15 * 365.25 * 86400.0, 86400.0 )
+	betas = oc.calc_beta_angles( ets, [ 42164, 0, 0, 0, 0, 0 ] )
+	ecls  = oc.find_eclipse_seasons( ets, betas, 42164, vv = True )
+
+	print( 'Max shadow per season (minutes):' )
+	print( [ float( f'{t / 60.0:.1f}' ) for t in ecls[ 'max_shadow' ] ] )
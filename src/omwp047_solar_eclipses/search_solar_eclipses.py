@@ -0,0 +1,36 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Earth solar eclipse search 2017-2030
+'''
+
+import orbit_calculations as oc
+import plotting_tools     as pt
+import planetary_data     as pd
+import spice_data         as sd
+
+import spiceypy as spice
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+	spice.furnsh( sd.pck00010 )
+
+	et0 = spice.str2et( '2017-01-01' )
+	etf = spice.str2et( '2030-01-01' )
+
+	ecls  = oc.find_solar_eclipses( et0, etf, pd.moon, pd.earth )
+	names = [ spice.et2utc( ets[ 0 ], 'C', 0 )[ :11 ]
+		for ets in ecls[ 'ets' ] ]
+
+	for name, duration in zip( names, ecls[ 'durations' ] ):
+		print( f'{name}: {duration / 3600.0:.2f} hours' )
+
+	colors = [ 'c', 'r', 'b', 'g', 'w', 'y', 'm' ]
+	pt.plot_groundtracks( ecls[ 'latlons' ], {
+		'colors': [ colors[ n % len( colors ) ] for n in range( len( names ) ) ],
+		'labels': names,
+		'show'  : True
+		} )
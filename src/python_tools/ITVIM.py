@@ -8,13 +8,14 @@ Class Definition
 '''
 
 # AWP library
-from Spacecraft import Spacecraft as SC
 import orbit_calculations as oc
 import planetary_data     as pd
 import lamberts_tools     as lt
 import numerical_tools    as nt
 import spice_tools        as st
 import plotting_tools     as pt
+import parallel_tools     as pa
+import spice_data         as sd
 import spiceypy           as spice
 import numpy              as np
 
@@ -26,6 +27,22 @@ def null_config():
 		'center'  : 0
 	}
 
+leg_dtype = np.dtype( [
+	( 'planet',          np.int64   ),
+	( 'planet_mu',       np.float64 ),
+	( 'tm',              np.int64   ),
+	( 'tol',             np.float64 ),
+	( 'et',              np.float64 ),
+	( 'time_cal',        'U32'      ),
+	( 'tof',             np.float64 ),
+	( 'tof_days',        np.float64 ),
+	( 'v_infinity',      np.float64 ),
+	( 'turn_angle',      np.float64 ),
+	( 'periapsis',       np.float64 ),
+	( 'state_sc_depart', np.float64, 6 ),
+	( 'state_sc_arrive', np.float64, 6 )
+] )
+
 class ITVIM:
 	'''
 	Interplanetary Trajectory V-Infinity Matcher
@@ -34,40 +51,66 @@ class ITVIM:
 		self.config = null_config()
 		for key in config.keys():
 			self.config[ key ] = config[ key ]
-		self.seq = self.config[ 'sequence' ]
 
-		if not self.seq:
+		if not self.config[ 'sequence' ]:
 			raise RuntimeError( 'ITVIM was passed in an empty sequence.' )
 
-		for step in self.seq:
+		self.n_steps = len( self.config[ 'sequence' ] )
+		self.calc_traj()
+
+	def init_seq( self ):
+		'''
+		Per-leg record array of the solve, the caller's
+		sequence dicts are only read. Any other keys of a step
+		( e.g. "analytic", "diff_step" ) are passed on to
+		vinfinity_match for the leg leaving that step
+		'''
+		self.seq       = np.zeros( self.n_steps, dtype = leg_dtype )
+		self.step_args = []
+		for n, step in enumerate( self.config[ 'sequence' ] ):
+			self.seq[ n ][ 'planet'    ] = step[ 'planet' ]
+			self.seq[ n ][ 'planet_mu' ] = step.get( 'planet_mu', 0.0  )
+			self.seq[ n ][ 'tm'        ] = step.get( 'tm',        1    )
+			self.seq[ n ][ 'tol'       ] = step.get( 'tol',       1e-4 )
+			self.step_args.append( { key: step[ key ] for key in step.keys()
+				if key not in ( 'planet', 'planet_mu', 'time' ) } )
+
 			if type( step[ 'time' ] ) == str:
-				step[ 'et'       ] = spice.str2et( step[ 'time' ] )
-				step[ 'time_cal' ] = step[ 'time' ]
+				self.seq[ n ][ 'et' ] = spice.str2et( step[ 'time' ] )
 			else:
-				step[ 'et'       ] = step[ 'time' ]
-				step[ 'time_cal' ] = spice.et2utc( step[ 'time' ], 'C', 5 )
+				self.seq[ n ][ 'et' ] = step[ 'time' ]
+			self.seq[ n ][ 'time_cal' ] = spice.et2utc(
+				self.seq[ n ][ 'et' ], 'C', 5 )
 
-		self.n_steps = len( self.seq )
-		self.calc_traj()
+	def calc_state( self, body, et, frame, center ):
+		'''
+		spkgeo state memoized for the current solve
+		'''
+		key = ( int( body ), float( et ), frame, center )
+		if key not in self.ephemeris:
+			self.ephemeris[ key ] = spice.spkgeo( body, et, frame, center )[ 0 ]
+		return self.ephemeris[ key ]
 
 	def calc_traj( self ):
+		self.init_seq()
+		self.ephemeris = {}
+		frame  = self.config[ 'frame'  ]
+		center = self.config[ 'center' ]
+
 		et0    = self.seq[ 0 ][ 'et' ]
 		et1    = self.seq[ 1 ][ 'et' ]
 		tof    = et1 - et0
-		state0 = spice.spkgeo( self.seq[ 0 ][ 'planet' ], et0,
-			self.config[ 'frame' ], self.config[ 'center' ] )[ 0 ]
-		state1 = spice.spkgeo( self.seq[ 1 ][ 'planet' ], et1,
-			self.config[ 'frame' ], self.config[ 'center' ] )[ 0 ]
+		state0 = self.calc_state( self.seq[ 0 ][ 'planet' ], et0, frame, center )
+		state1 = self.calc_state( self.seq[ 1 ][ 'planet' ], et1, frame, center )
 
 		v0_sc, v1_sc = lt.lamberts_universal_variables(
 			state0[ :3 ], state1[ :3 ], tof,
 			{ 'mu': self.config[ 'mu' ], 'tm': self.seq[ 0 ][ 'tm' ] } )
 
 		self.seq[ 0 ][ 'tof'             ] = tof
+		self.seq[ 0 ][ 'tof_days'        ] = tof * nt.sec2day
 		self.seq[ 0 ][ 'state_sc_depart' ] = np.concatenate(
 			( state0[ :3 ], v0_sc ) )
-		self.seq[ 0 ][ 'periapsis'       ] = 0.0
-		self.seq[ 0 ][ 'turn_angle'      ] = 0.0
 		self.seq[ 0 ][ 'v_infinity'      ] = nt.norm( v0_sc - state0[ 3: ] )
 
 		self.seq[ 1 ][ 'state_sc_arrive' ] = np.concatenate( 
@@ -81,15 +124,25 @@ class ITVIM:
 			et1       = seq1[ 'et' ]
 			tof_guess = et1 - et0
 
+			match_args = {
+				'frame'    : frame,
+				'center_ID': center,
+				'mu'       : self.config[ 'mu' ],
+				'tm'       : seq0[ 'tm'  ],
+				'tol'      : seq0[ 'tol' ],
+				'ephemeris': self.calc_state
+			}
+			for key in self.step_args[ n ].keys():
+				match_args[ key ] = self.step_args[ n ][ key ]
+
 			tof, v_sc_depart, v_sc_arrive = oc.vinfinity_match(
 				seq0[ 'planet' ], seq1[ 'planet' ],
 				seq0[ 'state_sc_arrive' ][ 3: ],
-				et0, tof_guess, seq0 )
+				et0, tof_guess, match_args )
 
-			state0 = spice.spkgeo( seq0[ 'planet' ], et0,
-				self.config[ 'frame' ], self.config[ 'center' ] )[ 0 ]
-			state1 = spice.spkgeo( seq1[ 'planet' ], et0 + tof,
-				self.config[ 'frame' ], self.config[ 'center' ] )[ 0 ]
+			state0 = self.calc_state( seq0[ 'planet' ], et0, frame, center )
+			state1 = self.calc_state( seq1[ 'planet' ], et0 + tof,
+				frame, center )
 
 			vinf_i = seq0[ 'state_sc_arrive' ][ 3: ] - state0[ 3: ]
 			vinf_o = v_sc_depart - state0[ 3: ]
@@ -111,10 +164,6 @@ class ITVIM:
 			seq1[ 'v_infinity'      ] = nt.norm(
 				v_sc_arrive - state1[ 3: ] )
 
-		self.seq[ -1 ][ 'tof'        ] = 0
-		self.seq[ -1 ][ 'turn_angle' ] = 0
-		self.seq[ -1 ][ 'periapsis'  ] = 0
-
 	def print_summary( self ):
 		print( '************************************' )
 		print( 'ITVIM Summary' )
@@ -149,25 +198,17 @@ class ITVIM:
 		_args[ 'colors' ] += [
 			planet[ 'traj_color' ] for planet in _args[ 'planets' ] ]
 
-		rs        = []
-		points    = []
-		sc_config = {
-			'dt'   : _args[ 'dt' ],
-			'cb'   : _args[ 'cb' ],
-			'frame': self.config[ 'frame' ]
-		}
+		rs     = []
+		points = []
 
 		for n in range( self.n_steps - 1 ):
-			sc_config[ 'et0'         ] = self.seq[ n ][ 'et' ]
-			sc_config[ 'tspan'       ] = self.seq[ n ][ 'tof' ]
-			sc_config[ 'orbit_state' ] = self.seq[ n ][ 'state_sc_depart' ]
-			sc                         = SC( sc_config )
-
-			rs.append( sc.states[ :, :3 ] )
+			n_points = int( self.seq[ n ][ 'tof' ] / _args[ 'dt' ] ) + 2
+			rs.append( oc.sample_conic( self.seq[ n ][ 'state_sc_depart' ],
+				self.seq[ n ][ 'tof' ], n_points, self.config[ 'mu' ] ) )
 			points.append( {
-				'x': sc.states[ -1, 0 ],
-				'y': sc.states[ -1, 1 ],
-				'z': sc.states[ -1, 2 ],
+				'x': rs[ -1 ][ -1, 0 ],
+				'y': rs[ -1 ][ -1, 1 ],
+				'z': rs[ -1 ][ -1, 2 ],
 				'label': f'SC {n} end'
 				} )
 		_args[ 'points' ] = points
@@ -183,3 +224,174 @@ class ITVIM:
 					self.config[ 'center' ] )[ :, :3 ] )
 
 		pt.plot_orbits( rs, _args )
+
+def null_search_args():
+	return {
+		'mu'             : pd.sun[ 'mu' ],
+		'frame'          : 'ECLIPJ2000',
+		'center'         : 0,
+		'tms'            : [ 1, -1 ],
+		'max_vinf_depart': 6.0,
+		'max_vinf'       : 15.0,
+		'min_altitude'   : 200.0,
+		'tol'            : 1e-5,
+		'n_best'         : 10,
+		'n_workers'      : None,
+		'chunksize'      : 1,
+		'kernels'        : [ sd.leapseconds_kernel, sd.de432 ],
+		'progress'       : None
+	}
+
+def search_task( task ):
+	'''
+	Depth-first search of one candidate sequence from one launch et,
+	first leg tof and tm ( process pool task ). The first leg is a
+	Lambert arc and every later leg is v-infinity matched from each
+	of its tof guesses and tms. Branches are pruned as soon as a
+	v-infinity, flyby periapsis or matched tof is infeasible.
+	Returns a list of trajectory records
+	'''
+	planets, et0, tof0, tm0, tofs, args = task
+	frame, center = args[ 'frame' ], args[ 'center' ]
+
+	state0 = spice.spkgeo( planets[ 0 ][ 'SPICE_ID' ], et0, frame, center )[ 0 ]
+	state1 = spice.spkgeo( planets[ 1 ][ 'SPICE_ID' ], et0 + tof0,
+		frame, center )[ 0 ]
+	try:
+		v0_sc, v1_sc = lt.lamberts_universal_variables(
+			state0[ :3 ], state1[ :3 ], tof0, { 'mu': args[ 'mu' ], 'tm': tm0 } )
+	except ( RuntimeWarning, ValueError ):
+		return []
+
+	vinf0 = nt.norm( v0_sc - state0[ 3: ] )
+	vinf1 = nt.norm( v1_sc - state1[ 3: ] )
+	if vinf0 > args[ 'max_vinf_depart' ] or vinf1 > args[ 'max_vinf' ]:
+		return []
+
+	record = {
+		'planets'     : [ p[ 'SPICE_ID' ] for p in planets ],
+		'ets'         : [ et0, et0 + tof0 ],
+		'tms'         : [ tm0 ],
+		'v_infinities': [ vinf0, vinf1 ],
+		'periapses'   : [ 0.0 ],
+		'turn_angles' : [ 0.0 ],
+		'states_sc_depart': [ np.concatenate( ( state0[ :3 ], v0_sc ) ) ]
+	}
+	return search_legs( planets, tofs, args, record, v1_sc )
+
+def search_legs( planets, tofs, args, record, v_sc_arrive ):
+	n = len( record[ 'ets' ] ) - 1
+	if n == len( planets ) - 1:
+		record[ 'periapses'   ].append( 0.0 )
+		record[ 'turn_angles' ].append( 0.0 )
+		record[ 'cost' ] = record[ 'v_infinities' ][ 0 ] +\
+			record[ 'v_infinities' ][ -1 ]
+		record[ 'sequence' ] = [ {
+			'planet'   : record[ 'planets' ][ k ],
+			'planet_mu': planets[ k ][ 'mu' ],
+			'time'     : record[ 'ets' ][ k ],
+			'tm'       : record[ 'tms' ][ k ] if k < n else 1,
+			'tol'      : args[ 'tol' ]
+			} for k in range( n + 1 ) ]
+		return [ record ]
+
+	planet0 = planets[ n ]
+	et0     = record[ 'ets' ][ n ]
+	state0  = spice.spkgeo( planet0[ 'SPICE_ID' ], et0,
+		args[ 'frame' ], args[ 'center' ] )[ 0 ]
+	vinf_i  = v_sc_arrive - state0[ 3: ]
+	records = []
+
+	for tm in args[ 'tms' ]:
+		for tof_guess in tofs[ n ]:
+			try:
+				tof, v_sc_depart, v_sc_arrive1 = oc.vinfinity_match(
+					planet0[ 'SPICE_ID' ], planets[ n + 1 ][ 'SPICE_ID' ],
+					v_sc_arrive, et0, tof_guess, {
+						'frame'    : args[ 'frame' ],
+						'center_ID': args[ 'center' ],
+						'mu'       : args[ 'mu' ],
+						'tm'       : tm,
+						'tol'      : args[ 'tol' ]
+						} )
+			except ( RuntimeError, RuntimeWarning, ValueError,
+				ZeroDivisionError, spice.utils.exceptions.SpiceyError ):
+				continue
+
+			if not min( tofs[ n ] ) <= tof <= max( tofs[ n ] ):
+				continue
+
+			vinf_o     = v_sc_depart - state0[ 3: ]
+			turn_angle = nt.vecs2angle( vinf_i, vinf_o ) / 2.0
+			if turn_angle <= 0.0:
+				continue
+			periapsis  = oc.calc_close_approach( turn_angle * nt.d2r,
+				nt.norm( vinf_i ), planet0[ 'mu' ] )
+			if periapsis < planet0[ 'radius' ] + args[ 'min_altitude' ]:
+				continue
+
+			state1 = spice.spkgeo( planets[ n + 1 ][ 'SPICE_ID' ], et0 + tof,
+				args[ 'frame' ], args[ 'center' ] )[ 0 ]
+			vinf1  = nt.norm( v_sc_arrive1 - state1[ 3: ] )
+			if vinf1 > args[ 'max_vinf' ]:
+				continue
+
+			'''
+			Different guesses can converge to the same tof
+			'''
+			if any( abs( r[ 'ets' ][ n + 1 ] - et0 - tof ) < 1.0 and
+				r[ 'tms' ][ n ] == tm for r in records ):
+				continue
+
+			_record = { key: list( value ) for key, value in record.items() }
+			_record[ 'ets'          ].append( et0 + tof )
+			_record[ 'tms'          ].append( tm )
+			_record[ 'v_infinities' ].append( vinf1 )
+			_record[ 'periapses'    ].append( periapsis )
+			_record[ 'turn_angles'  ].append( turn_angle )
+			_record[ 'states_sc_depart' ].append(
+				np.concatenate( ( state0[ :3 ], v_sc_depart ) ) )
+			records += search_legs( planets, tofs, args, _record, v_sc_arrive1 )
+
+	return records
+
+def search_sequences( candidates, ets_launch, args = {} ):
+	'''
+	Search candidate gravity assist sequences over a grid of launch
+	ets, first leg tofs and tms, v-infinity matching every later leg
+	from each of its tof guesses (search_task). Candidates are dicts
+	of "planets" ( list of planetary_data dicts ) and "tofs" ( list of
+	tof samples per leg, seconds ), matched tofs outside a leg's
+	samples range are pruned. Tasks run across a process pool ( see
+	parallel_tools.pool_map, or serially if n_workers is 1 ), and the
+	n_best trajectory records are returned ranked by "cost" ( departure
+	plus final arrival v-infinity ). Each record's "sequence" can be
+	passed to ITVIM
+	'''
+	_args = null_search_args()
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	task_args = { key: _args[ key ] for key in
+		( 'mu', 'frame', 'center', 'tms', 'max_vinf_depart',
+		  'max_vinf', 'min_altitude', 'tol' ) }
+	tasks = [ ( candidate[ 'planets' ], et0, tof0, tm0,
+		candidate[ 'tofs' ], task_args )
+		for candidate in candidates
+		for et0 in ets_launch
+		for tof0 in candidate[ 'tofs' ][ 0 ]
+		for tm0 in _args[ 'tms' ] ]
+
+	if _args[ 'n_workers' ] == 1:
+		results = [ search_task( task ) for task in tasks ]
+	else:
+		results = pa.pool_map( search_task, tasks, {
+			'n_workers': _args[ 'n_workers' ],
+			'chunksize': _args[ 'chunksize' ],
+			'kernels'  : _args[ 'kernels'   ],
+			'progress' : _args[ 'progress'  ]
+			} )
+
+	records = [ record for result in results for record in result ]
+	records.sort( key = lambda record: record[ 'cost' ] )
+	return records[ :_args[ 'n_best' ] ]
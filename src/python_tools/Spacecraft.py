@@ -12,6 +12,7 @@ import math as m
 
 # 3rd party libraries
 from scipy.integrate import solve_ivp
+from scipy.optimize  import brentq, OptimizeResult
 import spiceypy          as spice
 import numpy             as np
 import matplotlib.pyplot as plt
@@ -20,28 +21,48 @@ plt.style.use( 'dark_background' )
 # AWP libraries
 import orbit_calculations as oc
 import numerical_tools    as nt
+import ode_tools          as ot
+import gravity_tools      as gt
+import atmosphere_tools   as at
 import plotting_tools     as pt
 import planetary_data     as pd
 import spice_data         as sd
+import spice_tools        as st
+import parallel_tools     as pa
+
+'''
+Orbit perturbations that only depend on time and position,
+which can be propagated with symplectic integrators
+'''
+CONSERVATIVE_PERTS = ( 'J2', 'n_bodies', 'gravity_field' )
 
 def null_config():
 	return {
-		'cb'             : pd.earth,
-		'date0'          : '2021-04-01',
-		'et0'            : None,
-		'frame'          : 'J2000',
-		'orbit_state'    : [],
-		'coes'           : [],
-		'orbit_perts'    : {},
-		'propagator'     : 'LSODA',
-		'atol'           : 1e-6,
-		'rtol'           : 1e-6,
-		'stop_conditions': {},
-		'print_stop'     : True,
-		'dense_output'   : False,
-		'mass0'          : 0,
-		'output_dir'     : '.',
-		'propagate'      : True
+		'cb'              : pd.earth,
+		'date0'           : '2021-04-01',
+		'et0'             : None,
+		'frame'           : 'J2000',
+		'orbit_state'     : [],
+		'coes'            : [],
+		'orbit_perts'     : {},
+		'propagator'      : 'LSODA',
+		'dt'              : None,
+		'atol'            : 1e-6,
+		'rtol'            : 1e-6,
+		'stop_conditions' : {},
+		'print_stop'      : True,
+		'dense_output'    : False,
+		'mass0'           : 0,
+		'output_dir'      : '.',
+		'fused_rhs'       : False,
+		'ephemeris_tables': False,
+		'ephemeris_tol'   : 1e-3,
+		'encke'           : False,
+		'encke_tol'       : 1e-1,
+		'eclipse_events'  : False,
+		'load_kernels'    : True,
+		'verbose'         : True,
+		'propagate'       : True
 	}
 
 class Spacecraft:
@@ -66,15 +87,19 @@ class Spacecraft:
 		self.state0[ :6 ] = self.config[ 'orbit_state' ]
 		self.state0[  6 ] = self.config[ 'mass0' ]
 
-		self.coes_calculated      = False
-		self.latlons_calculated   = False
-		self.altitudes_calculated = False
-		self.ra_rp_calculated     = False
-		self.eclipses_calculated  = False
+		self.coes_calculated         = False
+		self.latlons_calculated      = False
+		self.altitudes_calculated    = False
+		self.ra_rp_calculated        = False
+		self.eclipses_calculated     = False
+		self.illumination_calculated = False
 
 		self.assign_stop_condition_functions()
+		self.assign_eclipse_event_functions()
 		self.assign_orbit_perturbations_functions()
 		self.load_spice_kernels()
+		self.build_ephemeris_tables()
+		self.assign_diffy_q()
 
 		if self.config[ 'propagate' ]:
 			self.propagate_orbit()
@@ -115,27 +140,248 @@ class Spacecraft:
 			method.__func__.terminal = True
 			self.stop_condition_functions.append( method )
 
+	def assign_eclipse_event_functions( self ):
+		'''
+		With config "eclipse_events", umbra and penumbra shadow functions
+		are added after the stop conditions as non-terminal events, so
+		that shadow entrances and exits are root-located by the integrator
+		'''
+		self.eclipse_event_functions = []
+		if self.config[ 'eclipse_events' ]:
+			if self.cb[ 'SPICE_ID' ] == pd.sun[ 'SPICE_ID' ]:
+				raise RuntimeError(
+					'Eclipse events require a central body other than the Sun.' )
+
+			self.check_umbra.__func__.terminal     = False
+			self.check_penumbra.__func__.terminal  = False
+			self.check_umbra.__func__.direction    = 0
+			self.check_penumbra.__func__.direction = 0
+			self.eclipse_event_functions = [
+				self.check_umbra, self.check_penumbra ]
+			self.shadow_cache = ( None, None )
+
+		self.event_functions = self.stop_condition_functions +\
+			self.eclipse_event_functions
+
 	def assign_orbit_perturbations_functions( self ):
 	
 		self.orbit_perts_funcs_map = {
-			'J2'      : self.calc_J2,
-			'n_bodies': self.calc_n_bodies
+			'J2'           : self.calc_J2,
+			'n_bodies'     : self.calc_n_bodies,
+			'gravity_field': self.calc_gravity_field,
+			'drag'         : self.calc_drag
 		}
 		self.orbit_perts_funcs = []
 
+		if 'gravity_field' in self.orbit_perts:
+			self.assign_gravity_field()
+
+		if 'drag' in self.orbit_perts:
+			self.assign_drag()
+
 		for key in self.config[ 'orbit_perts' ]:
 			self.orbit_perts_funcs.append( 
 				self.orbit_perts_funcs_map[ key ] )
 
+	def assign_gravity_field( self ):
+		'''
+		The gravity field's degree 2 terms already include J2,
+		so the two perturbations can't be combined
+		'''
+		if 'J2' in self.orbit_perts:
+			raise RuntimeError( 'Orbit perturbations "J2" and '
+				'"gravity_field" can\'t be used together.' )
+
+		if self.cb[ 'name' ] not in gt.gravity_models:
+			raise RuntimeError(
+				f'No gravity field model for {self.cb[ "name" ]}.' )
+
+		degree, order      = self.orbit_perts[ 'gravity_field' ]
+		self.gravity_field = gt.GravityField( degree, order,
+			gt.gravity_models[ self.cb[ 'name' ] ] )
+
+	def assign_drag( self ):
+		'''
+		Drag parameters are the drag coefficient "Cd" and the
+		cross sectional area "area" (m^2). Spacecraft mass (kg) is
+		taken from the state, so config "mass0" has to be set
+		'''
+		if self.cb[ 'name' ] not in at.atmosphere_models:
+			raise RuntimeError(
+				f'No atmosphere model for {self.cb[ "name" ]}.' )
+
+		if self.config[ 'mass0' ] <= 0:
+			raise RuntimeError( 'Drag requires a positive "mass0".' )
+
+		self.drag = { 'Cd': 2.2, 'area': 1.0 }
+		for key in self.orbit_perts[ 'drag' ].keys():
+			self.drag[ key ] = self.orbit_perts[ 'drag' ][ key ]
+
+		model           = at.atmosphere_models[ self.cb[ 'name' ] ]
+		self.atmosphere = at.ExponentialAtmosphere( model )
+		self.drag[ 'rotation_rate' ] = model[ 'rotation_rate' ]
+
+	def assign_diffy_q( self ):
+		'''
+		Choose the right-hand side function passed into solve_ivp.
+		The fused RHS is built once here so that the orbit_perts
+		dictionary is not looked up on every solver call
+		'''
+		if self.config[ 'fused_rhs' ]:
+			self.ode_func = self.build_fused_diffy_q()
+		else:
+			self.ode_func = self.diffy_q
+
+	def build_fused_diffy_q( self ):
+		'''
+		Build a single derivative function specialized for the
+		chosen orbit_perts set. Two-body, J2 and n-body accelerations
+		are calculated with scalar math on local variables instead of
+		building intermediate arrays. The only array allocated per
+		call is the returned state derivative, since solve_ivp keeps
+		references to previously returned derivatives
+		'''
+		mu         = self.cb[ 'mu' ]
+		sqrt       = m.sqrt
+		array      = np.array
+		use_J2     = 'J2' in self.orbit_perts
+		J2_factor  = 1.5 * self.cb.get( 'J2', 0.0 ) * mu *\
+			self.cb[ 'radius' ] ** 2
+		n_bodies   = [ ( self.body_position_func( body[ 'SPICE_ID' ] ),
+			body[ 'mu' ] ) for body in self.orbit_perts.get( 'n_bodies', [] ) ]
+		pert_funcs = [ self.orbit_perts_funcs_map[ key ]
+			for key in self.orbit_perts
+			if key not in ( 'J2', 'n_bodies' ) ]
+
+		def diffy_q_fused( et, state ):
+			rx, ry, rz, vx, vy, vz, mass = state.tolist()
+			r2 = rx * rx + ry * ry + rz * rz
+			r  = sqrt( r2 )
+			k  = -mu / ( r2 * r )
+			ax = k * rx
+			ay = k * ry
+			az = k * rz
+
+			if use_J2:
+				c  = J2_factor / ( r2 * r2 * r )
+				tz = 5.0 * rz * rz / r2
+				ax += c * rx * ( tz - 1.0 )
+				ay += c * ry * ( tz - 1.0 )
+				az += c * rz * ( tz - 3.0 )
+
+			for position, mu_body in n_bodies:
+				bx, by, bz = position( et )
+				sx  = bx - rx
+				sy  = by - ry
+				sz  = bz - rz
+				s2  = sx * sx + sy * sy + sz * sz
+				b2  = bx * bx + by * by + bz * bz
+				ks  = mu_body / ( s2 * sqrt( s2 ) )
+				kb  = mu_body / ( b2 * sqrt( b2 ) )
+				ax += ks * sx - kb * bx
+				ay += ks * sy - kb * by
+				az += ks * sz - kb * bz
+
+			for pert in pert_funcs:
+				a   = pert( et, state )
+				ax += a[ 0 ]
+				ay += a[ 1 ]
+				az += a[ 2 ]
+
+			return array( ( vx, vy, vz, ax, ay, az, 0.0 ) )
+
+		return diffy_q_fused
+
 	def load_spice_kernels( self ):
-		spice.furnsh( sd.leapseconds_kernel )
-		self.spice_kernels_loaded = [ sd.leapseconds_kernel ]
+		'''
+		Kernels can be furnished once up front (for example by
+		process pool workers) by setting load_kernels to False
+		'''
+		if self.config[ 'load_kernels' ]:
+			spice.furnsh( sd.leapseconds_kernel )
+			self.spice_kernels_loaded = [ sd.leapseconds_kernel ]
+
+			if 'gravity_field' in self.orbit_perts:
+				spice.furnsh( sd.pck00010 )
+				self.spice_kernels_loaded.append( sd.pck00010 )
+		else:
+			self.spice_kernels_loaded = []
 
 		if self.config[ 'et0' ] is not None:
 			self.et0 = self.config[ 'et0' ]
 		else:
 			self.et0 = spice.str2et( self.config[ 'date0' ] )
 
+	def build_ephemeris_tables( self ):
+		'''
+		Sample every perturbing body and enter_SOI target over the
+		propagation time span and fit Chebyshev ephemeris tables to them,
+		so that no SPICE calls are made during propagation.
+		Tables can also be passed in the config as a dictionary
+		keyed by SPICE ID, so they can be shared between Spacecraft,
+		as long as they cover the (padded) time span in the same frame
+		w.r.t the central body. Fitting takes about as long as the SPICE
+		calls of a single propagation saves, so tables pay off when shared
+		'''
+		self.ephemeris_tables = {}
+		self.ephemeris_funcs  = {}
+		if not self.config[ 'ephemeris_tables' ]:
+			return
+
+		if isinstance( self.config[ 'ephemeris_tables' ], dict ):
+			self.ephemeris_tables.update( self.config[ 'ephemeris_tables' ] )
+
+		bodies = list( self.orbit_perts.get( 'n_bodies', [] ) )
+		if 'enter_SOI' in self.config[ 'stop_conditions' ]:
+			bodies.append( self.config[ 'stop_conditions' ][ 'enter_SOI' ] )
+
+		'''
+		Symplectic integrators evaluate forces at substeps
+		outside of the propagation time span
+		'''
+		pad = 0.0
+		if self.config[ 'propagator' ] in ot.symplectic_methods:
+			pad = self.calc_fixed_step_size() * ot.substep_excursion(
+				ot.symplectic_methods[ self.config[ 'propagator' ] ] )
+
+		ets = [ self.et0, self.et0 + self.config[ 'tspan' ] ]
+		ets = [ min( ets ) - pad, max( ets ) + pad ]
+		for body in bodies:
+			if body[ 'SPICE_ID' ] in self.ephemeris_tables:
+				st.check_ephemeris_table(
+					self.ephemeris_tables[ body[ 'SPICE_ID' ] ],
+					min( ets ), max( ets ), self.config[ 'frame' ],
+					self.cb[ 'SPICE_ID' ] )
+				continue
+			self.ephemeris_tables[ body[ 'SPICE_ID' ] ] =\
+				st.fit_ephemeris_table( body[ 'SPICE_ID' ],
+					min( ets ), max( ets ), self.config[ 'frame' ],
+					self.cb[ 'SPICE_ID' ],
+					{ 'tol': self.config[ 'ephemeris_tol' ] } )
+
+		for body_id, table in self.ephemeris_tables.items():
+			self.ephemeris_funcs[ body_id ] = st.ephemeris_table_func( table )
+
+	def body_position_func( self, body_id ):
+		'''
+		Return a function of ephemeris time that calculates the position
+		of a body w.r.t the central body, from an ephemeris table
+		if one was fit, otherwise from SPICE
+		'''
+		if body_id in self.ephemeris_funcs:
+			return self.ephemeris_funcs[ body_id ]
+
+		frame = self.config[ 'frame' ]
+		cb_id = self.cb[ 'SPICE_ID' ]
+		return lambda et: spice.spkgps( body_id, et, frame, cb_id )[ 0 ]
+
+	def calc_body_position( self, body_id, et ):
+		if body_id in self.ephemeris_funcs:
+			return self.ephemeris_funcs[ body_id ]( et )
+
+		return spice.spkgps( body_id, et,
+			self.config[ 'frame' ], self.cb[ 'SPICE_ID' ] )[ 0 ]
+
 	def check_min_alt( self, et, state ):
 		return nt.norm( state[ :3 ] ) -\
 			      self.cb[ 'radius' ] -\
@@ -148,20 +394,38 @@ class Spacecraft:
 
 	def check_enter_SOI( self, et, state ):
 		body      = self.config[ 'stop_conditions' ][ 'enter_SOI' ]
-		r_cb2body = spice.spkgps( body[ 'SPICE_ID' ], et,
-						self.config[ 'frame' ], self.cb[ 'SPICE_ID' ] )[ 0 ]
+		r_cb2body = self.calc_body_position( body[ 'SPICE_ID' ], et )
 		r_sc2body = r_cb2body - state[ :3 ]
 
 		return nt.norm( r_sc2body ) - body[ 'SOI' ]
 
+	def calc_shadow_functions( self, et, state ):
+		'''
+		Both shadow functions are evaluated at the same time by the
+		integrator, so the last evaluation is cached
+		'''
+		if self.shadow_cache[ 0 ] != et or\
+			not np.array_equal( self.shadow_cache[ 1 ], state[ :3 ] ):
+			r_sun2body = spice.spkpos( str( self.cb[ 'SPICE_ID' ] ), et,
+				self.config[ 'frame' ], 'LT', 'SUN' )[ 0 ]
+			self.shadow_values = oc.calc_shadow_functions(
+				state[ :3 ], r_sun2body, self.cb[ 'diameter' ] )
+			self.shadow_cache  = ( et, np.array( state[ :3 ] ) )
+		return self.shadow_values
+
+	def check_umbra( self, et, state ):
+		return self.calc_shadow_functions( et, state )[ 0 ]
+
+	def check_penumbra( self, et, state ):
+		return self.calc_shadow_functions( et, state )[ 1 ]
+
 	def print_stop_condition( self, parameter ):
 		print( f'Spacecraft has reached {parameter}.' )
 
 	def calc_n_bodies( self, et, state ):
 		a = np.zeros( 3 )
 		for body in self.config[ 'orbit_perts' ][ 'n_bodies' ]:
-			r_cb2body  = spice.spkgps( body[ 'SPICE_ID' ], et,
-				self.config[ 'frame' ], self.cb[ 'SPICE_ID' ] )[ 0 ]
+			r_cb2body  = self.calc_body_position( body[ 'SPICE_ID' ], et )
 			r_sc2body = r_cb2body - state[ :3 ]
 
 			a += body[ 'mu' ] * (\
@@ -180,12 +444,37 @@ class Spacecraft:
 			   self.cb[ 'radius' ] ** 2 \
 			 / r2 ** 2 * np.array( [ tx, ty, tz ] )
 
+	def calc_gravity_field( self, et, state ):
+		'''
+		Gravity field acceleration, evaluated in the central body's
+		body-fixed frame and rotated back to the propagation frame
+		'''
+		matrix = spice.pxform( self.config[ 'frame' ],
+			self.cb[ 'body_fixed_frame' ], et )
+		a      = self.gravity_field.calc_accel( matrix @ state[ :3 ] )
+		return matrix.T @ a
+
+	def calc_drag( self, et, state ):
+		'''
+		Drag acceleration relative to an atmosphere co-rotating with
+		the central body about the z-axis of the propagation frame.
+		The factor of 1000 converts Cd * A / m * rho (1 / m) to 1 / km
+		'''
+		rx, ry, rz, vx, vy, vz, mass = state.tolist()
+		alt = m.sqrt( rx * rx + ry * ry + rz * rz ) - self.cb[ 'radius' ]
+		rho = self.atmosphere.calc_density( alt )
+		w   = self.drag[ 'rotation_rate' ]
+		vrx = vx + w * ry
+		vry = vy - w * rx
+		vr  = m.sqrt( vrx * vrx + vry * vry + vz * vz )
+		k   = -500.0 * self.drag[ 'Cd' ] * self.drag[ 'area' ] / mass * rho * vr
+		return np.array( [ k * vrx, k * vry, k * vz ] )
+
 	def diffy_q( self, et, state ):
 		rx, ry, rz, vx, vy, vz, mass = state
 		r         = np.array( [ rx, ry, rz ] )
 		mass_dot  = 0.0
 		state_dot = np.zeros( 7 )
-		et       += self.et0
 
 		a = -r * self.cb[ 'mu' ] / nt.norm( r ) ** 3
 
@@ -198,21 +487,345 @@ class Spacecraft:
 		return state_dot
 
 	def propagate_orbit( self ):
-		print( 'Propagating orbit..' )
+		if self.config[ 'verbose' ]:
+			print( 'Propagating orbit..' )
+
+		if self.config[ 'encke' ] and (
+			self.config[ 'propagator' ] in ( 'kepler', 'gauss_jackson' ) or
+			self.config[ 'propagator' ] in ot.symplectic_methods ):
+			raise ValueError( 'Encke propagation is not supported with the '
+				f'"{self.config[ "propagator" ]}" propagator.' )
+
+		if self.config[ 'propagator' ] == 'kepler':
+			self.ode_sol = self.propagate_orbit_kepler()
+		elif self.config[ 'propagator' ] in ot.symplectic_methods:
+			self.ode_sol = self.propagate_orbit_symplectic()
+		elif self.config[ 'propagator' ] == 'gauss_jackson':
+			self.ode_sol = self.propagate_orbit_gauss_jackson()
+		elif self.config[ 'encke' ]:
+			self.ode_sol = self.propagate_orbit_encke()
+		else:
+			self.ode_sol = self.solve_ode( self.ode_func, self.et0,
+				self.et0 + self.config[ 'tspan' ], self.state0,
+				self.event_functions )
 
-		self.ode_sol = solve_ivp(
-			fun          = self.diffy_q,
-			t_span       = ( self.et0, self.et0 + self.config[ 'tspan' ] ),
-			y0           = self.state0,
+		self.states  = self.ode_sol.y.T
+		self.ets     = self.ode_sol.t
+		self.n_steps = self.states.shape[ 0 ]
+
+	def solve_ode( self, func, et0, etf, y0, events, atol = None ):
+		'''
+		Integrate with one of the native adaptive methods
+		in ode_tools, or with solve_ivp
+		'''
+		if atol is None:
+			atol = self.config[ 'atol' ]
+
+		if self.config[ 'propagator' ] in ot.adaptive_methods:
+			return ot.solve_rk( func, ( et0, etf ), y0, {
+				'method'      : self.config[ 'propagator' ],
+				'events'      : events,
+				'rtol'        : self.config[ 'rtol' ],
+				'atol'        : atol,
+				'dense_output': self.config[ 'dense_output' ] } )
+
+		return solve_ivp(
+			fun          = func,
+			t_span       = ( et0, etf ),
+			y0           = y0,
 			method       = self.config[ 'propagator' ],
-			events       = self.stop_condition_functions,
+			events       = events,
 			rtol         = self.config[ 'rtol' ],
-			atol         = self.config[ 'atol' ],
+			atol         = atol,
 			dense_output = self.config[ 'dense_output' ] )
 
-		self.states  = self.ode_sol.y.T
-		self.ets     = self.ode_sol.t
-		self.n_steps = self.states.shape[ 0 ]
+	def set_encke_reference( self, et, state ):
+		self.encke_et_ref    = et
+		self.encke_state_ref = np.array( state[ :6 ] )
+		self.encke_chi       = None
+
+	def calc_encke_reference( self, et ):
+		'''
+		Reference conic state at an ephemeris time, warm starting
+		Kepler's equation from the previous call
+		'''
+		state, self.encke_chi = oc.kepler_step( self.encke_state_ref,
+			et - self.encke_et_ref, self.cb[ 'mu' ], self.encke_chi )
+		return state
+
+	def calc_encke_state( self, et, y ):
+		'''
+		Full state from the deviation from the reference conic
+		'''
+		state        = np.array( y, dtype = float )
+		state[ :6 ] += self.calc_encke_reference( et )
+		return state
+
+	def encke_diffy_q( self, et, y ):
+		'''
+		Encke's method: integrate the deviation y = ( dr, dv, mass ) from
+		the reference conic, using Battin's f(q) to avoid differencing
+		the two-body accelerations of the true and reference orbits
+		'''
+		ref     = self.calc_encke_reference( et )
+		rho     = ref[ :3 ]
+		dr      = y[ :3 ]
+		r       = rho + dr
+		q       = np.dot( dr, dr - 2 * r ) / np.dot( r, r )
+		fq      = q * ( 3 + 3 * q + q * q ) / ( 1 + ( 1 + q ) ** 1.5 )
+		state   = np.zeros( 7 )
+		state[ :3  ] = r
+		state[ 3:6 ] = ref[ 3:6 ] + y[ 3:6 ]
+		state[ 6   ] = y[ 6 ]
+
+		a = -self.cb[ 'mu' ] / nt.norm( rho ) ** 3 * ( dr + fq * r )
+		for pert in self.orbit_perts_funcs:
+			a += pert( et, state )
+
+		y_dot = np.zeros( 7 )
+		y_dot[ :3  ] = y[ 3:6 ]
+		y_dot[ 3:6 ] = a
+		return y_dot
+
+	def check_rectify( self, et, y ):
+		return nt.norm( y[ :3 ] ) - self.config[ 'encke_tol' ] *\
+			nt.norm( self.calc_encke_reference( et )[ :3 ] )
+
+	def encke_event( self, func ):
+		'''
+		Stop condition function evaluated on the deviation state
+		'''
+		def event( et, y ):
+			return func( et, self.calc_encke_state( et, y ) )
+		event.terminal  = getattr( func, 'terminal',  False )
+		event.direction = getattr( func, 'direction', 0 )
+		return event
+
+	def propagate_orbit_encke( self ):
+		'''
+		Propagate with Encke's method, rectifying ( resetting the
+		reference conic to the osculating orbit ) whenever the position
+		deviation grows past config "encke_tol" times the reference
+		radius. Each rectification restarts the integrator.
+
+		Since the deviation is much smaller than the state, relative
+		tolerance is applied to the magnitude of the full position and
+		velocity through the absolute tolerance of the deviation, so
+		that accuracy is comparable to the same tolerances in Cowell's
+		formulation while the integrator can take larger steps
+		'''
+		self.check_rectify.__func__.terminal  = True
+		self.check_rectify.__func__.direction = 1
+		events = [ self.check_rectify ] + [ self.encke_event( func )
+			for func in self.event_functions ]
+
+		etf      = self.et0 + self.config[ 'tspan' ]
+		et       = self.et0
+		state    = self.state0.copy()
+		ets      = [ np.array( [ et ] ) ]
+		states   = [ state[ None, : ] ]
+		t_events = [ [] for func in self.event_functions ]
+		y_events = [ [] for func in self.event_functions ]
+		nfev     = 0
+		self.n_rectifications = 0
+
+		while True:
+			self.set_encke_reference( et, state )
+			y0      = np.zeros( 7 )
+			y0[ 6 ] = state[ 6 ]
+			atol    = np.full( 7, self.config[ 'atol' ] )
+			atol[ :3  ] += self.config[ 'rtol' ] * nt.norm( state[ :3  ] )
+			atol[ 3:6 ] += self.config[ 'rtol' ] * nt.norm( state[ 3:6 ] )
+			sol     = self.solve_ode(
+				self.encke_diffy_q, et, etf, y0, events, atol )
+			nfev   += sol.nfev
+
+			seg_states = sol.y.T.copy()
+			seg_states[ :, :6 ] += oc.propagate_kepler( self.encke_state_ref,
+				sol.t - self.encke_et_ref, self.cb[ 'mu' ] )
+			ets.append( sol.t[ 1: ] )
+			states.append( seg_states[ 1: ] )
+
+			for n in range( len( self.event_functions ) ):
+				for et_event, y_event in zip(
+					sol.t_events[ n + 1 ], sol.y_events[ n + 1 ] ):
+					t_events[ n ].append( et_event )
+					y_events[ n ].append(
+						self.calc_encke_state( et_event, y_event ) )
+
+			stopped = any( len( sol.t_events[ n + 1 ] ) > 0 and
+				getattr( func, 'terminal', False ) for n, func in
+				enumerate( self.event_functions ) )
+
+			if sol.status != 1 or stopped:
+				break
+
+			et, state = sol.t[ -1 ], seg_states[ -1 ]
+			self.n_rectifications += 1
+
+		return OptimizeResult(
+			t        = np.concatenate( ets ),
+			y        = np.concatenate( states ).T,
+			t_events = [ np.array( ts ) for ts in t_events ],
+			y_events = [ np.array( ys ).reshape( ( -1, 7 ) ) for ys in y_events ],
+			nfev     = nfev,
+			njev     = 0,
+			nlu      = 0,
+			sol      = None,
+			status   = sol.status,
+			message  = sol.message,
+			success  = sol.success )
+
+	def calc_output_times( self ):
+		'''
+		Output times (seconds from et0) for propagators that don't
+		choose their own steps. Uses config dt, or 1000 steps
+		over tspan if dt isn't set
+		'''
+		tspan = self.config[ 'tspan' ]
+		dt    = self.config[ 'dt' ]
+		if dt is None:
+			dt = abs( tspan ) / 1000.0
+
+		ts = np.arange( 0, abs( tspan ), abs( dt ) )
+		return np.append( ts, abs( tspan ) ) * np.sign( tspan )
+
+	def calc_kepler_states( self, ets ):
+		'''
+		Two-body states (with mass) at ephemeris times,
+		shape ( 7, len( ets ) ) or ( 7, ) for a single time
+		'''
+		states = np.zeros( ( 7, np.size( ets ) ) )
+		states[ :6 ] = oc.propagate_kepler( self.state0[ :6 ],
+			np.atleast_1d( ets ) - self.et0, self.cb[ 'mu' ] ).T
+		states[ 6 ]  = self.state0[ 6 ]
+
+		if np.ndim( ets ) == 0:
+			return states[ :, 0 ]
+		return states
+
+	def propagate_orbit_kepler( self ):
+		'''
+		Evaluate the closed form two-body solution at the output times.
+		Stop conditions are checked at the output times as well as at
+		every periapsis and apoapsis passage (the radius is monotonic
+		in between those), then the first crossing is root-solved
+		on the analytic trajectory
+		'''
+		if self.orbit_perts:
+			raise RuntimeError(
+				'Kepler propagator does not support orbit perturbations.' )
+
+		if self.eclipse_event_functions:
+			raise RuntimeError(
+				'Kepler propagator does not support eclipse events.' )
+
+		ts           = self.calc_output_times()
+		peris, apos  = oc.calc_apse_times(
+			self.state0[ :6 ], self.config[ 'tspan' ], self.cb[ 'mu' ] )
+		check_ts     = np.unique( np.concatenate( ( ts, peris, apos ) ) )
+		if self.config[ 'tspan' ] < 0:
+			check_ts = check_ts[ ::-1 ]
+		check_states = self.calc_kepler_states( self.et0 + check_ts ).T
+
+		n_funcs  = len( self.stop_condition_functions )
+		t_events = [ np.array( [] ) for n in range( n_funcs ) ]
+		y_events = [ np.zeros( ( 0, 7 ) ) for n in range( n_funcs ) ]
+		t_stop   = None
+
+		for n, func in enumerate( self.stop_condition_functions ):
+			direction = getattr( func, 'direction', 0 )
+			vals      = np.array( [ func( self.et0 + t, state )
+				for t, state in zip( check_ts, check_states ) ] )
+			crossings = ( ( direction <= 0 ) & ( vals[ :-1 ] > 0 ) &
+							( vals[ 1: ] <= 0 ) ) |\
+						( ( direction >= 0 ) & ( vals[ :-1 ] < 0 ) &
+							( vals[ 1: ] >= 0 ) )
+			idxs = np.where( crossings )[ 0 ]
+
+			if len( idxs ) == 0:
+				continue
+
+			k    = idxs[ 0 ]
+			root = brentq(
+				lambda t: func( self.et0 + t,
+					self.calc_kepler_states( self.et0 + t ) ),
+				check_ts[ k ], check_ts[ k + 1 ], xtol = 1e-9 )
+
+			if t_stop is None or abs( root ) < abs( t_stop ):
+				t_stop, n_stop = root, n
+
+		if t_stop is not None:
+			ts = np.append( ts[ np.abs( ts ) < abs( t_stop ) ], t_stop )
+			t_events[ n_stop ] = np.array( [ self.et0 + t_stop ] )
+			y_events[ n_stop ] = self.calc_kepler_states(
+				self.et0 + t_events[ n_stop ] ).T
+
+		ode_sol = OptimizeResult(
+			t        = self.et0 + ts,
+			y        = self.calc_kepler_states( self.et0 + ts ),
+			t_events = t_events,
+			y_events = y_events,
+			nfev     = 0,
+			njev     = 0,
+			nlu      = 0,
+			sol      = None,
+			status   = 0,
+			message  = 'The solver successfully reached the end '
+					   'of the integration interval.',
+			success  = True )
+
+		if t_stop is not None:
+			ode_sol.status  = 1
+			ode_sol.message = 'A termination event occurred.'
+
+		if self.config[ 'dense_output' ]:
+			ode_sol.sol = self.calc_kepler_states
+
+		return ode_sol
+
+	def calc_fixed_step_size( self ):
+		if self.config[ 'dt' ] is None:
+			return abs( self.config[ 'tspan' ] ) / 1000.0
+		return self.config[ 'dt' ]
+
+	def propagate_orbit_symplectic( self ):
+		'''
+		Opt-in fixed step symplectic propagation, with a step size of
+		config "dt" ( tspan / 1000 if not set ). It doesn't take larger
+		steps than LSODA for the same position error
+		( benchmarks/benchmark_long_arc.py ), its benefit is energy error
+		that stays bounded instead of drifting. Fixed steps suit near
+		circular orbits, since the step has to resolve periapsis passage.
+		For fewer steps on long arcs use "gauss_jackson"
+		'''
+		for key in self.orbit_perts:
+			if key not in CONSERVATIVE_PERTS:
+				raise RuntimeError( f'Orbit perturbation "{key}" '
+					'can\'t be propagated with a symplectic integrator.' )
+
+		return ot.solve_symplectic(
+			lambda et, state: self.ode_func( et, state )[ 3:6 ],
+			( self.et0, self.et0 + self.config[ 'tspan' ] ), self.state0, {
+				'method'      : self.config[ 'propagator' ],
+				'dt'          : self.calc_fixed_step_size(),
+				'events'      : self.event_functions,
+				'dense_output': self.config[ 'dense_output' ] } )
+
+	def propagate_orbit_gauss_jackson( self ):
+		'''
+		Fixed step 8th order Gauss-Jackson propagation, with a step size
+		of config "dt" ( tspan / 1000 if not set ) and one acceleration
+		evaluation per step, for long arcs of near circular orbits
+		where it takes far fewer evaluations than LSODA for the same
+		position error ( benchmarks/benchmark_long_arc.py )
+		'''
+		return ot.solve_gauss_jackson(
+			lambda et, state: self.ode_func( et, state )[ 3:6 ],
+			( self.et0, self.et0 + self.config[ 'tspan' ] ), self.state0, {
+				'dt'          : self.calc_fixed_step_size(),
+				'events'      : self.event_functions,
+				'dense_output': self.config[ 'dense_output' ] } )
 
 	def calc_altitudes( self ):
 		self.altitudes = np.linalg.norm( self.states[ :, :3 ], axis = 1 ) -\
@@ -220,13 +833,10 @@ class Spacecraft:
 		self.altitudes_calculated = True
 
 	def calc_coes( self ):
-		print( 'Calculating COEs..' )
-		self.coes = np.zeros( ( self.n_steps, 6 ) )
+		if self.config[ 'verbose' ]:
+			print( 'Calculating COEs..' )
+		self.coes = oc.states2coes( self.states[ :, :6 ], self.cb[ 'mu' ] )
 
-		for n in range( self.n_steps ):
-			self.coes[ n, : ] = oc.state2coes( 
-				self.states[ n, :6 ], { 'mu': self.cb[ 'mu' ] } )
-			
 		self.coes_rel        = self.coes[ : ] - self.coes[ 0, : ]
 		self.coes_calculated = True
 
@@ -252,9 +862,37 @@ class Spacecraft:
 			method, v, vv )
 		self.eclipses_calculated = True
 
+	def calc_illumination( self ):
+		'''
+		Visible fraction of the solar disk ( 0 to 1 ) at every step
+		'''
+		self.illumination = oc.calc_illumination_array(
+			self.ets, self.states[ :, :3 ], self.cb, self.config[ 'frame' ] )
+		self.illumination_calculated = True
+		return self.illumination
+
+	def calc_eclipse_table( self, method = 'either', v = False, vv = False ):
+		'''
+		Eclipse table (same keys as calc_eclipses) from the shadow
+		entrances and exits located during propagation
+		'''
+		if not self.eclipse_event_functions:
+			raise RuntimeError(
+				'Eclipse table requires config "eclipse_events".' )
+
+		n_stops      = len( self.stop_condition_functions )
+		umbra0       = self.check_umbra(    self.ets[ 0 ], self.states[ 0 ] ) <= 0
+		penumbra0    = self.check_penumbra( self.ets[ 0 ], self.states[ 0 ] ) <= 0
+		self.eclipse_table = oc.find_eclipses_events(
+			self.ets[ 0 ], self.ets[ -1 ],
+			self.ode_sol.t_events[ n_stops     ],
+			self.ode_sol.t_events[ n_stops + 1 ],
+			umbra0, penumbra0, method, v, vv )
+		return self.eclipse_table
+
 	def plot_eclipse_array( self, args = { 'show': True } ):
 		if not self.eclipses_calculated:
-			self.calc_eclipse_array()
+			self.calc_eclipses()
 
 		pt.plot_eclipse_array( self.ets, self.eclipse_array, args )
 
@@ -282,3 +920,66 @@ class Spacecraft:
 			self.calc_altitudes()
 
 		pt.plot_altitudes( self.ets, [ self.altitudes ], args )
+
+def config_spice_kernels( config ):
+	'''
+	SPICE kernels that propagating a Spacecraft config requires
+	'''
+	kernels = [ sd.leapseconds_kernel ]
+	perts   = config.get( 'orbit_perts', {} )
+	stops   = config.get( 'stop_conditions', {} )
+
+	if 'n_bodies' in perts or 'enter_SOI' in stops or\
+		config.get( 'eclipse_events', False ):
+		kernels.append( sd.de432 )
+
+	if 'gravity_field' in perts or config.get( 'frame', 'J2000' ) != 'J2000':
+		kernels.append( sd.pck00010 )
+
+	return kernels
+
+def propagate_config( config ):
+	'''
+	Process pool worker function. Propagate one Spacecraft config
+	(kernels already furnished by the worker initializer)
+	and return only the ephemeris times and states arrays.
+	Configs are always propagated, regardless of "propagate"
+	'''
+	_config = {
+		'load_kernels': False,
+		'verbose'     : False,
+		'print_stop'  : False
+	}
+	for key in config.keys():
+		_config[ key ] = config[ key ]
+	_config[ 'propagate' ] = True
+
+	sc = Spacecraft( _config )
+	return sc.ets, sc.states
+
+def propagate_batch( configs, args = {} ):
+	'''
+	Propagate a list of Spacecraft configs across a process pool.
+	Results are returned in the same order as configs as a list of
+	( ets, states ) tuples. See parallel_tools.pool_map for args
+	( n_workers, chunksize, kernels, progress ). Workers furnish the
+	kernels the configs require ( config_spice_kernels ) followed by
+	every kernel furnished in this process whose file still exists,
+	unless "kernels" is given
+	'''
+	configs = list( configs )
+	kernels = []
+	for config in configs:
+		for kernel in config_spice_kernels( config ):
+			if kernel not in kernels:
+				kernels.append( kernel )
+
+	loaded  = [ kernel for kernel in st.get_loaded_kernels()
+		if os.path.isfile( kernel ) ]
+	kernels = [ kernel for kernel in kernels if kernel not in loaded ] + loaded
+
+	_args = { 'kernels': kernels }
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	return pa.pool_map( propagate_config, configs, _args )
@@ -0,0 +1,466 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+SpacecraftEnsemble class definition
+'''
+
+# 3rd party libraries
+from scipy.integrate import RK23, RK45, DOP853, Radau, BDF, LSODA
+import spiceypy          as spice
+import numpy             as np
+import matplotlib.pyplot as plt
+plt.style.use( 'dark_background' )
+
+# AWP libraries
+import orbit_calculations as oc
+import numerical_tools    as nt
+import plotting_tools     as pt
+import planetary_data     as pd
+import spice_data         as sd
+import spice_tools        as st
+import atmosphere_tools   as at
+
+ODE_SOLVERS = {
+	'RK23'  : RK23,
+	'RK45'  : RK45,
+	'DOP853': DOP853,
+	'Radau' : Radau,
+	'BDF'   : BDF,
+	'LSODA' : LSODA
+}
+
+def null_config():
+	'''
+	Same keys as the Spacecraft config, except that "coes" and
+	"orbit_states" are lists with one entry per ensemble member.
+	The default propagator is explicit since implicit / stiff
+	solvers would build a (7N, 7N) Jacobian by finite differences
+	'''
+	return {
+		'cb'              : pd.earth,
+		'date0'           : '2021-04-01',
+		'et0'             : None,
+		'frame'           : 'J2000',
+		'orbit_states'    : [],
+		'coes'            : [],
+		'orbit_perts'     : {},
+		'propagator'      : 'DOP853',
+		'atol'            : 1e-6,
+		'rtol'            : 1e-6,
+		'stop_conditions' : {},
+		'print_stop'      : True,
+		'verbose'         : True,
+		'mass0'           : 0,
+		'ephemeris_tables': False,
+		'ephemeris_tol'   : 1e-3,
+		'propagate'       : True
+	}
+
+class SpacecraftEnsemble:
+	'''
+	Propagate N spacecraft sharing the same central body, frame and
+	orbit perturbations with a single integrator, evaluating the
+	accelerations of all members in one NumPy pass
+	'''
+	def __init__( self, config ):
+		self.config = null_config()
+		for key in config.keys():
+			self.config[ key ] = config[ key ]
+
+		self.orbit_perts = self.config[ 'orbit_perts' ]
+		self.cb          = self.config[ 'cb' ]
+
+		if len( self.config[ 'coes' ] ) > 0:
+			self.config[ 'orbit_states' ] = [
+				oc.coes2state( coes, mu = self.cb[ 'mu' ] )
+				for coes in self.config[ 'coes' ] ]
+
+		self.n_members = len( self.config[ 'orbit_states' ] )
+		if self.n_members == 0:
+			raise RuntimeError( 'SpacecraftEnsemble was passed no members.' )
+
+		if type( self.config[ 'tspan' ] ) == str:
+			self.config[ 'tspan' ] = float( self.config[ 'tspan' ] ) * max(
+				oc.state2period( state, self.cb[ 'mu' ] )
+				for state in self.config[ 'orbit_states' ] )
+
+		self.states0          = np.zeros( ( self.n_members, 7 ) )
+		self.states0[ :, :6 ] = self.config[ 'orbit_states' ]
+		self.states0[ :,  6 ] = self.config[ 'mass0' ]
+
+		self.coes_calculated      = False
+		self.latlons_calculated   = False
+		self.altitudes_calculated = False
+
+		self.assign_stop_condition_functions()
+		self.assign_orbit_perturbations_functions()
+		self.load_spice_kernels()
+		self.build_ephemeris_tables()
+
+		if self.config[ 'propagate' ]:
+			self.propagate_orbits()
+
+	def assign_stop_condition_functions( self ):
+		'''
+		Stop conditions are evaluated for all members at once after
+		every integrator step. A member whose stop condition function
+		crosses 0 in the given direction is masked out of the
+		propagation, while the rest of the ensemble continues
+		'''
+		if 'min_alt' not in self.config[ 'stop_conditions' ].keys():
+			self.config[ 'stop_conditions' ][ 'min_alt' ] =\
+				self.cb[ 'deorbit_altitude' ]
+
+		self.stop_conditions_map = {
+			'min_alt'  : ( self.check_min_alt,   -1 ),
+			'max_alt'  : ( self.check_max_alt,    1 ),
+			'enter_SOI': ( self.check_enter_SOI, -1 )
+			}
+		self.stop_condition_names     = list(
+			self.config[ 'stop_conditions' ].keys() )
+		self.stop_condition_functions = [
+			self.stop_conditions_map[ key ]
+			for key in self.stop_condition_names ]
+
+	def assign_orbit_perturbations_functions( self ):
+
+		self.orbit_perts_funcs_map = {
+			'J2'      : self.calc_J2,
+			'n_bodies': self.calc_n_bodies,
+			'drag'    : self.calc_drag
+		}
+		self.orbit_perts_funcs = []
+
+		if 'drag' in self.orbit_perts:
+			self.assign_drag()
+
+		for key in self.config[ 'orbit_perts' ]:
+			self.orbit_perts_funcs.append(
+				self.orbit_perts_funcs_map[ key ] )
+
+	def assign_drag( self ):
+		'''
+		Same drag parameters as Spacecraft.assign_drag, where "Cd" and
+		"area" can also be arrays with one entry per ensemble member
+		'''
+		if self.cb[ 'name' ] not in at.atmosphere_models:
+			raise RuntimeError(
+				f'No atmosphere model for {self.cb[ "name" ]}.' )
+
+		if np.any( self.states0[ :, 6 ] <= 0 ):
+			raise RuntimeError( 'Drag requires a positive "mass0".' )
+
+		drag = { 'Cd': 2.2, 'area': 1.0 }
+		for key in self.orbit_perts[ 'drag' ].keys():
+			drag[ key ] = self.orbit_perts[ 'drag' ][ key ]
+
+		model              = at.atmosphere_models[ self.cb[ 'name' ] ]
+		self.atmosphere    = at.ExponentialAtmosphere( model )
+		self.rotation_rate = model[ 'rotation_rate' ]
+		self.drag_CdAs     = np.broadcast_to( np.asarray(
+			drag[ 'Cd' ], dtype = float ) * drag[ 'area' ],
+			( self.n_members, ) ).copy()
+
+	def load_spice_kernels( self ):
+		spice.furnsh( sd.leapseconds_kernel )
+		self.spice_kernels_loaded = [ sd.leapseconds_kernel ]
+
+		if self.config[ 'et0' ] is not None:
+			self.et0 = self.config[ 'et0' ]
+		else:
+			self.et0 = spice.str2et( self.config[ 'date0' ] )
+
+	def build_ephemeris_tables( self ):
+		'''
+		Same as Spacecraft.build_ephemeris_tables
+		'''
+		self.ephemeris_tables = {}
+		if not self.config[ 'ephemeris_tables' ]:
+			return
+
+		if isinstance( self.config[ 'ephemeris_tables' ], dict ):
+			self.ephemeris_tables.update( self.config[ 'ephemeris_tables' ] )
+
+		bodies = list( self.orbit_perts.get( 'n_bodies', [] ) )
+		if 'enter_SOI' in self.config[ 'stop_conditions' ]:
+			bodies.append( self.config[ 'stop_conditions' ][ 'enter_SOI' ] )
+
+		ets = [ self.et0, self.et0 + self.config[ 'tspan' ] ]
+		for body in bodies:
+			if body[ 'SPICE_ID' ] in self.ephemeris_tables:
+				st.check_ephemeris_table(
+					self.ephemeris_tables[ body[ 'SPICE_ID' ] ],
+					min( ets ), max( ets ), self.config[ 'frame' ],
+					self.cb[ 'SPICE_ID' ] )
+				continue
+			self.ephemeris_tables[ body[ 'SPICE_ID' ] ] =\
+				st.fit_ephemeris_table( body[ 'SPICE_ID' ],
+					min( ets ), max( ets ), self.config[ 'frame' ],
+					self.cb[ 'SPICE_ID' ],
+					{ 'tol': self.config[ 'ephemeris_tol' ] } )
+
+	def calc_body_positions( self, body_id, ets ):
+		'''
+		Calculate position of a body w.r.t the central body
+		at an array of ephemeris times, shape (len(ets), 3)
+		'''
+		if body_id in self.ephemeris_tables:
+			return st.eval_ephemeris_table(
+				self.ephemeris_tables[ body_id ], np.asarray( ets ) )
+
+		return np.array( [ spice.spkgps( body_id, et,
+			self.config[ 'frame' ], self.cb[ 'SPICE_ID' ] )[ 0 ]
+			for et in ets ] )
+
+	def check_min_alt( self, ets, states ):
+		return np.linalg.norm( states[ :, :3 ], axis = 1 ) -\
+			      self.cb[ 'radius' ] -\
+			      self.config[ 'stop_conditions' ][ 'min_alt' ]
+
+	def check_max_alt( self, ets, states ):
+		return np.linalg.norm( states[ :, :3 ], axis = 1 ) -\
+			      self.cb[ 'radius' ] -\
+			      self.config[ 'stop_conditions' ][ 'max_alt' ]
+
+	def check_enter_SOI( self, ets, states ):
+		body       = self.config[ 'stop_conditions' ][ 'enter_SOI' ]
+		rs_cb2body = self.calc_body_positions( body[ 'SPICE_ID' ], ets )
+
+		return np.linalg.norm( rs_cb2body - states[ :, :3 ], axis = 1 ) -\
+			body[ 'SOI' ]
+
+	def calc_n_bodies( self, et, states ):
+		a = np.zeros( ( states.shape[ 0 ], 3 ) )
+		for body in self.config[ 'orbit_perts' ][ 'n_bodies' ]:
+			r_cb2body  = self.calc_body_positions(
+				body[ 'SPICE_ID' ], [ et ] )[ 0 ]
+			rs_sc2body = r_cb2body - states[ :, :3 ]
+			norms      = np.linalg.norm( rs_sc2body, axis = 1 )
+
+			a += body[ 'mu' ] * (\
+				 rs_sc2body / norms[ :, None ] ** 3 -\
+				 r_cb2body / nt.norm( r_cb2body ) ** 3 )
+		return a
+
+	def calc_J2( self, et, states ):
+		z2     = states[ :, 2 ] ** 2
+		r2     = np.sum( states[ :, :3 ] ** 2, axis = 1 )
+		norm_r = np.sqrt( r2 )
+		t      = 5 * z2 / r2
+		a      = np.empty( ( states.shape[ 0 ], 3 ) )
+		a[ :, 0 ] = states[ :, 0 ] / norm_r * ( t - 1 )
+		a[ :, 1 ] = states[ :, 1 ] / norm_r * ( t - 1 )
+		a[ :, 2 ] = states[ :, 2 ] / norm_r * ( t - 3 )
+		return a * ( 1.5 * self.cb[ 'J2' ] * self.cb[ 'mu' ] *\
+			   self.cb[ 'radius' ] ** 2 / r2 ** 2 )[ :, None ]
+
+	def calc_drag( self, et, states ):
+		'''
+		Vectorized Spacecraft.calc_drag for the active members
+		'''
+		norms   = np.linalg.norm( states[ :, :3 ], axis = 1 )
+		rhos    = self.atmosphere.calc_densities( norms - self.cb[ 'radius' ] )
+		vs_rel  = states[ :, 3:6 ].copy()
+		vs_rel[ :, 0 ] += self.rotation_rate * states[ :, 1 ]
+		vs_rel[ :, 1 ] -= self.rotation_rate * states[ :, 0 ]
+		ks      = -500.0 * self.drag_CdAs[ self.active ] / states[ :, 6 ] *\
+			rhos * np.linalg.norm( vs_rel, axis = 1 )
+		return vs_rel * ks[ :, None ]
+
+	def diffy_q( self, et, y ):
+		states     = y.reshape( ( self.n_members, 7 ) )
+		states_dot = np.zeros( ( self.n_members, 7 ) )
+		active     = self.active
+
+		rs    = states[ active, :3 ]
+		norms = np.linalg.norm( rs, axis = 1 )
+		a     = -rs * ( self.cb[ 'mu' ] / norms ** 3 )[ :, None ]
+
+		for pert in self.orbit_perts_funcs:
+			a += pert( et, states[ active ] )
+
+		states_dot[ active, :3  ] = states[ active, 3:6 ]
+		states_dot[ active, 3:6 ] = a
+		return states_dot.ravel()
+
+	def init_solver( self, et, states ):
+		return ODE_SOLVERS[ self.config[ 'propagator' ] ](
+			self.diffy_q, et, states.ravel(),
+			self.et0 + self.config[ 'tspan' ],
+			rtol = self.config[ 'rtol' ],
+			atol = self.config[ 'atol' ] )
+
+	def calc_stop_values( self, ets, states ):
+		return np.array( [ func( ets, states )
+			for func, direction in self.stop_condition_functions ] ).T
+
+	def locate_stops( self, sol, et0, et1, members, n_stop ):
+		'''
+		Bisect the dense output of the last step for the crossings of
+		one stop condition, for all of the given members at once
+		'''
+		func  = self.stop_condition_functions[ n_stop ][ 0 ]
+		rows  = members[ :, None ] * 7 + np.arange( 7 )
+		cols  = np.arange( len( members ) )[ :, None ]
+		ets_l = np.full( len( members ), et0 )
+		ets_u = np.full( len( members ), et1 )
+
+		def calc_states( ets ):
+			return sol( ets )[ rows, cols ]
+
+		vals_l = func( ets_l, calc_states( ets_l ) )
+		for n in range( 60 ):
+			ets_m  = 0.5 * ( ets_l + ets_u )
+			vals_m = func( ets_m, calc_states( ets_m ) )
+			lower  = np.sign( vals_m ) == np.sign( vals_l )
+			ets_l [  lower ] = ets_m [ lower ]
+			vals_l[  lower ] = vals_m[ lower ]
+			ets_u [ ~lower ] = ets_m [ ~lower ]
+
+		return ets_u, calc_states( ets_u )
+
+	def propagate_orbits( self ):
+		if self.config[ 'verbose' ]:
+			print( f'Propagating {self.n_members} orbits..' )
+
+		n_stops          = len( self.stop_condition_functions )
+		directions       = np.array(
+			[ direction for func, direction in self.stop_condition_functions ] )
+		self.active      = np.ones( self.n_members, dtype = bool )
+		self.stop_ets    = np.full( self.n_members, np.nan )
+		self.stop_states = np.full( ( self.n_members, 7 ), np.nan )
+		self.stop_events = [ None ] * self.n_members
+		self.stop_idxs   = np.full( self.n_members, -1 )
+		self.nfev        = 0
+
+		solver = self.init_solver( self.et0, self.states0 )
+		ets    = [ self.et0 ]
+		states = [ self.states0.copy() ]
+		vals0  = self.calc_stop_values(
+			np.full( self.n_members, self.et0 ), self.states0 )
+
+		while solver.status == 'running':
+			et_prev = solver.t
+			solver.step()
+			if solver.status == 'failed':
+				raise RuntimeError( solver.message )
+
+			_states = solver.y.reshape( ( self.n_members, 7 ) ).copy()
+			vals1   = self.calc_stop_values(
+				np.full( self.n_members, solver.t ), _states )
+
+			crossed = ( ( directions <= 0 ) & ( vals0 > 0 ) & ( vals1 <= 0 ) ) |\
+					  ( ( directions >= 0 ) & ( vals0 < 0 ) & ( vals1 >= 0 ) )
+			crossed &= self.active[ :, None ]
+			members  = np.where( np.any( crossed, axis = 1 ) )[ 0 ]
+
+			if len( members ) > 0:
+				sol           = solver.dense_output()
+				stop_ets      = np.full( len( members ), np.inf )
+				stop_states   = np.zeros( ( len( members ), 7 ) )
+				for n in range( n_stops ):
+					idxs = np.where( crossed[ members, n ] )[ 0 ]
+					if len( idxs ) == 0:
+						continue
+					_ets, _sts = self.locate_stops( sol, et_prev, solver.t,
+						members[ idxs ], n )
+					earlier = _ets < stop_ets[ idxs ]
+					stop_ets   [ idxs[ earlier ] ] = _ets[ earlier ]
+					stop_states[ idxs[ earlier ] ] = _sts[ earlier ]
+					for idx in idxs[ earlier ]:
+						self.stop_events[ members[ idx ] ] =\
+							self.stop_condition_names[ n ]
+
+				self.stop_ets   [ members ] = stop_ets
+				self.stop_states[ members ] = stop_states
+				self.stop_idxs  [ members ] = len( ets )
+				self.active     [ members ] = False
+				_states[ members ] = stop_states
+
+				if self.config[ 'print_stop' ]:
+					for member in members:
+						print( f'Spacecraft {member} has reached '
+							   f'{self.stop_events[ member ]}.' )
+
+			states.append( _states )
+			ets.append( solver.t )
+			vals0 = vals1
+
+			if not np.any( self.active ):
+				break
+
+			if len( members ) > 0:
+				'''
+				Restart the integrator from the frozen states, since the
+				derivatives of masked members are now discontinuous
+				'''
+				self.nfev += solver.nfev
+				solver = self.init_solver( solver.t, _states )
+
+		self.nfev   += solver.nfev
+		self.ets     = np.array( ets )
+		self.states  = np.array( states ).transpose( 1, 0, 2 )
+		self.n_steps = self.ets.shape[ 0 ]
+
+		'''
+		Members that stopped hold their stop state for the rest
+		of the ensemble's time steps
+		'''
+		for member in np.where( ~self.active )[ 0 ]:
+			self.states[ member, self.stop_idxs[ member ]: ] =\
+				self.stop_states[ member ]
+
+		self.stop_idxs[ self.active ] = self.n_steps - 1
+
+	def calc_altitudes( self ):
+		self.altitudes = np.linalg.norm( self.states[ :, :, :3 ], axis = 2 ) -\
+						self.cb[ 'radius' ]
+		self.altitudes_calculated = True
+
+	def calc_coes( self ):
+		if self.config[ 'verbose' ]:
+			print( 'Calculating COEs..' )
+		self.coes = oc.states2coes( self.states[ :, :, :6 ], self.cb[ 'mu' ] )
+
+		self.coes_rel        = self.coes - self.coes[ :, :1, : ]
+		self.coes_calculated = True
+
+	def calc_latlons( self ):
+		'''
+		Rotation matrices are calculated once per time step
+		and applied to every member
+		'''
+		rs = self.states[ :, :, :3 ]
+		if self.config[ 'frame' ] != self.cb[ 'body_fixed_frame' ]:
+			matrices = np.array( [ spice.pxform( self.config[ 'frame' ],
+				self.cb[ 'body_fixed_frame' ], et ) for et in self.ets ] )
+			rs = np.einsum( 'mij,nmj->nmi', matrices, rs )
+
+		self.latlons = np.zeros( rs.shape )
+		self.latlons[ :, :, 0 ] = np.linalg.norm( rs, axis = 2 )
+		self.latlons[ :, :, 1 ] = np.arctan2( rs[ :, :, 1 ], rs[ :, :, 0 ] )
+		self.latlons[ :, :, 2 ] = np.arctan2( rs[ :, :, 2 ],
+			np.linalg.norm( rs[ :, :, :2 ], axis = 2 ) )
+		self.latlons[ :, :, 1: ] *= nt.r2d
+		self.latlons_calculated = True
+
+	def plot_3d( self, args = { 'show': True } ):
+		pt.plot_orbits(
+			[ self.states[ n, :, :3 ] for n in range( self.n_members ) ],
+			args )
+
+	def plot_groundtracks( self, args = { 'show': True } ):
+		if not self.latlons_calculated:
+			self.calc_latlons()
+
+		pt.plot_groundtracks(
+			[ self.latlons[ n ] for n in range( self.n_members ) ], args )
+
+	def plot_altitudes( self, args = { 'show': True } ):
+		if not self.altitudes_calculated:
+			self.calc_altitudes()
+
+		pt.plot_altitudes( self.ets,
+			[ self.altitudes[ n ] for n in range( self.n_members ) ], args )
@@ -0,0 +1,112 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Atmosphere Models Library
+'''
+
+# Python standard libraries
+import math
+
+# 3rd party libraries
+import numpy as np
+
+'''
+Piecewise exponential atmosphere, rows are
+base altitude (km), nominal density (kg/m^3), scale height (km)
+(Vallado, Fundamentals of Astrodynamics and Applications, table 8-4)
+'''
+EARTH_EXPONENTIAL_TABLE = np.array( [
+	[    0.0, 1.225,     7.249   ],
+	[   25.0, 3.899e-2,  6.349   ],
+	[   30.0, 1.774e-2,  6.682   ],
+	[   40.0, 3.972e-3,  7.554   ],
+	[   50.0, 1.057e-3,  8.382   ],
+	[   60.0, 3.206e-4,  7.714   ],
+	[   70.0, 8.770e-5,  6.549   ],
+	[   80.0, 1.905e-5,  5.799   ],
+	[   90.0, 3.396e-6,  5.382   ],
+	[  100.0, 5.297e-7,  5.877   ],
+	[  110.0, 9.661e-8,  7.263   ],
+	[  120.0, 2.438e-8,  9.473   ],
+	[  130.0, 8.484e-9,  12.636  ],
+	[  140.0, 3.845e-9,  16.149  ],
+	[  150.0, 2.070e-9,  22.523  ],
+	[  180.0, 5.464e-10, 29.740  ],
+	[  200.0, 2.789e-10, 37.105  ],
+	[  250.0, 7.248e-11, 45.546  ],
+	[  300.0, 2.418e-11, 53.628  ],
+	[  350.0, 9.518e-12, 53.298  ],
+	[  400.0, 3.725e-12, 58.515  ],
+	[  450.0, 1.585e-12, 60.828  ],
+	[  500.0, 6.967e-13, 63.822  ],
+	[  600.0, 1.454e-13, 71.835  ],
+	[  700.0, 3.614e-14, 88.667  ],
+	[  800.0, 1.170e-14, 124.64  ],
+	[  900.0, 5.245e-15, 181.05  ],
+	[ 1000.0, 3.019e-15, 268.00  ]
+] )
+
+atmosphere_models = {
+	'Earth': {
+		'table'        : EARTH_EXPONENTIAL_TABLE,
+		'bin_width'    : 5.0,           # km
+		'rotation_rate': 7.292115e-5    # rad / s
+	}
+}
+
+class ExponentialAtmosphere:
+	'''
+	Piecewise exponential density model. All of the table's base
+	altitudes are multiples of "bin_width", so the table row of an
+	altitude is found with one division into a precomputed lookup
+	array instead of a search. Altitudes below the table use the
+	first row and altitudes above it use the last row
+	'''
+	def __init__( self, model = None ):
+		if model is None:
+			model = atmosphere_models[ 'Earth' ]
+
+		table          = model[ 'table' ]
+		self.bin_width = model[ 'bin_width' ]
+		self.hs0       = table[ :, 0 ].copy()
+		self.rhos0     = table[ :, 1 ].copy()
+		self.Hs        = table[ :, 2 ].copy()
+
+		if np.any( self.hs0 % self.bin_width != 0.0 ):
+			raise RuntimeError( 'Atmosphere table base altitudes must be '
+				'multiples of the bin width.' )
+
+		bins          = np.arange( int( self.hs0[ -1 ] / self.bin_width ) + 1 )
+		self.row_idxs = np.searchsorted(
+			self.hs0, bins * self.bin_width, side = 'right' ) - 1
+		self.max_bin  = len( bins ) - 1
+
+		'''
+		Python lists for the scalar lookup inside the RHS
+		'''
+		self._row_idxs = self.row_idxs.tolist()
+		self._hs0      = self.hs0.tolist()
+		self._rhos0    = self.rhos0.tolist()
+		self._Hs       = self.Hs.tolist()
+
+	def calc_density( self, alt ):
+		'''
+		Density (kg/m^3) at a single altitude (km)
+		'''
+		_bin = min( max( int( alt / self.bin_width ), 0 ), self.max_bin )
+		row  = self._row_idxs[ _bin ]
+		return self._rhos0[ row ] *\
+			math.exp( ( self._hs0[ row ] - alt ) / self._Hs[ row ] )
+
+	def calc_densities( self, alts ):
+		'''
+		Densities (kg/m^3) at an array of altitudes (km)
+		'''
+		alts = np.asarray( alts, dtype = float )
+		bins = np.clip( ( alts / self.bin_width ).astype( int ),
+			0, self.max_bin )
+		rows = self.row_idxs[ bins ]
+		return self.rhos0[ rows ] *\
+			np.exp( ( self.hs0[ rows ] - alts ) / self.Hs[ rows ] )
@@ -0,0 +1,65 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Spacecraft right-hand side benchmark:
+generic diffy_q vs fused RHS (function evaluations per second)
+'''
+
+# Python standard libraries
+import time
+
+# 3rd party libraries
+import spiceypy as spice
+
+# AWP library
+from Spacecraft import Spacecraft as SC
+import planetary_data as pd
+import spice_data     as sd
+
+ORBIT_PERTS = {
+	'two-body'          : {},
+	'two-body+J2'       : { 'J2': True },
+	'two-body+J2+n_body': { 'J2': True, 'n_bodies': [ pd.moon, pd.sun ] }
+}
+
+def calls_per_second( func, et, state, n_calls ):
+	start = time.perf_counter()
+	for n in range( n_calls ):
+		func( et, state )
+	return n_calls / ( time.perf_counter() - start )
+
+def propagation_nfev_per_second( config ):
+	sc = SC( config )
+	sc.propagate_orbit()
+	start = time.perf_counter()
+	sc.propagate_orbit()
+	return sc.ode_sol.nfev / ( time.perf_counter() - start )
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	n_calls = 20000
+	print( f'{"orbit_perts":<20} {"mode":<8} {"RHS calls/s":>12}'
+		   f' {"solve_ivp nfev/s":>17}' )
+
+	for name, orbit_perts in ORBIT_PERTS.items():
+		for fused in [ False, True ]:
+			config = {
+				'coes'       : [ pd.earth[ 'radius' ] + 500.0,
+								 0.001, 51.6, 0.0, 0.0, 0.0 ],
+				'date0'      : '1980-06-01',
+				'tspan'      : '10',
+				'orbit_perts': orbit_perts,
+				'fused_rhs'  : fused,
+				'rtol'       : 1e-9,
+				'atol'       : 1e-9,
+				'propagate'  : False
+			}
+			sc   = SC( config )
+			rate = calls_per_second( sc.ode_func, sc.et0, sc.state0, n_calls )
+			nfev = propagation_nfev_per_second( config )
+			mode = 'fused' if fused else 'generic'
+			print( f'{name:<20} {mode:<8} {rate:>12.0f} {nfev:>17.0f}' )
@@ -0,0 +1,68 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Drag lifetime study benchmark: decay of N low Earth orbit objects,
+propagated one at a time vs as one SpacecraftEnsemble
+'''
+
+# Python standard libraries
+import sys
+import time
+import timeit
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from Spacecraft         import Spacecraft         as SC
+from SpacecraftEnsemble import SpacecraftEnsemble as SE
+import atmosphere_tools as at
+import planetary_data   as pd
+import spice_data       as sd
+
+N_OBJECTS = int( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 1000
+TSPAN     = 3 * 86400.0
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+
+	atm = at.ExponentialAtmosphere()
+	dt  = timeit.timeit( lambda: atm.calc_density( 412.3 ), number = 100000 )
+	print( f'density lookup: {dt / 100000 * 1e6:.2f} us / call' )
+
+	rng   = np.random.default_rng( 0 )
+	alts  = rng.uniform( 200.0, 400.0, N_OBJECTS )
+	incs  = rng.uniform( 0.0, 100.0, N_OBJECTS )
+	areas = rng.uniform( 0.01, 10.0, N_OBJECTS )
+	coes  = [ [ pd.earth[ 'radius' ] + alt, 0.001, inc, 0.0, 0.0, 0.0 ]
+		for alt, inc in zip( alts, incs ) ]
+	config = {
+		'tspan'     : TSPAN,
+		'date0'     : '1980-06-01',
+		'mass0'     : 100.0,
+		'propagator': 'DOP853',
+		'rtol'      : 1e-8,
+		'atol'      : 1e-8,
+		'print_stop': False
+	}
+
+	n_single = min( N_OBJECTS, 50 )
+	start    = time.perf_counter()
+	for n in range( n_single ):
+		SC( dict( config, coes = coes[ n ], verbose = False,
+			orbit_perts = { 'drag': { 'area': areas[ n ] } } ) )
+	dt_single = ( time.perf_counter() - start ) / n_single
+
+	start = time.perf_counter()
+	se    = SE( dict( config, coes = coes,
+		orbit_perts = { 'drag': { 'area': areas } } ) )
+	dt_ensemble = time.perf_counter() - start
+
+	print( f'{N_OBJECTS} objects, {TSPAN / 86400.0:.0f} days, '
+		   f'{np.sum( ~se.active )} decayed' )
+	print( f'Spacecraft (per object, {n_single} sampled): {dt_single:.3f} s '
+		   f'-> {dt_single * N_OBJECTS:.1f} s total' )
+	print( f'SpacecraftEnsemble:                      {dt_ensemble:.1f} s' )
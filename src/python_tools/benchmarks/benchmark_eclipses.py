@@ -0,0 +1,48 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Eclipse array benchmark: 40 day LEO propagation vs eclipse
+classification, batched vs per step check_eclipse calls
+'''
+
+# Python standard libraries
+import time
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from Spacecraft import Spacecraft as SC
+import orbit_calculations as oc
+import spice_data         as sd
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	start = time.perf_counter()
+	sc    = SC( {
+		'date0'  : '1980-03-03 22:10:35 TDB',
+		'coes'   : [ 7480.0, 0.09, 5.5, 6.26, 5.95, 0.2 ],
+		'tspan'  : 40 * 86400.0,
+		'dt'     : 10.0,
+		'verbose': False
+		} )
+	dt_propagation = time.perf_counter() - start
+
+	rs    = sc.states[ :, :3 ]
+	start = time.perf_counter()
+	eclipses = oc.calc_eclipse_array( sc.ets, rs, sc.cb )
+	dt_batched = time.perf_counter() - start
+
+	start = time.perf_counter()
+	expected = [ oc.check_eclipse( et, r, sc.cb ) for et, r in zip( sc.ets, rs ) ]
+	dt_loop = time.perf_counter() - start
+
+	print( f'{sc.n_steps} steps, identical: {np.array_equal( eclipses, expected )}' )
+	print( f'propagation:             {dt_propagation:.3f} s' )
+	print( f'calc_eclipse_array:      {dt_batched:.3f} s' )
+	print( f'check_eclipse per step:  {dt_loop:.3f} s' )
@@ -0,0 +1,60 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Encke's method benchmark: Cowell vs Encke formulations with
+J2 and lunisolar perturbations (RHS evaluations and accuracy)
+'''
+
+# Python standard libraries
+import time
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from Spacecraft import Spacecraft as SC
+import planetary_data as pd
+import spice_data     as sd
+
+ORBITS = {
+	'GEO': ( [ 42164.0, 0.0002, 0.05, 0.0, 0.0, 0.0 ], 10 * 86400.0 ),
+	'MEO': ( [ 26560.0, 0.01,   55.0, 0.0, 0.0, 0.0 ], 10 * 86400.0 ),
+	'LEO': ( [ 7000.0,  0.001,  51.6, 0.0, 0.0, 0.0 ],      86400.0 )
+}
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	for name, ( coes, tspan ) in ORBITS.items():
+		config = {
+			'coes'            : coes,
+			'tspan'           : tspan,
+			'date0'           : '1980-06-01',
+			'orbit_perts'     : { 'J2': True, 'n_bodies': [ pd.moon, pd.sun ] },
+			'ephemeris_tables': True,
+			'print_stop'      : False,
+			'verbose'         : False
+		}
+		reference = SC( dict( config,
+			propagator = 'DOP853', rtol = 1e-13, atol = 1e-10 ) )
+
+		print( f'\n{name}' )
+		print( f'{"propagator":<10} {"mode":<7} {"tol":>6} {"nfev":>6}'
+			   f' {"time (s)":>9} {"final pos err (km)":>19}' )
+
+		for propagator in [ 'LSODA', 'DOP853' ]:
+			for encke in [ False, True ]:
+				for tol in [ 1e-8, 1e-10 ]:
+					start = time.perf_counter()
+					sc    = SC( dict( config, propagator = propagator,
+						encke = encke, rtol = tol, atol = tol ) )
+					dt    = time.perf_counter() - start
+					err   = np.linalg.norm(
+						sc.states[ -1, :3 ] - reference.states[ -1, :3 ] )
+					mode  = 'encke' if encke else 'cowell'
+					print( f'{propagator:<10} {mode:<7} {tol:>6.0e}'
+						   f' {sc.ode_sol.nfev:>6} {dt:>9.3f} {err:>19.2e}' )
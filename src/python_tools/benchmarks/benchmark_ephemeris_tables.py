@@ -0,0 +1,62 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Spacecraft ephemeris tables benchmark:
+multi-year heliocentric propagation with n-body perturbations
+using SPICE calls vs Chebyshev ephemeris tables, both fit for the
+propagation and reused from a previous one
+'''
+
+# Python standard libraries
+import time
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from Spacecraft import Spacecraft as SC
+import planetary_data as pd
+import spice_data     as sd
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0      = spice.str2et( '1978-01-01' )
+	state0   = spice.spkgeo( 399, et0, 'ECLIPJ2000', 10 )[ 0 ]
+	state0[ :3  ] *= 1.3
+	state0[ 3:6 ] /= np.sqrt( 1.3 )
+	config   = {
+		'cb'         : pd.sun,
+		'et0'        : et0,
+		'frame'      : 'ECLIPJ2000',
+		'orbit_state': state0,
+		'tspan'      : 4 * 365.25 * 24 * 3600.0,
+		'orbit_perts': { 'n_bodies': [ pd.earth, pd.moon, pd.jupiter ] },
+		'rtol'       : 1e-12,
+		'atol'       : 1e-12,
+		'fused_rhs'  : True,
+		'propagate'  : False
+	}
+	results = {}
+
+	for mode in [ 'SPICE', 'tables', 'reused' ]:
+		if mode == 'reused':
+			config[ 'ephemeris_tables' ] = sc.ephemeris_tables
+		else:
+			config[ 'ephemeris_tables' ] = mode == 'tables'
+		start  = time.perf_counter()
+		sc     = SC( config )
+		setup  = time.perf_counter() - start
+		start  = time.perf_counter()
+		sc.propagate_orbit()
+		dt     = time.perf_counter() - start
+		results[ mode ] = sc.states[ -1, :3 ]
+		print( f'{mode:<7} setup: {setup:7.3f} s  propagation: {dt:7.3f} s'
+			   f'  total: {setup + dt:7.3f} s  nfev: {sc.ode_sol.nfev}' )
+
+	print( 'Final position difference (km):',
+		np.linalg.norm( results[ 'tables' ] - results[ 'SPICE' ] ) )
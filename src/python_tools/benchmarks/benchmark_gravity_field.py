@@ -0,0 +1,48 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Gravity field benchmark: time per acceleration call and 1 day LEO
+position differences for increasing degree and order
+'''
+
+# Python standard libraries
+import timeit
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from Spacecraft import Spacecraft as SC
+import gravity_tools as gt
+import spice_data    as sd
+
+FIELDS = [ ( 2, 0 ), ( 4, 4 ), ( 8, 8 ), ( 20, 20 ), ( 36, 36 ) ]
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.pck00010 )
+
+	r      = np.array( [ 6800.0, 1200.0, -2500.0 ] )
+	config = {
+		'coes'      : [ 6778.0, 0.001, 51.6, 0.0, 0.0, 0.0 ],
+		'tspan'     : 86400.0,
+		'date0'     : '1980-06-01',
+		'propagator': 'DOP853',
+		'rtol'      : 1e-11,
+		'atol'      : 1e-11,
+		'verbose'   : False
+	}
+	reference = SC( dict( config, orbit_perts = { 'gravity_field': ( 36, 36 ) } ) )
+
+	print( f'{"field":>7} {"us / call":>10} {"nfev":>6} {"pos diff to 36x36 (km)":>23}' )
+	for degree, order in FIELDS:
+		field = gt.GravityField( degree, order )
+		dt    = timeit.timeit( lambda: field.calc_accel( r ), number = 2000 ) / 2000
+		sc    = SC( dict( config,
+			orbit_perts = { 'gravity_field': ( degree, order ) } ) )
+		diff  = np.linalg.norm( sc.states[ -1, :3 ] - reference.states[ -1, :3 ] )
+		print( f'{degree:>3}x{order:<3} {dt * 1e6:>10.1f} {sc.ode_sol.nfev:>6}'
+			   f' {diff:>23.3e}' )
@@ -0,0 +1,83 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Long arc propagation benchmark: LSODA vs 8th order Gauss-Jackson
+and Yoshida 8th order symplectic integrators on a 5 year
+Sun-centered arc
+'''
+
+# Python standard libraries
+import time
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from Spacecraft import Spacecraft as SC
+import orbit_calculations as oc
+import planetary_data     as pd
+import spice_data         as sd
+
+def propagate( config ):
+	start = time.perf_counter()
+	sc    = SC( config )
+	return sc, time.perf_counter() - start
+
+def energies( states ):
+	return np.linalg.norm( states[ :, 3:6 ], axis = 1 ) ** 2 / 2.0 -\
+		pd.sun[ 'mu' ] / np.linalg.norm( states[ :, :3 ], axis = 1 )
+
+if __name__ == '__main__':
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	base_config = {
+		'cb'         : pd.sun,
+		'frame'      : 'ECLIPJ2000',
+		'date0'      : '1977-09-01',
+		'coes'       : [ 2.0e8, 0.05, 3.0, 30.0, 40.0, 0.0 ],
+		'tspan'      : 5 * 365.25 * 86400.0,
+		'print_stop' : False,
+		'verbose'    : False
+	}
+	period = oc.state2period(
+		oc.coes2state( base_config[ 'coes' ], pd.sun[ 'mu' ] ), pd.sun[ 'mu' ] )
+
+	for name, orbit_perts in [ ( 'two-body', {} ),
+		( 'two-body+Jupiter', { 'n_bodies': [ pd.jupiter ] } ) ]:
+		config = dict( base_config, orbit_perts = orbit_perts,
+			ephemeris_tables = True )
+
+		reference, _ = propagate( dict( config,
+			propagator = 'DOP853', rtol = 1e-13, atol = 1e-6 ) )
+		r_ref = reference.states[ -1, :3 ]
+
+		print( f'\n{name}, 5 years, {period / 86400.0:.0f} day period' )
+		print( f'{"propagator":<27} {"time (s)":>9} {"nfev":>8}'
+			   f' {"final pos err (km)":>19} {"energy drift":>13}' )
+
+		runs = [ ( f'LSODA rtol={tol:.0e}', dict( config,
+			propagator = 'LSODA', rtol = tol, atol = 1e-6 ) )
+			for tol in [ 1e-9, 1e-11, 1e-13 ] ]
+		runs += [ ( f'gauss_jackson {n} steps/rev', dict( config,
+			propagator = 'gauss_jackson', dt = period / n ) )
+			for n in [ 50, 100, 200 ] ]
+		runs += [ ( f'yoshida8 {n} steps/rev', dict( config,
+			propagator = 'yoshida8', dt = period / n ) )
+			for n in [ 50, 100, 200 ] ]
+
+		for label, run_config in runs:
+			sc, dt = propagate( run_config )
+			err    = np.linalg.norm( sc.states[ -1, :3 ] - r_ref )
+			'''
+			Two-body energy is only conserved without perturbations
+			'''
+			drift  = '-'
+			if not orbit_perts:
+				es    = energies( sc.states )
+				drift = f'{np.abs( ( es - es[ 0 ] ) / es[ 0 ] ).max():.2e}'
+			print( f'{label:<27} {dt:>9.3f} {sc.ode_sol.nfev:>8}'
+				   f' {err:>19.3e} {drift:>13}' )
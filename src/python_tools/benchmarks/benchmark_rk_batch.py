@@ -0,0 +1,57 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Adaptive Runge-Kutta benchmark: native ode_tools integrators
+on a batch of states vs solve_ivp once per state
+'''
+
+# Python standard libraries
+import time
+
+# 3rd party libraries
+import numpy as np
+from scipy.integrate import solve_ivp
+
+# AWP library
+import ode_tools          as ot
+import orbit_calculations as oc
+import planetary_data     as pd
+
+METHODS = { 'dopri5': 'RK45', 'dop853': 'DOP853' }
+
+def two_body_batch( t, states ):
+	rs    = states[ :, :3 ]
+	norms = np.linalg.norm( rs, axis = 1 )
+	return np.hstack( ( states[ :, 3: ],
+		-pd.earth[ 'mu' ] * rs / norms[ :, None ] ** 3 ) )
+
+def make_states( n_states ):
+	return np.array( [ oc.coes2state( [
+		pd.earth[ 'radius' ] + 500.0 + 50.0 * n, 0.01, 10.0 + n, 0.0, 0.0, n ],
+		mu = pd.earth[ 'mu' ] ) for n in range( n_states ) ] )
+
+if __name__ == '__main__':
+	tspan = 86400.0
+	tol   = 1e-10
+	print( f'{"method":<8} {"N":>5} {"solve_ivp loop (s)":>19}'
+		   f' {"native batch (s)":>17} {"speedup":>8}' )
+
+	for method, ivp_method in METHODS.items():
+		for n_states in [ 1, 10, 100 ]:
+			states0 = make_states( n_states )
+
+			start = time.perf_counter()
+			for state0 in states0:
+				solve_ivp( oc.two_body_ode, ( 0, tspan ), state0,
+					method = ivp_method, rtol = tol, atol = tol )
+			t_ivp = time.perf_counter() - start
+
+			start = time.perf_counter()
+			ot.solve_rk( two_body_batch, ( 0, tspan ), states0,
+				{ 'method': method, 'rtol': tol, 'atol': tol } )
+			t_rk = time.perf_counter() - start
+
+			print( f'{method:<8} {n_states:>5} {t_ivp:>19.3f}'
+				   f' {t_rk:>17.3f} {t_ivp / t_rk:>8.1f}' )
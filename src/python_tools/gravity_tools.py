@@ -0,0 +1,194 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Spherical Harmonic Gravity Field Library
+'''
+
+# Python standard libraries
+import os
+import math
+
+# 3rd party libraries
+import numpy as np
+try:
+	from scipy.special import assoc_legendre_p_all
+except ImportError:
+	assoc_legendre_p_all = None
+
+EGM96_FILE = os.path.join(
+	os.path.dirname( os.path.realpath( __file__ ) ),
+	os.path.join( '..', '..', 'data', 'earth_data', 'egm96_to36.txt' )
+	)
+
+'''
+Coefficient files are fully normalized ( n, m, Cbar, Sbar ) tables.
+The gravitational parameter and reference radius of the model are
+used for the harmonic terms, since the coefficients are scaled by them
+'''
+gravity_models = {
+	'Earth': {
+		'filename'  : EGM96_FILE,
+		'mu'        : 398600.4415,
+		'radius'    : 6378.1363,
+		'max_degree': 36
+	}
+}
+
+coefficients_cache = {}
+
+def load_coefficients( filename, max_degree ):
+	'''
+	Read a fully normalized coefficients file and return unnormalized
+	C and S arrays, shape ( max_degree + 1, max_degree + 1 ).
+	Files are only read once per process
+	'''
+	key = ( filename, max_degree )
+	if key in coefficients_cache:
+		return coefficients_cache[ key ]
+
+	data = np.loadtxt( filename, comments = '#' )
+	data = data[ data[ :, 0 ] <= max_degree ]
+	ns   = data[ :, 0 ].astype( int ).tolist()
+	ms   = data[ :, 1 ].astype( int ).tolist()
+	C    = np.zeros( ( max_degree + 1, max_degree + 1 ) )
+	S    = np.zeros( ( max_degree + 1, max_degree + 1 ) )
+
+	for n, m, Cbar, Sbar in zip( ns, ms, data[ :, 2 ], data[ :, 3 ] ):
+		norm = math.sqrt( ( 2 - ( m == 0 ) ) * ( 2 * n + 1 ) *\
+			math.factorial( n - m ) / math.factorial( n + m ) )
+		C[ n, m ] = norm * Cbar
+		S[ n, m ] = norm * Sbar
+
+	coefficients_cache[ key ] = C, S
+	return C, S
+
+def calc_legendre_recursion( degree, order, u ):
+	'''
+	Unnormalized associated Legendre functions P_nm( u ) without the
+	Condon-Shortley phase, shape ( degree + 1, order + 1 ), using the
+	standard recursion over degree (vectorized over order)
+	'''
+	P  = np.zeros( ( degree + 1, order + 1 ) )
+	ms = np.arange( order + 1 )
+	P[ ms, ms ] = np.cumprod( np.maximum( 2.0 * ms - 1.0, 1.0 ) ) *\
+		( 1.0 - u * u ) ** ( 0.5 * ms )
+
+	for n in range( 1, degree + 1 ):
+		m = ms[ :min( n, order + 1 ) ]
+		P[ n, m ] = ( ( 2 * n - 1 ) * u * P[ n - 1, m ] -
+			( n + m - 1 ) * ( P[ n - 2, m ] if n > 1 else 0.0 ) ) / ( n - m )
+	return P
+
+def calc_legendre( degree, order, u ):
+	'''
+	Same as calc_legendre_recursion, using SciPy's compiled recursion
+	when it is available (SciPy >= 1.15)
+	'''
+	if assoc_legendre_p_all is None:
+		return calc_legendre_recursion( degree, order, u )
+
+	P = assoc_legendre_p_all( degree, order, u )[ 0 ][ :, :order + 1 ]
+	P[ :, 1::2 ] *= -1.0
+	return P
+
+class GravityField:
+	'''
+	Spherical harmonic gravity field truncated to ( degree, order ),
+	in body-fixed coordinates. Accelerations are calculated from the
+	Cunningham V, W functions (Montenbruck & Gill, Satellite Orbits, 3.2),
+	held in one complex buffer ( V + iW ) that is filled from the
+	associated Legendre functions of the sine of latitude. The sum over
+	all ( n, m ) terms is three complex dot products with weights
+	calculated once here
+	'''
+	def __init__( self, degree, order, model = None ):
+		if model is None:
+			model = gravity_models[ 'Earth' ]
+
+		if degree > model[ 'max_degree' ]:
+			raise RuntimeError( f'Gravity field degree {degree} is larger '
+				f'than the model maximum ({model[ "max_degree" ]}).' )
+
+		if order > degree:
+			raise RuntimeError(
+				'Gravity field order can not be larger than degree.' )
+
+		self.degree = degree
+		self.order  = order
+		self.mu     = model[ 'mu' ]
+		self.radius = model[ 'radius' ]
+
+		C, S = load_coefficients( model[ 'filename' ], model[ 'max_degree' ] )
+		C    = C[ :degree + 1, :order + 1 ].copy()
+		S    = S[ :degree + 1, :order + 1 ].copy()
+		C[ :2 ] = 0.0
+		S[ :2 ] = 0.0
+
+		'''
+		The accelerations of degree n use V and W of degree n + 1
+		and order m + 1
+		'''
+		self.n_V    = degree + 2
+		self.m_V    = order  + 2
+		self.VW     = np.zeros( ( self.n_V, self.m_V ), dtype = complex )
+		self.radial = np.zeros( self.n_V )
+		self.phase  = np.zeros( self.m_V, dtype = complex )
+		self.ns_V   = np.arange( 1, self.n_V + 1 )
+		self.ms_V   = np.arange( self.m_V )
+
+		ns, ms = np.nonzero( ( C != 0.0 ) | ( S != 0.0 ) )
+		D      = C[ ns, ms ] - 1j * S[ ns, ms ]
+		half   = np.where( ms == 0, 1.0, 0.5 )
+		f      = np.where( ms == 0, 0.0,
+			( ns - ms + 2.0 ) * ( ns - ms + 1.0 ) )
+
+		self.idxs_p = ( ns + 1 ) * self.m_V + ms + 1
+		self.idxs_q = ( ns + 1 ) * self.m_V + np.maximum( ms - 1, 0 )
+		self.idxs_z = ( ns + 1 ) * self.m_V + ms
+		self.idxs_u = ns * self.m_V + ms
+		self.w_p    = half * D
+		self.w_q    = half * f * D
+		self.w_z    = ( ns - ms + 1.0 ) * D
+		self.w_u    = D
+
+	def calc_VW( self, r ):
+		'''
+		Fill the V + iW buffer for a body-fixed position, where
+		V_nm + iW_nm = ( R / r ) ^ ( n + 1 ) * P_nm( sin( lat ) ) * e ^ ( i m lon )
+		'''
+		x, y, z = r
+		norm_r  = math.sqrt( x * x + y * y + z * z )
+		lon     = math.atan2( y, x )
+
+		P = calc_legendre( self.n_V - 1, self.m_V - 1, z / norm_r )
+		np.power( self.radius / norm_r, self.ns_V, out = self.radial )
+		np.power( complex( math.cos( lon ), math.sin( lon ) ), self.ms_V,
+			out = self.phase )
+		np.multiply( self.radial[ :, None ] * P, self.phase, out = self.VW )
+		return self.VW
+
+	def calc_accel( self, r ):
+		'''
+		Acceleration due to the non-spherical terms of the field
+		at a body-fixed position
+		'''
+		VW = self.calc_VW( r ).ravel()
+		sp = self.w_p @ VW[ self.idxs_p ]
+		sq = self.w_q @ VW[ self.idxs_q ]
+		sz = self.w_z @ VW[ self.idxs_z ]
+		k  = self.mu / self.radius ** 2
+
+		return k * np.array( [
+			-sp.real + sq.real,
+			-sp.imag - sq.imag,
+			-sz.real ] )
+
+	def calc_potential( self, r ):
+		'''
+		Potential of the non-spherical terms of the field
+		at a body-fixed position
+		'''
+		VW = self.calc_VW( r ).ravel()
+		return self.mu / self.radius * ( self.w_u @ VW[ self.idxs_u ] ).real
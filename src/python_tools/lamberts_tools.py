@@ -86,6 +86,253 @@ def lamberts_universal_variables( r0, r1, deltat, args ):
 
 	return v0, v1
 
+def lamberts_universal_variables_array( r0s, r1s, deltats, args = {} ):
+	'''
+	Vectorized lamberts_universal_variables for N problems,
+	r0s and r1s of shape ( N, 3 ) and deltats of shape ( N, ).
+	Bisection runs on all problems together, only updating the ones
+	that haven't converged yet. "tm" and "psi" (initial guess) can be
+	scalars or ( N, ) arrays. Instead of raising RuntimeWarning,
+	failures ( Hohmann transfers or no convergence ) are reported per
+	problem in the returned solved mask, with nan velocities
+	'''
+	_args = {
+		'tm'       : 1,
+		'mu'       : pd.sun[ 'mu' ],
+		'tol'      : 1e-6,
+		'max_steps': 200,
+		'psi'      : 0.0,
+		'psi_u'    :  4.0 * math.pi ** 2,
+		'psi_l'    : -4.0 * math.pi ** 2,
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	r0s     = np.asarray( r0s,     dtype = float ).reshape( -1, 3 )
+	r1s     = np.asarray( r1s,     dtype = float ).reshape( -1, 3 )
+	deltats = np.asarray( deltats, dtype = float ).reshape( -1 )
+	n_probs = deltats.shape[ 0 ]
+	psi     = np.full( n_probs, _args[ 'psi' ], dtype = float )
+	psi_l   = np.full( n_probs, _args[ 'psi_l' ], dtype = float )
+	psi_u   = np.full( n_probs, _args[ 'psi_u' ], dtype = float )
+
+	sqrt_mu = math.sqrt( _args[ 'mu' ] )
+	r0_norm = np.linalg.norm( r0s, axis = 1 )
+	r1_norm = np.linalg.norm( r1s, axis = 1 )
+	gamma   = np.sum( r0s * r1s, axis = 1 ) / r0_norm / r1_norm
+	A       = _args[ 'tm' ] * np.sqrt(
+		r0_norm * r1_norm * np.maximum( 1 + gamma, 0.0 ) )
+	A       = np.broadcast_to( A, ( n_probs, ) )
+	c2      = C2_array( psi )
+	c3      = C3_array( psi )
+	B       = np.zeros( n_probs )
+	solved  = np.zeros( n_probs, dtype = bool )
+	active  = A != 0.0
+
+	for n in range( _args[ 'max_steps' ] ):
+		if not np.any( active ):
+			break
+
+		_A = A[ active ]
+		_B = r0_norm[ active ] + r1_norm[ active ] +\
+			_A * ( psi[ active ] * c3[ active ] - 1 ) / np.sqrt( c2[ active ] )
+
+		flip = ( _A > 0.0 ) & ( _B < 0.0 )
+		_psi_l = psi_l[ active ]
+		_psi_l[ flip ] += math.pi
+		_B[ flip ]     *= -1.0
+
+		'''
+		Negative B (only possible when tm = -1) has no solution
+		at this psi, so it is treated as too long a time of flight
+		'''
+		chi3    = np.sqrt( np.abs( _B ) / c2[ active ] ) ** 3
+		deltat_ = np.where( _B < 0.0, np.inf,
+			( chi3 * c3[ active ] + _A * np.sqrt( np.abs( _B ) ) ) / sqrt_mu )
+
+		B[ active ] = _B
+		converged   = np.abs( deltats[ active ] - deltat_ ) < _args[ 'tol' ]
+		lower       = deltat_ <= deltats[ active ]
+		_psi        = psi[ active ]
+		_psi_u      = psi_u[ active ]
+		_psi_l      = np.where( lower, _psi, _psi_l )
+		_psi_u      = np.where( lower, _psi_u, _psi )
+
+		idxs = np.where( active )[ 0 ]
+		solved[ idxs[ converged ] ] = True
+		idxs   = idxs[ ~converged ]
+		_psi_l = _psi_l[ ~converged ]
+		_psi_u = _psi_u[ ~converged ]
+		_psi   = ( _psi_u + _psi_l ) / 2.0
+
+		psi_l[ idxs ] = _psi_l
+		psi_u[ idxs ] = _psi_u
+		psi[   idxs ] = _psi
+		c2[    idxs ] = C2_array( _psi )
+		c3[    idxs ] = C3_array( _psi )
+		active[ :   ] = False
+		active[ idxs ] = True
+
+	v0s = np.full( ( n_probs, 3 ), np.nan )
+	v1s = np.full( ( n_probs, 3 ), np.nan )
+	f    = 1 - B[ solved ] / r0_norm[ solved ]
+	g    = A[ solved ] * np.sqrt( B[ solved ] / _args[ 'mu' ] )
+	gdot = 1 - B[ solved ] / r1_norm[ solved ]
+	v0s[ solved ] = ( r1s[ solved ] - f[ :, None ] * r0s[ solved ] ) / g[ :, None ]
+	v1s[ solved ] = ( gdot[ :, None ] * r1s[ solved ] - r0s[ solved ] ) / g[ :, None ]
+
+	return v0s, v1s, solved
+
+def lamberts_uv_secant( r0_norm, r1_norm, A, deltat, psi, psi_l, psi_u,
+	slope = None, args = {} ):
+	'''
+	Universal variables time of flight equation solved for psi with
+	secant steps, falling back to bisection whenever a step leaves the
+	[ psi_l, psi_u ] bracket. slope ( dt / dpsi, e.g. from a neighboring
+	problem ) gives the first secant step. A step that doesn't change
+	psi only counts as converged if the residual is within "rtol" of
+	deltat, otherwise bisection is used. Returns psi, B, the final
+	slope, the number of time of flight evaluations and whether it
+	converged
+	'''
+	_args = {
+		'mu'       : pd.sun[ 'mu' ],
+		'tol'      : 1e-6,
+		'rtol'     : 1e-10,
+		'max_steps': 200
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+	sqrt_mu = math.sqrt( _args[ 'mu' ] )
+
+	def tof_residual( psi ):
+		c2, c3 = stumpffs( psi )
+		B      = r0_norm + r1_norm + A * ( psi * c3 - 1 ) / math.sqrt( c2 )
+		if B < 0.0:
+			return B, -math.inf if A > 0.0 else math.inf
+		return B, ( math.sqrt( B / c2 ) ** 3 * c3 +
+			A * math.sqrt( B ) ) / sqrt_mu - deltat
+
+	psi0     = min( max( psi, psi_l ), psi_u )
+	B, f0    = tof_residual( psi0 )
+	psi1, f1 = psi0, f0
+	for n in range( 1, _args[ 'max_steps' ] + 1 ):
+		if abs( f1 ) < _args[ 'tol' ]:
+			return psi1, B, slope, n, True
+
+		if f1 < 0.0:
+			psi_l = psi1
+		else:
+			psi_u = psi1
+
+		if slope is None or slope <= 0.0 or not math.isfinite( f1 ):
+			psi = ( psi_l + psi_u ) / 2.0
+		else:
+			psi = psi1 - f1 / slope
+
+			'''
+			Steep time of flight curves can need psi resolution below
+			floating point precision to meet tol, so a step that
+			doesn't change psi counts as converged if the residual is
+			small relative to deltat ( a stale slope can also give
+			steps that round to zero far from the root )
+			'''
+			if psi == psi1 and abs( f1 ) <= _args[ 'rtol' ] * deltat:
+				return psi1, B, slope, n, True
+			if psi == psi1 or not psi_l < psi < psi_u:
+				psi = ( psi_l + psi_u ) / 2.0
+
+		if psi == psi1:
+			return psi1, B, slope, n, False
+
+		psi0, f0 = psi1, f1
+		B, f1    = tof_residual( psi )
+		psi1     = psi
+		if math.isfinite( f0 ) and math.isfinite( f1 ) and psi1 != psi0:
+			slope = ( f1 - f0 ) / ( psi1 - psi0 )
+
+	return psi1, B, slope, n, False
+
+def lamberts_sweep( r0s, r1s, deltats, args = {} ):
+	'''
+	Universal variables Lambert solutions over a 1D sweep ( N, ) or a
+	2D grid ( N, M ) of problems ( r0s and r1s with a trailing axis of
+	3 ). The grid is walked in serpentine order, so every problem
+	follows a neighbor, and with "warm_start" each solve starts from the
+	neighbor's converged psi and dt / dpsi slope inside a bracket of
+	+-"bracket" around it ( lamberts_uv_secant ), retrying with the full
+	bracket if that fails. Returns v0s, v1s, the number of time of
+	flight evaluations per problem and the solved mask, in the shape
+	of deltats ( nan velocities where not solved )
+	'''
+	_args = {
+		'tm'        : 1,
+		'mu'        : pd.sun[ 'mu' ],
+		'tol'       : 1e-6,
+		'max_steps' : 200,
+		'psi_u'     :  4.0 * math.pi ** 2,
+		'psi_l'     : -4.0 * math.pi ** 2,
+		'warm_start': True,
+		'bracket'   : 1.0
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	deltats = np.asarray( deltats, dtype = float )
+	shape   = deltats.shape
+	grid    = deltats.reshape( shape[ 0 ], -1 )
+	r0s     = np.asarray( r0s, dtype = float ).reshape( grid.shape + ( 3, ) )
+	r1s     = np.asarray( r1s, dtype = float ).reshape( grid.shape + ( 3, ) )
+	tms     = np.broadcast_to( _args[ 'tm' ], shape ).reshape( grid.shape )
+	v0s     = np.full( grid.shape + ( 3, ), np.nan )
+	v1s     = np.full( grid.shape + ( 3, ), np.nan )
+	steps   = np.zeros( grid.shape, dtype = int )
+	solved  = np.zeros( grid.shape, dtype = bool )
+	psi     = None
+	slope   = None
+
+	for i in range( grid.shape[ 0 ] ):
+		cols = range( grid.shape[ 1 ] ) if i % 2 == 0 else\
+			range( grid.shape[ 1 ] - 1, -1, -1 )
+		for j in cols:
+			r0, r1  = r0s[ i, j ], r1s[ i, j ]
+			r0_norm = nt.norm( r0 )
+			r1_norm = nt.norm( r1 )
+			gamma   = np.dot( r0, r1 ) / r0_norm / r1_norm
+			A       = tms[ i, j ] * math.sqrt(
+				r0_norm * r1_norm * max( 1 + gamma, 0.0 ) )
+			if A == 0.0 or not grid[ i, j ] > 0.0:
+				continue
+
+			n_steps = 0
+			ok      = False
+			if _args[ 'warm_start' ] and psi is not None:
+				_psi, B, _slope, n_steps, ok = lamberts_uv_secant(
+					r0_norm, r1_norm, A, grid[ i, j ], psi,
+					max( psi - _args[ 'bracket' ], _args[ 'psi_l' ] ),
+					min( psi + _args[ 'bracket' ], _args[ 'psi_u' ] ),
+					slope, _args )
+			if not ok:
+				_psi, B, _slope, n, ok = lamberts_uv_secant(
+					r0_norm, r1_norm, A, grid[ i, j ], 0.0,
+					_args[ 'psi_l' ], _args[ 'psi_u' ], None, _args )
+				n_steps += n
+
+			steps[ i, j ] = n_steps
+			if not ok:
+				continue
+
+			psi, slope      = _psi, _slope
+			solved[ i, j ]  = True
+			f               = 1 - B / r0_norm
+			g               = A * math.sqrt( B / _args[ 'mu' ] )
+			gdot            = 1 - B / r1_norm
+			v0s[ i, j ]     = ( r1 - f * r0 ) / g
+			v1s[ i, j ]     = ( gdot * r1 - r0 ) / g
+
+	return v0s.reshape( shape + ( 3, ) ), v1s.reshape( shape + ( 3, ) ),\
+		steps.reshape( shape ), solved.reshape( shape )
+
 def C2( psi ):
 	'''
 	Stumpff function
@@ -98,3 +345,300 @@ def C3( psi ):
 	'''
 	sqrt_psi = math.sqrt( psi )
 	return ( sqrt_psi - math.sin( sqrt_psi ) ) / ( psi * sqrt_psi )
+
+def C2_array( psi ):
+	'''
+	Stumpff function, vectorized and valid for positive,
+	negative and zero psi
+	'''
+	psi   = np.asarray( psi, dtype = float )
+	c2    = np.empty( psi.shape )
+	small = np.abs( psi ) < 1.0
+	pos   = psi >=  1.0
+	neg   = psi <= -1.0
+
+	'''
+	Series expansion for small psi avoids cancellation in the
+	closed form expressions
+	'''
+	ps        = psi[ small ]
+	series    = np.zeros( ps.shape )
+	for k in range( 11, -1, -1 ):
+		series = 1.0 / math.factorial( 2 * k + 2 ) - ps * series
+	c2[ small ] = series
+
+	c2[ pos ] = 2.0 * np.sin( 0.5 * np.sqrt(  psi[ pos ] ) ) ** 2 / psi[ pos ]
+	c2[ neg ] = 2.0 * np.sinh( 0.5 * np.sqrt( -psi[ neg ] ) ) ** 2 / -psi[ neg ]
+	return c2
+
+def C3_array( psi ):
+	'''
+	Stumpff function, vectorized and valid for positive,
+	negative and zero psi
+	'''
+	psi   = np.asarray( psi, dtype = float )
+	c3    = np.empty( psi.shape )
+	small = np.abs( psi ) < 1.0
+	pos   = psi >=  1.0
+	neg   = psi <= -1.0
+
+	ps        = psi[ small ]
+	series    = np.zeros( ps.shape )
+	for k in range( 11, -1, -1 ):
+		series = 1.0 / math.factorial( 2 * k + 3 ) - ps * series
+	c3[ small ] = series
+
+	sqrt_psi  = np.sqrt( psi[ pos ] )
+	c3[ pos ] = ( sqrt_psi - np.sin( sqrt_psi ) ) / ( psi[ pos ] * sqrt_psi )
+	sqrt_psi  = np.sqrt( -psi[ neg ] )
+	c3[ neg ] = ( np.sinh( sqrt_psi ) - sqrt_psi ) / ( -psi[ neg ] * sqrt_psi )
+	return c3
+
+C2_SERIES = [ 1.0 / math.factorial( 2 * k + 2 ) for k in range( 12 ) ]
+C3_SERIES = [ 1.0 / math.factorial( 2 * k + 3 ) for k in range( 12 ) ]
+
+def stumpffs( psi ):
+	'''
+	Stumpff functions C2 and C3 of a single psi, valid for positive,
+	negative and zero psi (scalar version of C2_array and C3_array)
+	'''
+	if abs( psi ) < 1.0:
+		c2 = c3 = 0.0
+		for k in range( 11, -1, -1 ):
+			c2 = C2_SERIES[ k ] - psi * c2
+			c3 = C3_SERIES[ k ] - psi * c3
+		return c2, c3
+
+	if psi > 0:
+		sqrt_psi = math.sqrt( psi )
+		return 2.0 * math.sin( 0.5 * sqrt_psi ) ** 2 / psi,\
+			( sqrt_psi - math.sin( sqrt_psi ) ) / ( psi * sqrt_psi )
+
+	sqrt_psi = math.sqrt( -psi )
+	return 2.0 * math.sinh( 0.5 * sqrt_psi ) ** 2 / -psi,\
+		( math.sinh( sqrt_psi ) - sqrt_psi ) / ( -psi * sqrt_psi )
+
+C4_SERIES = [ 1.0 / math.factorial( 2 * k + 4 ) for k in range( 12 ) ]
+C5_SERIES = [ 1.0 / math.factorial( 2 * k + 5 ) for k in range( 12 ) ]
+
+def stumpffs45( psi ):
+	'''
+	Higher order Stumpff functions C4 = ( 1 / 2 - C2 ) / psi and
+	C5 = ( 1 / 6 - C3 ) / psi of a single psi, valid for positive,
+	negative and zero psi
+	'''
+	if abs( psi ) < 1.0:
+		c4 = c5 = 0.0
+		for k in range( 11, -1, -1 ):
+			c4 = C4_SERIES[ k ] - psi * c4
+			c5 = C5_SERIES[ k ] - psi * c5
+		return c4, c5
+
+	c2, c3 = stumpffs( psi )
+	return ( 0.5 - c2 ) / psi, ( 1 / 6.0 - c3 ) / psi
+
+def lamberts_izzo( r0, r1, deltat, args = {} ):
+	'''
+	Solve Lambert's problem using Izzo's algorithm (Izzo, Revisiting
+	Lambert's Problem, 2015), with Householder iterations on x and
+	multiple revolution ( "M" ) solutions on the "left" or "right" branch.
+	"tm" is 1 for the short way ( transfer angle below 180 degrees )
+	and -1 for the long way, as in lamberts_universal_variables
+	'''
+	_args = {
+		'tm'       : 1,
+		'mu'       : pd.sun[ 'mu' ],
+		'M'        : 0,
+		'branch'   : 'left',
+		'tol'      : 1e-11,
+		'max_steps': 35
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	'''
+	Geometry on plain floats, since small NumPy operations
+	would cost more than the Householder iterations
+	'''
+	x0, y0, z0 = float( r0[ 0 ] ), float( r0[ 1 ] ), float( r0[ 2 ] )
+	x1, y1, z1 = float( r1[ 0 ] ), float( r1[ 1 ] ), float( r1[ 2 ] )
+	mu      = _args[ 'mu' ]
+	r0_norm = math.sqrt( x0 * x0 + y0 * y0 + z0 * z0 )
+	r1_norm = math.sqrt( x1 * x1 + y1 * y1 + z1 * z1 )
+	c       = math.sqrt( ( x1 - x0 ) ** 2 + ( y1 - y0 ) ** 2 + ( z1 - z0 ) ** 2 )
+	s       = ( r0_norm + r1_norm + c ) / 2.0
+	hx      = y0 * z1 - z0 * y1
+	hy      = z0 * x1 - x0 * z1
+	hz      = x0 * y1 - y0 * x1
+	h_norm  = math.sqrt( hx * hx + hy * hy + hz * hz )
+
+	if h_norm == 0.0:
+		raise RuntimeWarning(
+			'Izzo solution was passed in Hohmann transfer' )
+
+	hx, hy, hz = ( hx, hy, hz ) if _args[ 'tm' ] > 0 else ( -hx, -hy, -hz )
+	ll  = _args[ 'tm' ] * math.sqrt( max( 1.0 - c / s, 0.0 ) )
+	T   = math.sqrt( 2.0 * mu / s ** 3 ) * deltat
+
+	x, steps = izzo_find_x( ll, T, _args[ 'M' ], _args[ 'branch' ], _args )
+	y        = izzo_y( x, ll )
+
+	gamma = math.sqrt( mu * s / 2.0 )
+	rho   = ( r0_norm - r1_norm ) / c
+	sigma = math.sqrt( 1.0 - rho * rho )
+	vr0   =  gamma * ( ( ll * y - x ) - rho * ( ll * y + x ) ) / r0_norm
+	vr1   = -gamma * ( ( ll * y - x ) + rho * ( ll * y + x ) ) / r1_norm
+	vt0   =  gamma * sigma * ( y + ll * x ) / r0_norm
+	vt1   =  gamma * sigma * ( y + ll * x ) / r1_norm
+
+	'''
+	Radial and transverse ( h_hat x r_hat ) components
+	'''
+	a0 = vr0 / r0_norm
+	b0 = vt0 / ( r0_norm * h_norm )
+	a1 = vr1 / r1_norm
+	b1 = vt1 / ( r1_norm * h_norm )
+	v0 = np.array( [
+		a0 * x0 + b0 * ( hy * z0 - hz * y0 ),
+		a0 * y0 + b0 * ( hz * x0 - hx * z0 ),
+		a0 * z0 + b0 * ( hx * y0 - hy * x0 ) ] )
+	v1 = np.array( [
+		a1 * x1 + b1 * ( hy * z1 - hz * y1 ),
+		a1 * y1 + b1 * ( hz * x1 - hx * z1 ),
+		a1 * z1 + b1 * ( hx * y1 - hy * x1 ) ] )
+
+	return v0, v1
+
+def izzo_find_x( ll, T, M, branch = 'left', args = {} ):
+	'''
+	Solve Izzo's non-dimensional time of flight equation T( x ) = T
+	for x with Householder iterations, returning x and the number of
+	iterations. Raises ValueError if there is no M revolution solution
+	'''
+	_args = {
+		'tol'      : 1e-11,
+		'max_steps': 35
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	M_max = math.floor( T / math.pi )
+	T_00  = math.acos( ll ) + ll * math.sqrt( 1.0 - ll * ll )
+	if M_max > 0 and T < T_00 + M_max * math.pi:
+		if T < izzo_T_min( ll, M_max, _args ):
+			M_max -= 1
+
+	if M > M_max:
+		raise ValueError(
+			f'No {M} revolution Lambert solution for this time of flight' )
+
+	'''
+	Initial guesses (Izzo, eq. 30 and 31)
+	'''
+	if M == 0:
+		T_1 = 2.0 * ( 1.0 - ll ** 3 ) / 3.0
+		if T >= T_00:
+			x = ( T_00 / T ) ** ( 2.0 / 3.0 ) - 1.0
+		elif T < T_1:
+			x = 2.5 * T_1 / T * ( T_1 - T ) / ( 1.0 - ll ** 5 ) + 1.0
+		else:
+			x = ( T_00 / T ) ** math.log2( T_1 / T_00 ) - 1.0
+	else:
+		xl = ( ( M * math.pi + math.pi ) / ( 8.0 * T ) ) ** ( 2.0 / 3.0 )
+		xr = ( ( 8.0 * T ) / ( M * math.pi ) ) ** ( 2.0 / 3.0 )
+		xl = ( xl - 1.0 ) / ( xl + 1.0 )
+		xr = ( xr - 1.0 ) / ( xr + 1.0 )
+		x  = max( xl, xr ) if branch == 'left' else min( xl, xr )
+
+	for n in range( 1, _args[ 'max_steps' ] + 1 ):
+		y          = izzo_y( x, ll )
+		_T         = izzo_tof( x, y, ll, M )
+		d1, d2, d3 = izzo_tof_derivatives( x, y, _T, ll )
+		f          = _T - T
+		delta      = f * ( d1 * d1 - f * d2 / 2.0 ) /\
+			( d1 * ( d1 * d1 - f * d2 ) + d3 * f * f / 6.0 )
+		x         -= delta
+		if abs( delta ) < _args[ 'tol' ]:
+			return x, n
+
+	raise RuntimeError( 'Izzo Lambert solver did not converge.' )
+
+def izzo_T_min( ll, M, args = {} ):
+	'''
+	Minimum non-dimensional time of flight of M revolution
+	solutions, from Halley iterations on dT / dx = 0
+	'''
+	_args = {
+		'tol'      : 1e-11,
+		'max_steps': 35
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	if ll == 1.0:
+		return izzo_tof( 0.0, izzo_y( 0.0, ll ), ll, M )
+
+	x = 0.1
+	for n in range( _args[ 'max_steps' ] ):
+		y          = izzo_y( x, ll )
+		T          = izzo_tof( x, y, ll, M )
+		d1, d2, d3 = izzo_tof_derivatives( x, y, T, ll )
+		delta      = 2.0 * d1 * d2 / ( 2.0 * d2 * d2 - d1 * d3 )
+		x         -= delta
+		if abs( delta ) < _args[ 'tol' ]:
+			break
+
+	return izzo_tof( x, izzo_y( x, ll ), ll, M )
+
+def izzo_y( x, ll ):
+	return math.sqrt( 1.0 - ll * ll * ( 1.0 - x * x ) )
+
+def izzo_tof( x, y, ll, M ):
+	'''
+	Non-dimensional time of flight as a function of x, using Battin's
+	hypergeometric series close to the parabolic case ( x = 1 )
+	'''
+	if M == 0 and math.sqrt( 0.6 ) < x < math.sqrt( 1.4 ):
+		eta = y - ll * x
+		S1  = ( 1.0 - ll - x * eta ) * 0.5
+		Q   = 4.0 / 3.0 * hyp2f1b( S1 )
+		return ( eta ** 3 * Q + 4.0 * ll * eta ) * 0.5
+
+	if x < 1.0:
+		psi = math.acos( min( max( x * y + ll * ( 1.0 - x * x ), -1.0 ), 1.0 ) )
+	else:
+		psi = math.asinh( ( y - x * ll ) * math.sqrt( x * x - 1.0 ) )
+
+	return ( ( psi + M * math.pi ) / math.sqrt( abs( 1.0 - x * x ) ) -
+		x + ll * y ) / ( 1.0 - x * x )
+
+def izzo_tof_derivatives( x, y, T, ll ):
+	'''
+	First three derivatives of the non-dimensional time of flight
+	w.r.t. x (Izzo, eq. 22)
+	'''
+	omx2 = 1.0 - x * x
+	l2   = ll * ll
+	d1   = ( 3.0 * T * x - 2.0 + 2.0 * ll ** 3 * x / y ) / omx2
+	d2   = ( 3.0 * T + 5.0 * x * d1 + 2.0 * ( 1.0 - l2 ) * ll ** 3 / y ** 3 ) / omx2
+	d3   = ( 7.0 * x * d2 + 8.0 * d1 -
+		6.0 * ( 1.0 - l2 ) * ll ** 5 * x / y ** 5 ) / omx2
+	return d1, d2, d3
+
+def hyp2f1b( x ):
+	'''
+	Hypergeometric function 2F1( 3, 1, 5 / 2, x )
+	'''
+	if x >= 1.0:
+		return math.inf
+
+	res  = 1.0
+	term = 1.0
+	n    = 0
+	while True:
+		term    *= ( 3 + n ) * ( 1 + n ) / ( 2.5 + n ) * x / ( n + 1 )
+		res_old  = res
+		res     += term
+		if res_old == res:
+			return res
+		n += 1
@@ -150,11 +150,27 @@ def cart2lat( rs, frame_from = None, frame_to = None, ets = None, deg = True ):
 
 	return latlons
 
-def propagate_ode( ode, state0, tspan, dt, method = 'rk4' ):
+def propagate_ode( ode, state0, tspan, dt, method = 'rk4', args = {} ):
+	'''
+	Propagate an ODE, returning states at every dt.
+	Fixed step methods take steps of dt, while adaptive methods
+	(ode_tools.adaptive_methods) choose their own steps and
+	interpolate to the output times. State can be a single state
+	or a batch of states, shape ( N, n )
+	'''
+	ets = np.arange( 0, tspan, dt )
+
+	if method in ot.adaptive_methods:
+		_args = { 'method': method, 't_eval': ets }
+		for key in args.keys():
+			_args[ key ] = args[ key ]
+
+		sol = ot.solve_rk( ode, ( 0, ets[ -1 ] ), state0, _args )
+		return sol.t, np.moveaxis( sol.y, -1, 0 )
+
 	func        = ot.methods[ method ]
-	ets         = np.arange( 0, tspan, dt )
 	steps       = len( ets )
-	states      = np.zeros( ( steps, len( state0 ) ) )
+	states      = np.zeros( ( steps, ) + np.shape( state0 ) )
 	states[ 0 ] = state0
 
 	for step in range( steps - 1 ):
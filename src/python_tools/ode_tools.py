@@ -7,10 +7,20 @@ Ordinary Differential Equations (ODEs) Tools Library
 '''
 
 # Python standard libraries
+import math
+import functools
+from fractions import Fraction
 
 # 3rd party libraries
+import numpy as np
+from scipy.optimize import OptimizeResult
 
 # AWP library
+import rk_coefficients as rc
+
+SAFETY     = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10.0
 
 def rk4_step( f, t, y, h ):
 	'''
@@ -26,3 +36,865 @@ def rk4_step( f, t, y, h ):
 methods = {
 	'rk4': rk4_step
 }
+
+def rms_norms( x ):
+	'''
+	RMS norm of each state in a batch of states, shape ( N, n )
+	'''
+	return np.sqrt( np.mean( x * x, axis = -1 ) )
+
+def dopri5_error_norm( K, h, scale, shape ):
+	err = h * np.dot( rc.DOPRI5_E, K ).reshape( shape ) / scale
+	return rms_norms( err ).max()
+
+def dop853_error_norm( K, h, scale, shape ):
+	'''
+	Combined 5th and 3rd order error estimate from Hairer's DOP853,
+	calculated for each state in the batch
+	'''
+	K      = K[ :rc.DOP853_N_STAGES + 1 ]
+	err5   = np.dot( rc.DOP853_E5, K ).reshape( shape ) / scale
+	err3   = np.dot( rc.DOP853_E3, K ).reshape( shape ) / scale
+	err5_2 = np.sum( err5 * err5, axis = -1 )
+	err3_2 = np.sum( err3 * err3, axis = -1 )
+	denom  = err5_2 + 0.01 * err3_2
+	denom[ denom == 0 ] = 1.0
+	return ( abs( h ) * err5_2 / np.sqrt( denom * shape[ -1 ] ) ).max()
+
+def dopri5_dense( f, t, y, y_new, f_new, h, K ):
+	'''
+	Coefficients of the step's 4th order interpolant
+	'''
+	return np.dot( rc.DOPRI5_P.T, K )
+
+def dop853_dense( f, t, y, y_new, f_new, h, K ):
+	'''
+	Coefficients of the step's 7th order interpolant,
+	evaluating the 3 extra stages
+	'''
+	n_stages = rc.DOP853_N_STAGES
+	for s in range( n_stages + 1, rc.DOP853_N_STAGES_EXTENDED ):
+		dy     = h * np.dot( rc.DOP853_A[ s, :s ], K[ :s ] )
+		K[ s ] = f( t + rc.DOP853_C[ s ] * h, y + dy )
+
+	F       = np.empty( ( rc.DOP853_INTERPOLATOR_POWER, K.shape[ 1 ] ) )
+	delta_y = y_new - y
+	F[ 0 ]  = delta_y
+	F[ 1 ]  = h * K[ 0 ] - delta_y
+	F[ 2 ]  = 2 * delta_y - h * ( f_new + K[ 0 ] )
+	F[ 3: ] = h * np.dot( rc.DOP853_D, K )
+	return F
+
+def dopri5_interp( t0, h, y0, Q, t ):
+	x = ( t - t0 ) / h
+	return y0 + h * np.dot( np.array( [ x, x ** 2, x ** 3, x ** 4 ] ), Q )
+
+def dop853_interp( t0, h, y0, F, t ):
+	x = ( t - t0 ) / h
+	y = np.zeros( y0.shape )
+	for n, f in enumerate( F[ ::-1 ] ):
+		y += f
+		y *= x if n % 2 == 0 else 1 - x
+	return y0 + y
+
+def stage_coefficients( A, C, n_stages ):
+	'''
+	Non-zero part of each stage's tableau row, so the
+	step doesn't have to slice A every stage
+	'''
+	return [ ( s, A[ s, :s ], C[ s ] ) for s in range( 1, n_stages ) ]
+
+adaptive_methods = {
+	'dopri5': {
+		'order'      : 5,
+		'error_order': 4,
+		'n_stages'   : rc.DOPRI5_N_STAGES,
+		'n_K'        : rc.DOPRI5_N_STAGES + 1,
+		'A'          : rc.DOPRI5_A,
+		'B'          : rc.DOPRI5_B,
+		'C'          : rc.DOPRI5_C,
+		'stages'     : stage_coefficients(
+			rc.DOPRI5_A, rc.DOPRI5_C, rc.DOPRI5_N_STAGES ),
+		'error_norm' : dopri5_error_norm,
+		'dense'      : dopri5_dense,
+		'interp'     : dopri5_interp
+	},
+	'dop853': {
+		'order'      : 8,
+		'error_order': 7,
+		'n_stages'   : rc.DOP853_N_STAGES,
+		'n_K'        : rc.DOP853_N_STAGES_EXTENDED,
+		'A'          : rc.DOP853_A,
+		'B'          : rc.DOP853_B,
+		'C'          : rc.DOP853_C,
+		'stages'     : stage_coefficients(
+			rc.DOP853_A, rc.DOP853_C, rc.DOP853_N_STAGES ),
+		'error_norm' : dop853_error_norm,
+		'dense'      : dop853_dense,
+		'interp'     : dop853_interp
+	}
+}
+
+def rk_embedded_step( f, t, y, f0, h, method, K ):
+	'''
+	Calculate one step of an embedded Runge-Kutta method on a
+	flattened state, storing the stage derivatives in K
+	'''
+	K[ 0 ] = f0
+	for s, a, c in method[ 'stages' ]:
+		K[ s ] = f( t + c * h, y + h * np.dot( a, K[ :s ] ) )
+
+	n_stages = method[ 'n_stages' ]
+	y_new    = y + h * np.dot( method[ 'B' ], K[ :n_stages ] )
+	f_new    = f( t + h, y_new )
+	K[ n_stages ] = f_new
+	return y_new, f_new
+
+def select_initial_step( f, t0, y0, f0, direction, order, rtol, atol, shape ):
+	'''
+	Hairer's initial step size algorithm, taking the most
+	restrictive step across the states in the batch
+	'''
+	scale = ( atol + np.abs( y0 ) * rtol ).reshape( shape )
+	d0    = rms_norms( y0.reshape( shape ) / scale ).max()
+	d1    = rms_norms( f0.reshape( shape ) / scale ).max()
+	if d0 < 1e-5 or d1 < 1e-5:
+		h0 = 1e-6
+	else:
+		h0 = 0.01 * d0 / d1
+
+	y1 = y0 + h0 * direction * f0
+	f1 = f( t0 + h0 * direction, y1 )
+	d2 = rms_norms( ( f1 - f0 ).reshape( shape ) / scale ).max() / h0
+
+	if d1 <= 1e-15 and d2 <= 1e-15:
+		h1 = max( 1e-6, h0 * 1e-3 )
+	else:
+		h1 = ( 0.01 / max( d1, d2 ) ) ** ( 1.0 / ( order + 1 ) )
+
+	return min( 100 * h0, h1 )
+
+class DenseSolution:
+	'''
+	Piecewise interpolant over all of the accepted steps,
+	callable with a single time or an array of times
+	'''
+	def __init__( self, interp, shape ):
+		self.interp = interp
+		self.shape  = shape
+		self.ts     = []
+		self.steps  = []
+
+	def append( self, t0, h, y0, Q ):
+		self.ts.append( t0 )
+		self.steps.append( ( t0, h, y0, Q ) )
+
+	def __call__( self, t ):
+		ts   = np.atleast_1d( t )
+		sign = 1.0 if self.steps[ 0 ][ 1 ] > 0 else -1.0
+		idxs = np.searchsorted( sign * np.array( self.ts ), sign * ts,
+			side = 'right' ) - 1
+		idxs = np.clip( idxs, 0, len( self.steps ) - 1 )
+		ys   = np.array( [ self.interp( *self.steps[ idx ], _t )
+			for idx, _t in zip( idxs, ts ) ] )
+		ys   = np.moveaxis( ys.reshape( ( len( ts ), ) + self.shape ), 0, -1 )
+
+		if np.ndim( t ) == 0:
+			return ys[ ..., 0 ]
+		return ys
+
+def locate_event( event, interp, step, t_l, t_u, vals_l, shape ):
+	'''
+	Bisect the step interpolant for the 0 crossing of an event
+	function, for every element of the batch at once
+	'''
+	t_l    = np.full( vals_l.shape, t_l )
+	t_u    = np.full( vals_l.shape, t_u )
+	vals_l = vals_l.copy()
+
+	for n in range( 100 ):
+		t_m    = 0.5 * ( t_l + t_u )
+		if np.all( np.abs( t_u - t_l ) <= 4 * np.spacing( np.abs( t_m ) ) ):
+			break
+		vals_m = np.array( [ event( _t,
+			interp( *step, _t ).reshape( shape ) ) for _t in t_m ] )
+		if vals_m.ndim > 1:
+			vals_m = vals_m[ np.arange( len( t_m ) ), np.arange( len( t_m ) ) ]
+		lower  = np.sign( vals_m ) == np.sign( vals_l )
+		t_l   [  lower ] = t_m   [ lower ]
+		vals_l[  lower ] = vals_m[ lower ]
+		t_u   [ ~lower ] = t_m   [ ~lower ]
+
+	return t_u
+
+class EventLocator:
+	'''
+	Track event functions across the steps of an integrator.
+	Event functions are called as event( t, y ), returning a scalar
+	for a single state or an ( N, ) array for a batch of states.
+	Optional "terminal" and "direction" attributes have the same
+	meaning as for scipy's solve_ivp
+	'''
+	def __init__( self, events, t0, y0 ):
+		self.events     = events
+		self.shape      = np.shape( y0 )
+		self.batched    = len( self.shape ) > 1
+		self.terminals  = [ getattr( event, 'terminal',  False )
+							for event in events ]
+		self.directions = [ getattr( event, 'direction', 0 )
+							for event in events ]
+		self.ts         = [ [] for event in events ]
+		self.ys         = [ [] for event in events ]
+		self.idxs       = [ [] for event in events ]
+		self.vals       = [ self.evaluate( event, t0, y0 )
+							for event in events ]
+
+	def evaluate( self, event, t, y ):
+		return np.atleast_1d(
+			event( t, np.reshape( y, self.shape ) ) ).astype( float )
+
+	def check_step( self, t, t_new, y_new, interp, step ):
+		'''
+		Locate all event crossings during a step on the step's
+		interpolant, ignoring any after the first terminal event.
+		Returns the time and state of the terminal event, if any
+		'''
+		direction   = 1.0 if t_new >= t else -1.0
+		step_events = []
+		for n, event in enumerate( self.events ):
+			vals0   = self.vals[ n ]
+			vals1   = self.evaluate( event, t_new, y_new )
+			crossed = ( ( self.directions[ n ] <= 0 ) & ( vals0 > 0 ) &
+						( vals1 <= 0 ) ) |\
+					  ( ( self.directions[ n ] >= 0 ) & ( vals0 < 0 ) &
+						( vals1 >= 0 ) )
+			idxs = np.where( crossed )[ 0 ]
+			if len( idxs ) > 0:
+				t_roots = locate_event(
+					lambda _t, _y: self.evaluate( event, _t, _y )[ idxs ],
+					interp, step, t, t_new, vals0[ idxs ], self.shape )
+				for idx, t_root in zip( idxs, t_roots ):
+					step_events.append( ( t_root, n, idx ) )
+			self.vals[ n ] = vals1
+
+		step_events.sort( key = lambda event: direction * event[ 0 ] )
+		for t_root, n, idx in step_events:
+			y_root = np.reshape( interp( *step, t_root ), self.shape )
+			self.ts  [ n ].append( t_root )
+			self.ys  [ n ].append( y_root[ idx ] if self.batched else y_root )
+			self.idxs[ n ].append( idx )
+
+			if self.terminals[ n ]:
+				return t_root, y_root
+
+		return None
+
+	def t_events( self ):
+		return [ np.array( ts ) for ts in self.ts ]
+
+	def y_events( self ):
+		return [ np.array( ys ).reshape( ( -1, self.shape[ -1 ] ) )
+				 for ys in self.ys ]
+
+	def i_events( self ):
+		return [ np.array( idxs, dtype = int ) for idxs in self.idxs ]
+
+def solve_rk( f, t_span, y0, args = {} ):
+	'''
+	Integrate an ODE with an adaptive embedded Runge-Kutta
+	method ("dopri5" or "dop853"). y0 can be a single state
+	of shape ( n, ) or a batch of states of shape ( N, n ), in
+	which case f is called with and returns ( N, n ) arrays and
+	every step advances the whole batch. Step size control uses
+	the worst error estimate in the batch.
+
+	Events are handled by EventLocator. A terminal event in any
+	element of the batch stops the integration.
+
+	The result has the same fields as solve_ivp's, with the time
+	axis last: y has shape y0.shape + ( n_times, ). For a batch,
+	y_events hold the state of the element that had the event,
+	and "i_events" hold the batch index of each event
+	'''
+	_args = {
+		'method'      : 'dopri5',
+		'rtol'        : 1e-6,
+		'atol'        : 1e-6,
+		'first_step'  : None,
+		'max_step'    : np.inf,
+		'events'      : [],
+		't_eval'      : None,
+		'dense_output': False
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	if _args[ 'method' ] not in adaptive_methods:
+		raise RuntimeError(
+			f'Adaptive method "{_args[ "method" ]}" not implemented.' )
+
+	method     = adaptive_methods[ _args[ 'method' ] ]
+	interp     = method[ 'interp' ]
+	y0         = np.asarray( y0, dtype = float )
+	shape      = y0.shape
+	err_shape  = ( -1, shape[ -1 ] )
+	batched    = y0.ndim > 1
+	t0, tf     = t_span
+	direction  = 1.0 if tf >= t0 else -1.0
+	rtol, atol = _args[ 'rtol' ], _args[ 'atol' ]
+	max_step   = _args[ 'max_step' ]
+	exponent   = -1.0 / ( method[ 'error_order' ] + 1 )
+	nfev       = 0
+
+	def func( t, y ):
+		nonlocal nfev
+		nfev += 1
+		if batched:
+			return f( t, y.reshape( shape ) ).ravel()
+		return f( t, y )
+
+	y  = y0.ravel().copy()
+	t  = t0
+	f0 = func( t, y )
+	K  = np.empty( ( method[ 'n_K' ], y.size ) )
+
+	if _args[ 'first_step' ] is None:
+		h_abs = select_initial_step( func, t0, y, f0, direction,
+			method[ 'order' ], rtol, atol, err_shape )
+	else:
+		h_abs = _args[ 'first_step' ]
+	h_abs = min( h_abs, max_step, abs( tf - t0 ) )
+
+	t_eval = _args[ 't_eval' ]
+	if t_eval is None:
+		ts = [ t0 ]
+		ys = [ y.copy() ]
+	else:
+		t_eval     = np.asarray( t_eval, dtype = float )
+		ts, ys     = [], []
+		eval_idx   = 0
+		if len( t_eval ) > 0 and t_eval[ 0 ] == t0:
+			ts.append( t0 )
+			ys.append( y.copy() )
+			eval_idx = 1
+
+	events     = EventLocator( _args[ 'events' ], t0, y0 )
+	need_dense = _args[ 'dense_output' ] or t_eval is not None or\
+				 _args[ 'events' ]
+	sol        = DenseSolution( interp, shape )\
+					if _args[ 'dense_output' ] else None
+	status     = None
+
+	while status is None:
+		min_step = 10 * np.spacing( abs( t ) )
+		rejected = False
+		while True:
+			if h_abs < min_step:
+				status  = -1
+				message = 'Required step size is less than ' +\
+						  'spacing between numbers.'
+				break
+
+			h     = h_abs * direction
+			t_new = t + h
+			if direction * ( t_new - tf ) > 0:
+				t_new = tf
+				h     = t_new - t
+				h_abs = abs( h )
+
+			y_new, f_new = rk_embedded_step( func, t, y, f0, h, method, K )
+			scale    = ( atol + np.maximum( np.abs( y ),
+						np.abs( y_new ) ) * rtol ).reshape( err_shape )
+			err_norm = method[ 'error_norm' ]( K, h, scale, err_shape )
+
+			if err_norm < 1:
+				if err_norm == 0:
+					factor = MAX_FACTOR
+				else:
+					factor = min( MAX_FACTOR, SAFETY * err_norm ** exponent )
+				if rejected:
+					factor = min( 1.0, factor )
+				h_next = min( h_abs * factor, max_step )
+				break
+
+			h_abs   *= max( MIN_FACTOR, SAFETY * err_norm ** exponent )
+			rejected = True
+
+		if status == -1:
+			break
+
+		step = None
+		if need_dense:
+			step = ( t, h, y, method[ 'dense' ]( func, t, y, y_new, f_new, h, K ) )
+
+		if direction * ( t_new - tf ) >= 0:
+			status  = 0
+			message = 'The solver successfully reached the end ' +\
+					  'of the integration interval.'
+
+		terminal = events.check_step( t, t_new, y_new, interp, step )
+		if terminal is not None:
+			status       = 1
+			message      = 'A termination event occurred.'
+			t_new, y_new = terminal
+			y_new        = y_new.ravel()
+
+		if sol is not None:
+			sol.append( *step )
+
+		if t_eval is None:
+			ts.append( t_new )
+			ys.append( y_new.copy() )
+		else:
+			while eval_idx < len( t_eval ) and\
+				direction * ( t_eval[ eval_idx ] - t_new ) <= 0:
+				ts.append( t_eval[ eval_idx ] )
+				ys.append( interp( *step, t_eval[ eval_idx ] ) )
+				eval_idx += 1
+
+		t, y, f0 = t_new, y_new, f_new
+		h_abs    = h_next
+
+	ys = np.array( ys ).reshape( ( len( ts ), ) + shape )
+	result = OptimizeResult(
+		t        = np.array( ts ),
+		y        = np.moveaxis( ys, 0, -1 ),
+		sol      = sol,
+		t_events = events.t_events(),
+		y_events = events.y_events(),
+		nfev     = nfev,
+		njev     = 0,
+		nlu      = 0,
+		status   = status,
+		message  = message,
+		success  = status >= 0 )
+
+	if batched:
+		result.i_events = events.i_events()
+
+	return result
+
+def yoshida_weights( ws ):
+	'''
+	Symmetric composition weights of a Yoshida integrator
+	from its weights w1, w2, .., wk
+	'''
+	w0 = 1.0 - 2.0 * sum( ws )
+	return ws[ ::-1 ] + [ w0 ] + ws
+
+'''
+Leapfrog substep weights of symplectic integrators.
+Yoshida's 6th and 8th order weights are his solutions A
+'''
+symplectic_methods = {
+	'leapfrog': [ 1.0 ],
+	'yoshida4': yoshida_weights( [ 1.0 / ( 2.0 - 2.0 ** ( 1.0 / 3.0 ) ) ] ),
+	'yoshida6': yoshida_weights( [
+		-0.117767998417887E+1,
+		0.235573213359357E+0,
+		0.784513610477560E+0 ] ),
+	'yoshida8': yoshida_weights( [
+		-0.161582374150097E+1,
+		-0.244699182370524E+1,
+		-0.716989419708120E-2,
+		0.244002732616735E+1,
+		0.157739928123617E+0,
+		0.182020630970714E+1,
+		0.104242620869991E+1 ] )
+}
+
+def substep_excursion( weights ):
+	'''
+	How far ( in steps ) the substeps of a composition reach outside
+	of the step, which time dependent forces have to be valid over
+	'''
+	ts = np.cumsum( weights )
+	return max( -ts.min(), ts.max() - 1.0, 0.0 )
+
+def symplectic_step( accel, t, y, a, h, weights ):
+	'''
+	Calculate one step of a leapfrog (kick-drift-kick) composition.
+	Positions are y[ ..., :3 ] and velocities y[ ..., 3:6 ], with
+	any other components held constant. Acceleration at the end of
+	each substep is reused for the first kick of the next one
+	'''
+	y = y.copy()
+	for w in weights:
+		hw = w * h
+		y[ ..., 3:6 ] += 0.5 * hw * a
+		y[ ...,  :3 ] += hw * y[ ..., 3:6 ]
+		t += hw
+		a  = accel( t, y )
+		y[ ..., 3:6 ] += 0.5 * hw * a
+	return y, a
+
+def hermite5_interp( t0, h, y0, Q, t ):
+	'''
+	Quintic Hermite interpolation of positions (and its derivative for
+	velocities) from the positions, velocities and accelerations at
+	both ends of a step
+	'''
+	y1, a0, a1 = Q
+	x  = ( t - t0 ) / h
+	x2 = x * x
+	x3 = x2 * x
+	x4 = x3 * x
+	x5 = x4 * x
+
+	r0, v0 = y0[ ..., :3 ], y0[ ..., 3:6 ]
+	r1, v1 = y1[ ..., :3 ], y1[ ..., 3:6 ]
+	y = y0.copy()
+
+	y[ ..., :3 ] =\
+		( 1 - 10 * x3 + 15 * x4 - 6 * x5 ) * r0 +\
+		( 10 * x3 - 15 * x4 + 6 * x5 )     * r1 +\
+		h * ( ( x - 6 * x3 + 8 * x4 - 3 * x5 ) * v0 +\
+			  ( -4 * x3 + 7 * x4 - 3 * x5 )    * v1 ) +\
+		h * h * ( ( 0.5 * x2 - 1.5 * x3 + 1.5 * x4 - 0.5 * x5 ) * a0 +\
+				  ( 0.5 * x3 - x4 + 0.5 * x5 )                  * a1 )
+
+	y[ ..., 3:6 ] =\
+		( -30 * x2 + 60 * x3 - 30 * x4 ) * ( r0 - r1 ) / h +\
+		( 1 - 18 * x2 + 32 * x3 - 15 * x4 ) * v0 +\
+		( -12 * x2 + 28 * x3 - 15 * x4 )    * v1 +\
+		h * ( ( x - 4.5 * x2 + 6 * x3 - 2.5 * x4 ) * a0 +\
+			  ( 1.5 * x2 - 4 * x3 + 2.5 * x4 )     * a1 )
+	return y
+
+def solve_symplectic( accel, t_span, y0, args = {} ):
+	'''
+	Integrate second order equations of motion with a fixed step
+	symplectic integrator ( see symplectic_methods ). accel( t, y )
+	returns the accelerations, shape y0.shape[ :-1 ] + ( 3, ), and must
+	only depend on time and position for the method to be symplectic.
+
+	Being one step methods, no startup procedure is needed. These are
+	not more step efficient than the adaptive methods for the same
+	position error, they trade that for bounded energy error.
+	Output is at every step ( the last step is shortened to end at
+	t_span[ 1 ] ), and dense output / event location use quintic
+	Hermite interpolation between steps. y0 and the result follow
+	the same conventions as solve_rk
+	'''
+	_args = {
+		'method'      : 'yoshida8',
+		'dt'          : None,
+		'events'      : [],
+		'dense_output': False
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	if _args[ 'method' ] not in symplectic_methods:
+		raise RuntimeError(
+			f'Symplectic method "{_args[ "method" ]}" not implemented.' )
+
+	if _args[ 'dt' ] is None:
+		raise RuntimeError( 'Symplectic integrators require a step size.' )
+
+	weights  = symplectic_methods[ _args[ 'method' ] ]
+	y        = np.array( y0, dtype = float )
+	shape    = y.shape
+	t0, tf   = t_span
+	n_steps  = max( int( np.ceil( abs( tf - t0 ) / _args[ 'dt' ] - 1e-9 ) ), 1 )
+	h        = ( tf - t0 ) / n_steps
+	nfev     = 0
+
+	def func( t, y ):
+		nonlocal nfev
+		nfev += 1
+		return accel( t, y )
+
+	a      = func( t0, y )
+	events = EventLocator( _args[ 'events' ], t0, y )
+	sol    = DenseSolution( hermite5_interp, shape )\
+				if _args[ 'dense_output' ] else None
+	ts     = [ t0 ]
+	ys     = [ y ]
+	status = 0
+
+	for n in range( n_steps ):
+		t     = ts[ -1 ]
+		t_new = tf if n == n_steps - 1 else t0 + ( n + 1 ) * h
+		y_new, a_new = symplectic_step( func, t, y, a, t_new - t, weights )
+		step         = ( t, t_new - t, y, ( y_new, a, a_new ) )
+
+		terminal = events.check_step( t, t_new, y_new, hermite5_interp, step )
+		if sol is not None:
+			sol.append( *step )
+
+		if terminal is not None:
+			status = 1
+			ts.append( terminal[ 0 ] )
+			ys.append( terminal[ 1 ] )
+			break
+
+		ts.append( t_new )
+		ys.append( y_new )
+		y, a = y_new, a_new
+
+	result = OptimizeResult(
+		t        = np.array( ts ),
+		y        = np.moveaxis( np.array( ys ), 0, -1 ),
+		sol      = sol,
+		t_events = events.t_events(),
+		y_events = events.y_events(),
+		nfev     = nfev,
+		njev     = 0,
+		nlu      = 0,
+		status   = status,
+		message  = 'A termination event occurred.' if status == 1 else
+				   'The solver successfully reached the end ' +\
+				   'of the integration interval.',
+		success  = True )
+
+	if len( shape ) > 1:
+		result.i_events = events.i_events()
+
+	return result
+
+def series_inverse( cs, n_terms ):
+	'''
+	Coefficients of the power series 1 / c( x ), with c( 0 ) != 0
+	'''
+	inv = [ 1 / cs[ 0 ] ]
+	for n in range( 1, n_terms ):
+		inv.append( -sum( cs[ k ] * inv[ n - k ]
+			for k in range( 1, n + 1 ) ) / cs[ 0 ] )
+	return inv
+
+def series_product( as_, bs, n_terms ):
+	return [ sum( as_[ k ] * bs[ n - k ] for k in range( n + 1 ) )
+			 for n in range( n_terms ) ]
+
+def backward_differences_to_ordinates( gs ):
+	'''
+	Ordinate coefficients ( of f_n, f_n-1, .. ) of a formula written as
+	sum( g_m * nabla^m f_n ) in backward differences
+	'''
+	return [ sum( gs[ m ] * ( -1 ) ** k * math.comb( m, k )
+				  for m in range( k, len( gs ) ) )
+			 for k in range( len( gs ) ) ]
+
+@functools.lru_cache
+def gauss_jackson_coefficients( order ):
+	'''
+	Ordinate coefficients of Gauss-Jackson ( positions ) and summed Adams
+	( velocities ) predictors and correctors of the given order, in terms
+	of the first sum s1_n = s1_n-1 + f_n and second sum
+	s2_n = s2_n-1 + s1_n-1:
+
+		v_n = h * ( s1_n + sum( a_k * f_n-k ) )
+		r_n = h^2 * ( s2_n + sum( b_k * f_n-k ) )
+
+	Derived from the exact operator series in the backward difference
+	nabla, with -log( 1 - nabla ) = nabla * L( nabla ), truncated after
+	nabla^order, along with the matrices for the startup collocation
+	over the first order + 1 points ( in units of the step size ):
+
+		v_j = v_0 + h * sum( I1_jk * f_k )
+		r_j = r_0 + j * h * v_0 + h^2 * sum( I2_jk * f_k )
+	'''
+	n_terms  = order + 3
+	L        = [ Fraction( 1, k + 1 ) for k in range( n_terms ) ]
+	inv_L    = series_inverse( L, n_terms )
+	inv_L2   = series_product( inv_L, inv_L, n_terms )
+	geometric= [ Fraction( 1 ) ] * n_terms
+
+	'''
+	a( x ) = ( 1 / L - 1 ) / x
+	b( x ) = ( 1 / L^2 - ( 1 - x ) ) / x^2
+	and the predictors are ( 1 + a ) / ( 1 - x ) and b / ( 1 - x ),
+	where the 1 and -x terms of 1 / L and 1 / L^2 cancel
+	'''
+	a   = inv_L[ 1: ]
+	b   = inv_L2[ 2: ]
+	a_p = series_product( [ a[ 0 ] + 1 ] + a[ 1: ], geometric, order + 1 )
+	b_p = series_product( b, geometric, order + 1 )
+
+	nodes = range( order + 1 )
+	I1    = [ [ Fraction( 0 ) ] * ( order + 1 ) for j in nodes ]
+	I2    = [ [ Fraction( 0 ) ] * ( order + 1 ) for j in nodes ]
+	for k in nodes:
+		'''
+		Lagrange basis polynomial of node k, lowest power first
+		'''
+		ls = [ Fraction( 1 ) ]
+		for j in nodes:
+			if j != k:
+				ls = [ ( ( ls[ m - 1 ] if m > 0 else 0 ) -
+						 j * ( ls[ m ] if m < len( ls ) else 0 ) ) / ( k - j )
+					   for m in range( len( ls ) + 1 ) ]
+		for j in nodes:
+			I1[ j ][ k ] = sum( c * Fraction( j ) ** ( m + 1 ) / ( m + 1 )
+				for m, c in enumerate( ls ) )
+			I2[ j ][ k ] = sum( c * Fraction( j ) ** ( m + 2 ) /
+				( ( m + 1 ) * ( m + 2 ) ) for m, c in enumerate( ls ) )
+
+	def to_array( cs ):
+		return np.array( [ float( c ) for c in cs ] )
+
+	return {
+		'a_p': to_array( backward_differences_to_ordinates( a_p ) ),
+		'b_p': to_array( backward_differences_to_ordinates( b_p ) ),
+		'a_c': to_array( backward_differences_to_ordinates( a[ :order + 1 ] ) ),
+		'b_c': to_array( backward_differences_to_ordinates( b[ :order + 1 ] ) ),
+		'I1' : np.array( [ to_array( row ) for row in I1 ] ),
+		'I2' : np.array( [ to_array( row ) for row in I2 ] )
+	}
+
+def gauss_jackson_startup( accel, ts, y0, a0, h, coeffs, args ):
+	'''
+	Positions, velocities and accelerations at the first order + 1
+	points, from the fixed point iteration of the collocation through
+	their accelerations, starting from a constant acceleration guess
+	'''
+	n_points = len( ts )
+	js       = np.arange( n_points ).reshape( ( -1, ) + ( 1, ) * y0.ndim )
+	r0, v0   = y0[ ..., :3 ], y0[ ..., 3:6 ]
+	ys       = np.repeat( y0[ None ], n_points, axis = 0 )
+	ys[ ..., :3  ] = r0 + js * h * v0 + 0.5 * ( js * h ) ** 2 * a0
+	ys[ ..., 3:6 ] = v0 + js * h * a0
+	fs       = np.repeat( a0[ None ], n_points, axis = 0 )
+	scale    = np.abs( r0 ).max()
+
+	for n in range( args[ 'max_startup_iter' ] ):
+		for j in range( 1, n_points ):
+			fs[ j ] = accel( ts[ j ], ys[ j ] )
+
+		rs = r0 + js * h * v0 + h * h * np.tensordot( coeffs[ 'I2' ], fs, 1 )
+		vs = v0 + h * np.tensordot( coeffs[ 'I1' ], fs, 1 )
+		change = np.abs( rs - ys[ ..., :3 ] ).max()
+		ys[ ..., :3  ] = rs
+		ys[ ..., 3:6 ] = vs
+		if change <= args[ 'startup_tol' ] * scale:
+			return ys, fs
+
+	raise RuntimeError( 'Gauss-Jackson startup did not converge, '
+		'the step size is too large.' )
+
+def solve_gauss_jackson( accel, t_span, y0, args = {} ):
+	'''
+	Integrate second order equations of motion with the fixed step
+	Gauss-Jackson ( positions ) and summed Adams ( velocities )
+	multistep predictor-corrector of order "order" ( 8 by default ).
+	accel( t, y ) returns the accelerations, shape y0.shape[ :-1 ] + ( 3, ),
+	and can depend on velocity, which is predicted along with position.
+
+	The first order steps come from a startup collocation
+	( gauss_jackson_startup ), after which each step evaluates
+	accelerations once at the predicted state and, with "pece"
+	( default ), once more at the corrected state.
+	Output, dense output and events follow solve_symplectic,
+	with at least order steps over t_span
+	'''
+	_args = {
+		'order'           : 8,
+		'dt'              : None,
+		'pece'            : False,
+		'startup_tol'     : 1e-14,
+		'max_startup_iter': 100,
+		'events'          : [],
+		'dense_output'    : False
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	if _args[ 'dt' ] is None:
+		raise RuntimeError( 'Gauss-Jackson integrator requires a step size.' )
+
+	order    = _args[ 'order' ]
+	coeffs   = gauss_jackson_coefficients( order )
+	y        = np.array( y0, dtype = float )
+	shape    = y.shape
+	t0, tf   = t_span
+	n_steps  = max( int( np.ceil( abs( tf - t0 ) / _args[ 'dt' ] - 1e-9 ) ),
+		order )
+	h        = ( tf - t0 ) / n_steps
+	ts_grid  = t0 + h * np.arange( n_steps + 1 )
+	ts_grid[ -1 ] = tf
+	nfev     = 0
+
+	def func( t, y ):
+		nonlocal nfev
+		nfev += 1
+		return accel( t, y )
+
+	a0       = func( t0, y )
+	ys, fs   = gauss_jackson_startup( func, ts_grid[ :order + 1 ], y, a0, h,
+		coeffs, _args )
+	history  = list( fs )
+
+	'''
+	Sums consistent with the corrector at the last startup point
+	'''
+	s1 = ys[ -1, ..., 3:6 ] / h - np.tensordot( coeffs[ 'a_c' ], fs[ ::-1 ], 1 )
+	s2 = ys[ -1, ..., :3  ] / h / h -\
+		 np.tensordot( coeffs[ 'b_c' ], fs[ ::-1 ], 1 )
+
+	events = EventLocator( _args[ 'events' ], t0, y )
+	sol    = DenseSolution( hermite5_interp, shape )\
+				if _args[ 'dense_output' ] else None
+	ts     = [ t0 ]
+	ys_out = [ y ]
+	status = 0
+
+	for n in range( n_steps ):
+		t, t_new = ts_grid[ n ], ts_grid[ n + 1 ]
+		if n < order:
+			y_new, a, a_new = ys[ n + 1 ], fs[ n ], fs[ n + 1 ]
+		else:
+			a   = history[ -1 ]
+			fs_ = np.array( history[ ::-1 ] )
+			s2  = s2 + s1
+			y_new = y.copy()
+			y_new[ ..., :3  ] = h * h * (
+				s2 + np.tensordot( coeffs[ 'b_p' ], fs_, 1 ) )
+			y_new[ ..., 3:6 ] = h * (
+				s1 + np.tensordot( coeffs[ 'a_p' ], fs_, 1 ) )
+			history = history[ 1: ] + [ func( t_new, y_new ) ]
+
+			fs_ = np.array( history[ ::-1 ] )
+			y_new[ ..., :3  ] = h * h * (
+				s2 + np.tensordot( coeffs[ 'b_c' ], fs_, 1 ) )
+			y_new[ ..., 3:6 ] = h * ( s1 + history[ -1 ] +
+				np.tensordot( coeffs[ 'a_c' ], fs_, 1 ) )
+			if _args[ 'pece' ]:
+				history[ -1 ] = func( t_new, y_new )
+			a_new = history[ -1 ]
+			s1    = s1 + a_new
+
+		step     = ( t, t_new - t, y, ( y_new, a, a_new ) )
+		terminal = events.check_step( t, t_new, y_new, hermite5_interp, step )
+		if sol is not None:
+			sol.append( *step )
+
+		if terminal is not None:
+			status = 1
+			ts.append( terminal[ 0 ] )
+			ys_out.append( terminal[ 1 ] )
+			break
+
+		ts.append( t_new )
+		ys_out.append( y_new )
+		y = y_new
+
+	result = OptimizeResult(
+		t        = np.array( ts ),
+		y        = np.moveaxis( np.array( ys_out ), 0, -1 ),
+		sol      = sol,
+		t_events = events.t_events(),
+		y_events = events.y_events(),
+		nfev     = nfev,
+		njev     = 0,
+		nlu      = 0,
+		status   = status,
+		message  = 'A termination event occurred.' if status == 1 else
+				   'The solver successfully reached the end ' +\
+				   'of the integration interval.',
+		success  = True )
+
+	if len( shape ) > 1:
+		result.i_events = events.i_events()
+
+	return result
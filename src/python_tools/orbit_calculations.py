@@ -15,6 +15,8 @@ import spiceypy as spice
 import numerical_tools as nt
 import lamberts_tools  as lt
 import planetary_data  as pd
+import parallel_tools  as pa
+import spice_data      as sd
 
 ECLIPSE_MAP = {
 	'umbra'   : ( ( 1,  3 ), ( -1, -3 ) ),
@@ -58,6 +60,105 @@ def state2coes( state, args = {} ):
 
 	return [ a, e, i, ta, aop, raan ]
 
+def states2coes( states, mu = pd.earth[ 'mu' ], deg = True, args = {} ):
+	'''
+	Vectorized state2coes, returning [ a, e, i, ta, aop, raan ]
+	for states of shape ( N, 6 ) or ( 6, ) with the same conventions
+	as spice.oscltx. Equatorial orbits ( i or 180 - i below i_tol )
+	have raan = 0 with aop measured from the x-axis, circular orbits
+	( e <= e_tol ) have aop = 0 with ta measured from the ascending
+	node (or the x-axis if also equatorial), and hyperbolic orbits
+	have negative semi-major axes. Default tolerances (radians) are
+	the ones oscltx uses
+	'''
+	_args = {
+		'e_tol': 0.0,
+		'i_tol': 1e-10
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	states = np.asarray( states, dtype = float )
+	rs     = states[ ..., :3 ]
+	vs     = states[ ..., 3:6 ]
+	norm_r = np.linalg.norm( rs, axis = -1 )
+	v2     = np.sum( vs * vs, axis = -1 )
+	rv     = np.sum( rs * vs, axis = -1 )
+	hs     = np.cross( rs, vs )
+	h_hat  = hs / np.linalg.norm( hs, axis = -1 )[ ..., None ]
+	e_vecs = ( ( v2 - mu / norm_r )[ ..., None ] * rs -
+		rv[ ..., None ] * vs ) / mu
+	e      = np.linalg.norm( e_vecs, axis = -1 )
+	a      = 1.0 / ( 2.0 / norm_r - v2 / mu )
+	i      = np.arctan2( np.hypot( hs[ ..., 0 ], hs[ ..., 1 ] ), hs[ ..., 2 ] )
+
+	circular   = e <= _args[ 'e_tol' ]
+	equatorial = ( i < _args[ 'i_tol' ] ) | ( np.pi - i < _args[ 'i_tol' ] )
+	i          = np.where( equatorial, np.where( i < 1.0, 0.0, np.pi ), i )
+
+	'''
+	Reference directions of aop ( ascending node or x-axis ) and
+	of ta ( periapsis, or the aop reference direction if circular )
+	'''
+	ps = np.zeros( rs.shape )
+	ps[ ..., 0 ]     = -hs[ ..., 1 ]
+	ps[ ..., 1 ]     =  hs[ ..., 0 ]
+	ps[ equatorial ] = [ 1.0, 0.0, 0.0 ]
+	qs = np.where( circular[ ..., None ], ps, e_vecs )
+
+	def angle( u, w ):
+		return np.arctan2( np.sum( np.cross( u, w ) * h_hat, axis = -1 ),
+			np.sum( u * w, axis = -1 ) ) % ( 2 * np.pi )
+
+	raan = np.where( equatorial, 0.0,
+		np.arctan2( hs[ ..., 0 ], -hs[ ..., 1 ] ) % ( 2 * np.pi ) )
+	aop  = np.where( circular, 0.0, angle( ps, e_vecs ) )
+	ta   = angle( qs, rs )
+
+	if deg:
+		i    *= nt.r2d
+		ta   *= nt.r2d
+		aop  *= nt.r2d
+		raan *= nt.r2d
+
+	return np.stack( [ a, e, i, ta, aop, raan ], axis = -1 )
+
+def coes2states_ta( coes, mu = pd.earth[ 'mu' ], deg = True ):
+	'''
+	Vectorized inverse of states2coes, for coes of shape ( N, 6 )
+	or ( 6, ) ordered [ a, e, i, ta, aop, raan ] where ta is the
+	true anomaly, unlike coes2state which takes the mean anomaly in
+	the same slot. Hyperbolic orbits use negative semi-major axes
+	'''
+	coes = np.array( coes, dtype = float )
+	a, e, i, ta, aop, raan = np.moveaxis( coes, -1, 0 )
+	if deg:
+		i    = i    * nt.d2r
+		ta   = ta   * nt.d2r
+		aop  = aop  * nt.d2r
+		raan = raan * nt.d2r
+
+	p      = a * ( 1 - e * e )
+	norm_r = p / ( 1 + e * np.cos( ta ) )
+	v_p    = np.sqrt( mu / p )
+
+	'''
+	Perifocal position and velocity components along the
+	periapsis ( P ) and semi-latus rectum ( Q ) unit vectors
+	'''
+	cO, sO = np.cos( raan ), np.sin( raan )
+	cw, sw = np.cos( aop  ), np.sin( aop  )
+	ci, si = np.cos( i    ), np.sin( i    )
+	P      = np.stack( [  cO * cw - sO * sw * ci,  sO * cw + cO * sw * ci, sw * si ], axis = -1 )
+	Q      = np.stack( [ -cO * sw - sO * cw * ci, -sO * sw + cO * cw * ci, cw * si ], axis = -1 )
+
+	states = np.empty( coes.shape )
+	states[ ..., :3  ] = ( norm_r * np.cos( ta ) )[ ..., None ] * P +\
+						 ( norm_r * np.sin( ta ) )[ ..., None ] * Q
+	states[ ..., 3:6 ] = ( -v_p * np.sin( ta ) )[ ..., None ] * P +\
+						 ( v_p * ( e + np.cos( ta ) ) )[ ..., None ] * Q
+	return states
+
 def state2period( state, mu = pd.earth['mu'] ):
 
 	# specific mechanical energy
@@ -70,6 +171,11 @@ def state2period( state, mu = pd.earth['mu'] ):
 	return 2 * math.pi * math.sqrt( a ** 3 / mu )
 
 def coes2state( coes, mu = pd.earth[ 'mu' ], deg = True ):
+	'''
+	State from coes ordered [ a, e, i, ta, aop, raan ], where ( as
+	spice.conics takes it ) the fourth element is the mean anomaly,
+	not the true anomaly that state2coes returns ( see coes2states_ta )
+	'''
 	a, e, i, ta, aop, raan = coes
 	if deg:
 		i    *= nt.d2r
@@ -100,12 +206,241 @@ def two_body_ode( t, state, mu = pd.earth[ 'mu' ] ):
 		state[ 3 ], state[ 4 ], state[ 5 ],
 		    a[ 0 ],     a[ 1 ],     a[ 2 ] ] )
 
+def propagate_kepler( state0, dts, mu = pd.earth[ 'mu' ], args = {} ):
+	'''
+	Propagate a two-body state by an array of times (seconds from the
+	epoch of state0) using the universal variable formulation of
+	Kepler's equation and Lagrange f and g coefficients.
+	Returns states at each time, shape ( len( dts ), 6 )
+	'''
+	_args = {
+		'tol'      : 1e-14,
+		'max_steps': 50
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	state0  = np.asarray( state0, dtype = float )
+	dts     = np.atleast_1d( np.asarray( dts, dtype = float ) )
+	r0      = state0[ :3  ]
+	v0      = state0[ 3:6 ]
+	r0_norm = nt.norm( r0 )
+	sqrt_mu = math.sqrt( mu )
+	sigma0  = np.dot( r0, v0 ) / sqrt_mu
+	alpha   = 2.0 / r0_norm - np.dot( v0, v0 ) / mu
+
+	'''
+	Elliptical orbits are reduced to less than one period
+	so that the solution doesn't lose precision over many revolutions
+	'''
+	if alpha > 1e-12:
+		period = 2 * math.pi / math.sqrt( mu * alpha ** 3 )
+		_dts   = np.fmod( dts, period )
+		chis   = sqrt_mu * alpha * _dts
+	elif alpha < -1e-12:
+		_dts = dts
+		a    = 1.0 / alpha
+		sign = np.where( _dts >= 0, 1.0, -1.0 )
+		arg  = np.abs( -2.0 * mu * alpha * _dts / ( np.dot( r0, v0 ) +\
+			sign * math.sqrt( -mu * a ) * ( 1.0 - r0_norm * alpha ) ) )
+		chis = np.zeros( _dts.shape )
+		chis[ arg > 0 ] = sign[ arg > 0 ] * math.sqrt( -a ) *\
+			np.log( arg[ arg > 0 ] )
+	else:
+		_dts = dts
+		chis = sqrt_mu * _dts / r0_norm
+
+	'''
+	Laguerre-Conway iterations (n = 5) on universal Kepler's equation,
+	only iterating on the times that haven't converged yet
+	'''
+	n      = 5.0
+	active = np.ones( chis.shape, dtype = bool )
+	for step in range( _args[ 'max_steps' ] ):
+		chi  = chis[ active ]
+		psi  = chi ** 2 * alpha
+		c2   = lt.C2_array( psi )
+		c3   = lt.C3_array( psi )
+		F    = sigma0 * chi ** 2 * c2 + ( 1.0 - alpha * r0_norm ) *\
+			   chi ** 3 * c3 + r0_norm * chi - sqrt_mu * _dts[ active ]
+		dF   = sigma0 * chi * ( 1.0 - psi * c3 ) +\
+			   ( 1.0 - alpha * r0_norm ) * chi ** 2 * c2 + r0_norm
+		ddF  = sigma0 * ( 1.0 - psi * c2 ) +\
+			   ( 1.0 - alpha * r0_norm ) * chi * ( 1.0 - psi * c3 )
+		disc  = np.sqrt( np.abs(
+			( n - 1 ) ** 2 * dF ** 2 - n * ( n - 1 ) * F * ddF ) )
+		delta = n * F / ( dF + np.where( dF >= 0, 1.0, -1.0 ) * disc )
+		chis[ active ] = chi - delta
+
+		active[ active ] = np.abs( delta ) > _args[ 'tol' ] * ( 1.0 + np.abs( chi ) )
+		if not np.any( active ):
+			break
+
+	if np.any( active ):
+		raise RuntimeError( 'Universal Kepler solver did not converge.' )
+
+	psis   = chis ** 2 * alpha
+	c2     = lt.C2_array( psis )
+	c3     = lt.C3_array( psis )
+	f      = 1.0 - chis ** 2 / r0_norm * c2
+	g      = _dts - chis ** 3 * c3 / sqrt_mu
+	rs     = f[ :, None ] * r0 + g[ :, None ] * v0
+	norms  = np.linalg.norm( rs, axis = 1 )
+	fdot   = sqrt_mu / ( norms * r0_norm ) * chis * ( psis * c3 - 1.0 )
+	gdot   = 1.0 - chis ** 2 / norms * c2
+	vs     = fdot[ :, None ] * r0 + gdot[ :, None ] * v0
+
+	return np.hstack( ( rs, vs ) )
+
+def sample_conic( state0, tof, n_points = 500, mu = pd.earth[ 'mu' ] ):
+	'''
+	Positions at n_points evenly spaced times over [ 0, tof ] along the
+	conic through state0, for plotting transfer arcs without numerical
+	propagation. Returns the positions, shape ( n_points, 3 )
+	'''
+	return propagate_kepler( state0,
+		np.linspace( 0.0, tof, n_points ), mu )[ :, :3 ]
+
+def kepler_step( state0, dt, mu = pd.earth[ 'mu' ], chi0 = None, args = {} ):
+	'''
+	Propagate a two-body state by a single time using the universal
+	variable formulation. Scalar version of propagate_kepler for
+	repeated calls with nearby times (e.g. Encke reference orbits),
+	where the previous universal anomaly chi0 is a good first guess.
+	Returns the state and universal anomaly
+	'''
+	_args = {
+		'tol'      : 1e-13,
+		'max_steps': 50
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	rx, ry, rz, vx, vy, vz = np.asarray( state0, dtype = float )[ :6 ].tolist()
+	r0_norm = math.sqrt( rx * rx + ry * ry + rz * rz )
+	sqrt_mu = math.sqrt( mu )
+	r0_v0   = rx * vx + ry * vy + rz * vz
+	sigma0  = r0_v0 / sqrt_mu
+	alpha   = 2.0 / r0_norm - ( vx * vx + vy * vy + vz * vz ) / mu
+	beta    = 1.0 - alpha * r0_norm
+
+	if alpha > 1e-12:
+		period = 2 * math.pi / math.sqrt( mu * alpha ** 3 )
+		dt     = math.fmod( dt, period )
+
+	if chi0 is None:
+		chi = sqrt_mu * dt * ( alpha if alpha > 1e-12 else 1.0 / r0_norm )
+	else:
+		chi = chi0
+
+	for step in range( _args[ 'max_steps' ] ):
+		psi    = chi * chi * alpha
+		c2, c3 = lt.stumpffs( psi )
+		r      = sigma0 * chi * ( 1.0 - psi * c3 ) +\
+				 beta * chi * chi * c2 + r0_norm
+		delta  = ( sigma0 * chi * chi * c2 + beta * chi ** 3 * c3 +\
+				   r0_norm * chi - sqrt_mu * dt ) / r
+		chi   -= delta
+		if abs( delta ) < _args[ 'tol' ] * ( 1.0 + abs( chi ) ):
+			break
+	else:
+		raise RuntimeError( 'Universal Kepler solver did not converge.' )
+
+	psi    = chi * chi * alpha
+	c2, c3 = lt.stumpffs( psi )
+	f      = 1.0 - chi * chi / r0_norm * c2
+	g      = dt - chi ** 3 * c3 / sqrt_mu
+	r      = sigma0 * chi * ( 1.0 - psi * c3 ) + beta * chi * chi * c2 + r0_norm
+	fdot   = sqrt_mu / ( r * r0_norm ) * chi * ( psi * c3 - 1.0 )
+	gdot   = 1.0 - chi * chi / r * c2
+
+	return np.array( [
+		f * rx + g * vx, f * ry + g * vy, f * rz + g * vz,
+		fdot * rx + gdot * vx, fdot * ry + gdot * vy, fdot * rz + gdot * vz
+		] ), chi
+
+def calc_stm_rv( state0, dt, mu = pd.earth[ 'mu' ] ):
+	'''
+	Sensitivity of the position after dt to the initial velocity
+	( upper right 3x3 block of the two-body state transition matrix )
+	in universal variables (Battin, 9.7).
+	Returns the 3x3 matrix and the state after dt
+	'''
+	state0  = np.asarray( state0, dtype = float )
+	state1, chi = kepler_step( state0, dt, mu )
+	r0, v0  = state0[ :3 ], state0[ 3:6 ]
+	r1, v1  = state1[ :3 ], state1[ 3:6 ]
+	r0_norm = nt.norm( r0 )
+	sqrt_mu = math.sqrt( mu )
+	alpha   = 2.0 / r0_norm - np.dot( v0, v0 ) / mu
+	psi     = chi * chi * alpha
+	c2, c3  = lt.stumpffs( psi )
+	c4, c5  = lt.stumpffs45( psi )
+
+	U2 = chi ** 2 * c2
+	U4 = chi ** 4 * c4
+	U5 = chi ** 5 * c5
+	F  = 1.0 - U2 / r0_norm
+	G  = dt - chi ** 3 * c3 / sqrt_mu
+	C  = ( 3 * U5 - chi * U4 - sqrt_mu * dt * U2 ) / sqrt_mu
+
+	stm_rv = r0_norm / mu * ( 1.0 - F ) * (
+		np.outer( r1 - r0, v0 ) - np.outer( v1 - v0, r0 ) ) +\
+		C / mu * np.outer( v1, v0 ) + G * np.eye( 3 )
+	return stm_rv, state1
+
+def calc_apse_times( state0, tspan, mu = pd.earth[ 'mu' ] ):
+	'''
+	Calculate times (seconds from the epoch of state0, within tspan)
+	of periapsis and apoapsis passages of a two-body orbit.
+	In between these times the radius is monotonic
+	'''
+	r0      = np.asarray( state0[ :3  ], dtype = float )
+	v0      = np.asarray( state0[ 3:6 ], dtype = float )
+	r0_norm = nt.norm( r0 )
+	alpha   = 2.0 / r0_norm - np.dot( v0, v0 ) / mu
+	e_vec   = ( ( np.dot( v0, v0 ) - mu / r0_norm ) * r0 -\
+			    np.dot( r0, v0 ) * v0 ) / mu
+	e       = nt.norm( e_vec )
+	t0, t1  = sorted( [ 0.0, tspan ] )
+
+	if e < 1e-12 or abs( alpha ) < 1e-12:
+		return np.array( [] ), np.array( [] )
+
+	sin_ta = np.dot( r0, v0 ) * nt.norm( np.cross( r0, v0 ) ) /\
+			 ( mu * e * r0_norm )
+	cos_ta = np.dot( e_vec, r0 ) / ( e * r0_norm )
+
+	if alpha > 0:
+		n      = math.sqrt( mu * alpha ** 3 )
+		period = 2 * math.pi / n
+		E      = math.atan2( math.sqrt( 1 - e ** 2 ) * sin_ta, e + cos_ta )
+		M      = E - e * math.sin( E )
+		t_peri = -M / n
+		t_apo  = t_peri + 0.5 * period
+		k0     = math.floor( ( t0 - t_apo ) / period )
+		k1     = math.ceil ( ( t1 - t_peri ) / period )
+		ks     = np.arange( k0, k1 + 1 )
+		peris  = t_peri + ks * period
+		apos   = t_apo  + ks * period
+		return peris[ ( peris > t0 ) & ( peris < t1 ) ],\
+			   apos [ ( apos  > t0 ) & ( apos  < t1 ) ]
+
+	n      = math.sqrt( -mu * alpha ** 3 )
+	F      = math.asinh( math.sqrt( e ** 2 - 1 ) * sin_ta / ( 1 + e * cos_ta ) )
+	t_peri = -( e * math.sinh( F ) - F ) / n
+	peris  = np.array( [ t_peri ] )
+	return peris[ ( peris > t0 ) & ( peris < t1 ) ], np.array( [] )
+
 def calc_close_approach( turn_angle, v_inf, mu = pd.sun[ 'mu' ] ):
 	'''
 	Calculate periapsis distance in flyby trajectory
 	'''
 	return mu * ( 1 / math.sin( turn_angle ) - 1 ) / v_inf ** 2
 
+def calc_planet_state( body, et, frame = 'ECLIPJ2000', center = 0 ):
+	return spice.spkgeo( body, et, frame, center )[ 0 ]
+
 def calc_vinfinity( tof, args ):
 
 	r1_planet1 = spice.spkgps( args[ 'planet1_ID' ],
@@ -118,12 +453,53 @@ def calc_vinfinity( tof, args ):
 	vinf = nt.norm( v0_sc_depart - args[ 'state0_planet0' ][ 3: ] )
 	return args[ 'vinf' ] - vinf
 
+def calc_vinfinity_tof( tof, args ):
+	'''
+	calc_vinfinity, its analytic derivative w.r.t. tof and the Lambert
+	velocities. Arriving dtof later at the planet1 position moved by
+	v_planet1 * dtof requires stm_rv * dv0 = ( v_planet1 - v1_sc ) * dtof,
+	where stm_rv is the sensitivity of the arrival position to the
+	departure velocity (calc_stm_rv). Results are cached by tof in
+	args[ 'cache' ], so the function and derivative calls of each
+	Newton iteration share one ephemeris lookup and Lambert solve
+	'''
+	if tof in args[ 'cache' ]:
+		return args[ 'cache' ][ tof ]
+
+	ephemeris      = args.get( 'ephemeris', calc_planet_state )
+	state1_planet1 = ephemeris( args[ 'planet1_ID' ],
+		args[ 'et0' ] + tof, args[ 'frame' ], args[ 'center_ID' ] )
+
+	v0_sc_depart, v1_sc_arrive = lt.lamberts_universal_variables(
+		args[ 'state0_planet0' ][ :3 ], state1_planet1[ :3 ], tof,
+		{ 'mu': args[ 'mu' ], 'tm': args[ 'tm' ] } )
+
+	vinf_vec  = v0_sc_depart - args[ 'state0_planet0' ][ 3: ]
+	vinf      = nt.norm( vinf_vec )
+	stm_rv, _ = calc_stm_rv( np.concatenate(
+		( args[ 'state0_planet0' ][ :3 ], v0_sc_depart ) ), tof, args[ 'mu' ] )
+	dv0_dtof  = np.linalg.solve( stm_rv, state1_planet1[ 3: ] - v1_sc_arrive )
+
+	args[ 'cache' ][ tof ] = ( args[ 'vinf' ] - vinf,
+		-np.dot( vinf_vec, dv0_dtof ) / vinf, v0_sc_depart, v1_sc_arrive )
+	return args[ 'cache' ][ tof ]
+
+def calc_vinfinity_value( tof, args ):
+	return calc_vinfinity_tof( tof, args )[ 0 ]
+
+def calc_vinfinity_derivative( tof, args ):
+	return calc_vinfinity_tof( tof, args )[ 1 ]
+
 def vinfinity_match( planet0, planet1, v0_sc, et0, tof0, args = {} ):
 	'''
 	Given an incoming v-infinity vector to planet0, calculate the
 	outgoing v-infinity vector that will arrive at planet1 after
 	time of flight (tof) where the incoming and outgoing v-infinity
-	vectors at planet0 have equal magnitude
+	vectors at planet0 have equal magnitude.
+	Newton iterations use the analytic derivative of calc_vinfinity_tof,
+	or central finite differences of calc_vinfinity if "analytic" is False.
+	Planet states in the analytic path come from "ephemeris", a function
+	( body, et, frame, center ) -> state, so callers can memoize them
 	'''
 	_args = {
 		'et0'       : et0,
@@ -132,17 +508,26 @@ def vinfinity_match( planet0, planet1, v0_sc, et0, tof0, args = {} ):
 		'center_ID' : 0,
 		'mu'        : pd.sun[ 'mu' ],
 		'tm'        : 1,
+		'analytic'  : True,
 		'diff_step' : 1e-3,
-		'tol'       : 1e-4
+		'tol'       : 1e-4,
+		'ephemeris' : calc_planet_state
 	}
 	for key in args.keys():
 		_args[ key ] = args[ key ]
 
-	_args[ 'state0_planet0' ] = spice.spkgeo( planet0, et0,
-		_args[ 'frame' ], _args[ 'center_ID' ] )[ 0 ]
+	_args[ 'state0_planet0' ] = _args[ 'ephemeris' ]( planet0, et0,
+		_args[ 'frame' ], _args[ 'center_ID' ] )
 
 	_args[ 'vinf' ] = nt.norm( v0_sc - _args[ 'state0_planet0' ][ 3: ] )
 
+	if _args[ 'analytic' ]:
+		_args[ 'cache' ] = {}
+		tof, steps = nt.newton_root_single( calc_vinfinity_value,
+			calc_vinfinity_derivative, tof0, _args )
+		_, _, v0_sc_depart, v1_sc_arrive = calc_vinfinity_tof( tof, _args )
+		return tof, v0_sc_depart, v1_sc_arrive
+
 	tof, steps = nt.newton_root_single_fd(
 		calc_vinfinity, tof0, _args )
 
@@ -215,40 +600,364 @@ def check_solar_eclipse_latlons( et, body0, body1, frame = 'J2000' ):
 		return -1, None
 
 def calc_solar_eclipse_latlons( ets, body0, body1, frame = 'J2000' ):
-	eclipses = np.zeros( len( ets ) )
-	latlons  = []
+	'''
+	Same as calc_solar_eclipse_array
+	'''
+	return calc_solar_eclipse_array( ets, body0, body1, frame )
 
-	for n in range( len( ets ) ):
-		eclipse = check_solar_eclipse(
-			ets[ n ], body0, body1, frame )
-		if eclipse[ 0 ] == 2:
-			latlons.append( eclipse[ 1 ] )
-	return np.array( latlons )
+def calc_solar_eclipse_array( ets, body0, body1, frame = 'J2000',
+	return_ets = False ):
+	'''
+	Vectorized check_solar_eclipse_latlons. Latitudinal coordinates
+	( radius, longitude, latitude ) in degrees on the surface of body1
+	where the shadow axis of body0 intersects it, for the ets where
+	body1 is in the umbra of body0, shape ( M, 3 ).
+	Positions are calculated with one spkpos call per body, and the
+	intersection is the near root of the ray-sphere quadratic
+	| sigma * s_hat - r | = radius.
+	If return_ets is True, the eclipsed ets are returned as well
+	'''
+	ets = np.asarray( ets, dtype = float )
+	if ets.shape[ 0 ] == 0:
+		return ( ets, np.zeros( ( 0, 3 ) ) ) if return_ets else np.zeros( ( 0, 3 ) )
+
+	rs_sun2body = np.array( spice.spkpos(
+		str( body0[ 'SPICE_ID' ] ), ets, frame, 'LT', 'SUN' )[ 0 ] )
+	rs = np.array( spice.spkpos(
+		str( body1[ 'SPICE_ID' ] ), ets, frame, 'LT',
+		str( body0[ 'SPICE_ID' ] ) )[ 0 ] )
+
+	delta_ps     = np.linalg.norm( rs_sun2body, axis = 1 )
+	s_hats       = rs_sun2body / delta_ps[ :, None ]
+	proj_scalars = np.sum( rs * s_hats, axis = 1 )
+	rej_norms    = np.linalg.norm(
+		rs - proj_scalars[ :, None ] * s_hats, axis = 1 )
+
+	'''
+	The discriminant is radius ^ 2 - rej_norm ^ 2, so the shadow axis
+	misses body1 when the rejection is larger than the radius
+	'''
+	discs = body1[ 'radius' ] ** 2 - rej_norms ** 2
+	mask  = ( proj_scalars > 0.0 ) & ( discs >= 0.0 ) &\
+		check_umbra( delta_ps, body0[ 'diameter' ],
+			proj_scalars, rej_norms, body1[ 'radius' ] )
+	idxs  = np.nonzero( mask )[ 0 ]
+
+	sigmas      = proj_scalars[ idxs ] - np.sqrt( discs[ idxs ] )
+	rs_eclipse  = sigmas[ :, None ] * s_hats[ idxs ] - rs[ idxs ]
+	rs_bf       = np.zeros( rs_eclipse.shape )
+	for n, idx in enumerate( idxs ):
+		rs_bf[ n ] = np.dot(
+			spice.pxform( frame, body1[ 'body_fixed_frame' ], ets[ idx ] ),
+			rs_eclipse[ n ] )
+
+	latlons         = np.zeros( rs_bf.shape )
+	latlons[ :, 0 ] = np.linalg.norm( rs_bf, axis = 1 )
+	latlons[ :, 1 ] = np.arctan2( rs_bf[ :, 1 ], rs_bf[ :, 0 ] ) * nt.r2d
+	latlons[ :, 2 ] = np.arcsin( np.clip(
+		rs_bf[ :, 2 ] / latlons[ :, 0 ], -1.0, 1.0 ) ) * nt.r2d
+
+	if return_ets:
+		return ets[ idxs ], latlons
+	return latlons
+
+def calc_solar_eclipse_window( task ):
+	'''
+	calc_solar_eclipse_array over one ( et0, etf, dt, body0, body1, frame )
+	window, returning the eclipsed ets and latlons (process pool task)
+	'''
+	et0, etf, dt, body0, body1, frame = task
+	return calc_solar_eclipse_array(
+		np.arange( et0, etf, dt ), body0, body1, frame, return_ets = True )
+
+def find_solar_eclipse_candidates( et0, etf, body0, body1,
+	frame = 'J2000', dt = 21600.0 ):
+	'''
+	Coarse screening for solar eclipses of body0 on body1 between et0
+	and etf. The angular separation of the Sun and body0 seen from the
+	center of body1 is sampled every dt, and its local minima (syzygies)
+	are candidates if they are close enough to the sum of the apparent
+	radii of the Sun and body0 plus the parallax of body1's radius for
+	a partial eclipse to be possible somewhere on the surface.
+	Since the sampled minimum can be up to one step away from the true
+	minimum, the difference to the larger neighbouring sample is
+	subtracted as a margin. Returns the ets of the candidate minima
+	'''
+	ets = np.arange( et0, etf, dt )
+	if ets.shape[ 0 ] < 2:
+		return np.zeros( 0 )
+
+	rs_sun  = np.array( spice.spkpos(
+		'SUN', ets, frame, 'LT', str( body1[ 'SPICE_ID' ] ) )[ 0 ] )
+	rs_body = np.array( spice.spkpos(
+		str( body0[ 'SPICE_ID' ] ), ets, frame, 'LT',
+		str( body1[ 'SPICE_ID' ] ) )[ 0 ] )
+	norms_sun  = np.linalg.norm( rs_sun,  axis = 1 )
+	norms_body = np.linalg.norm( rs_body, axis = 1 )
+
+	thetas = np.arccos( np.clip( np.sum( rs_sun * rs_body, axis = 1 ) /
+		( norms_sun * norms_body ), -1.0, 1.0 ) )
+	limits = np.arcsin( pd.sun[ 'radius' ] / norms_sun  ) +\
+			 np.arcsin( body0[ 'radius' ]  / norms_body ) +\
+			 np.arcsin( body1[ 'radius' ]  / norms_body )
+
+	lefts  = np.r_[ thetas[ 1 ], thetas[ :-1 ] ]
+	rights = np.r_[ thetas[ 1: ], thetas[ -2 ] ]
+	minima = ( thetas <= lefts ) & ( thetas < rights )
+	margin = np.maximum( lefts, rights ) - thetas
+
+	return ets[ minima & ( thetas - margin < limits ) ]
+
+def find_solar_eclipses( et0, etf, body0, body1, frame = 'J2000', args = {} ):
+	'''
+	Search for the solar eclipses of body0 whose umbra (or antumbra)
+	reaches the surface of body1 between et0 and etf. Candidate
+	syzygies from find_solar_eclipse_candidates are refined with
+	calc_solar_eclipse_array every "dt" seconds over a window of one
+	coarse step plus "pad" seconds on each side, with the windows
+	distributed across a process pool ( n_workers, chunksize, kernels,
+	see parallel_tools.pool_map ). Workers furnish "kernels", so they
+	must cover both bodies, the Sun and body1's body-fixed frame.
+	Returns a dictionary of the eclipse tracks' start and end ets,
+	durations, ets and latlons arrays
+	'''
+	_args = {
+		'coarse_dt': 21600.0,
+		'dt'       : 20.0,
+		'pad'      : 7200.0,
+		'n_workers': None,
+		'chunksize': 1,
+		'kernels'  : [ sd.leapseconds_kernel, sd.de432, sd.pck00010 ]
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	candidates = find_solar_eclipse_candidates(
+		et0, etf, body0, body1, frame, _args[ 'coarse_dt' ] )
+	half_width = _args[ 'coarse_dt' ] + _args[ 'pad' ]
+	tasks      = [ ( max( et - half_width, et0 ), min( et + half_width, etf ),
+		_args[ 'dt' ], body0, body1, frame ) for et in candidates ]
+
+	if _args[ 'n_workers' ] == 1:
+		results = [ calc_solar_eclipse_window( task ) for task in tasks ]
+	else:
+		results = pa.pool_map( calc_solar_eclipse_window, tasks, {
+			'n_workers': _args[ 'n_workers' ],
+			'chunksize': _args[ 'chunksize' ],
+			'kernels'  : _args[ 'kernels'   ]
+			} )
+
+	ecls = { 'ets': [], 'durations': [], 'track_ets': [], 'latlons': [] }
+	for ets, latlons in results:
+		if ets.shape[ 0 ] == 0:
+			continue
+		ecls[ 'ets'       ].append( [ ets[ 0 ], ets[ -1 ] ] )
+		ecls[ 'durations' ].append( ets[ -1 ] - ets[ 0 ] )
+		ecls[ 'track_ets' ].append( ets )
+		ecls[ 'latlons'   ].append( latlons )
+
+	return ecls
 
 def eclipse_root_func( sigma, args ):
 	return nt.norm( sigma * args[ 's_hat' ] - args[ 'r' ] ) - args[ 'radius' ]
 
 def check_umbra( delta_ps, Dp, proj_scalar, rej_norm, r_body = 0 ):
+	'''
+	Umbra cone test, for scalars or arrays
+	'''
 	Xu     = ( Dp * delta_ps ) / ( pd.sun[ 'diameter' ] - Dp )
-	alphau = math.asin( Dp / ( 2 * Xu ) )
-	zeta   = ( Xu - proj_scalar ) * math.tan( alphau )
+	alphau = np.arcsin( Dp / ( 2 * Xu ) )
+	zeta   = ( Xu - proj_scalar ) * np.tan( alphau )
 	return rej_norm - r_body <= zeta
 
 def check_penumbra( delta_ps, Dp, proj_scalar, rej_norm, r_body = 0 ):
+	'''
+	Penumbra cone test, for scalars or arrays
+	'''
 	Xp     = ( Dp * delta_ps ) / ( pd.sun[ 'diameter' ] + Dp )
-	alphap = math.asin( Dp / ( 2 * Xp ) )
-	kappa  = ( Xp + proj_scalar ) * math.tan( alphap )
+	alphap = np.arcsin( Dp / ( 2 * Xp ) )
+	kappa  = ( Xp + proj_scalar ) * np.tan( alphap )
 	return rej_norm - r_body <= kappa
 
 def calc_eclipse_array( ets, rs, body, frame = 'J2000', r_body = 0 ):
-	eclipses = np.zeros( rs.shape[ 0 ] )
+	'''
+	Vectorized check_eclipse over positions rs, shape ( N, 3 ),
+	w.r.t body at ephemeris times ets, shape ( N, ).
+	Sun positions are calculated with a single spkpos call
+	'''
+	ets = np.asarray( ets, dtype = float )
+	if ets.shape[ 0 ] == 0:
+		return np.zeros( 0 )
+
+	rs_sun2body = np.array( spice.spkpos(
+		str( body[ 'SPICE_ID' ] ), ets, frame, 'LT', 'SUN' )[ 0 ] )
+	delta_ps     = np.linalg.norm( rs_sun2body, axis = 1 )
+	s_hats       = rs_sun2body / delta_ps[ :, None ]
+	proj_scalars = np.sum( rs * s_hats, axis = 1 )
+	rej_norms    = np.linalg.norm(
+		rs - proj_scalars[ :, None ] * s_hats, axis = 1 )
 
-	for n in range( len( ets ) ):
-		eclipses[ n ] = check_eclipse(
-			ets[ n ], rs[ n ], body, frame, r_body )
+	umbra    = check_umbra( delta_ps, body[ 'diameter' ],
+		proj_scalars, rej_norms, r_body )
+	penumbra = check_penumbra( delta_ps, body[ 'diameter' ],
+		proj_scalars, rej_norms, r_body )
 
+	eclipses = np.where( umbra, 2.0, np.where( penumbra, 1.0, -1.0 ) )
+	eclipses[ proj_scalars <= 0.0 ] = -1.0
 	return eclipses
 
+def calc_illumination_array( ets, rs, body, frame = 'J2000' ):
+	'''
+	Visible fraction of the solar disk ( 0 to 1 ) at positions rs,
+	shape ( N, 3 ), w.r.t an occulting body at ephemeris times ets,
+	using the apparent radii of the Sun and the body and their
+	apparent separation (Montenbruck & Gill, Satellite Orbits, 3.4.2)
+	'''
+	ets = np.asarray( ets, dtype = float )
+	if ets.shape[ 0 ] == 0:
+		return np.zeros( 0 )
+
+	rs_body2sun = -np.array( spice.spkpos(
+		str( body[ 'SPICE_ID' ] ), ets, frame, 'LT', 'SUN' )[ 0 ] )
+	rs_sc2sun   = rs_body2sun - rs
+	norms_r     = np.linalg.norm( rs,        axis = 1 )
+	norms_sun   = np.linalg.norm( rs_sc2sun, axis = 1 )
+
+	a = np.arcsin( pd.sun[ 'radius' ] / norms_sun )
+	b = np.arcsin( np.minimum( body[ 'radius' ] / norms_r, 1.0 ) )
+	c = np.arccos( np.clip( -np.sum( rs * rs_sc2sun, axis = 1 ) /
+		( norms_r * norms_sun ), -1.0, 1.0 ) )
+
+	illumination = np.ones( ets.shape[ 0 ] )
+	illumination[ c < b - a ] = 0.0
+
+	annular = c < a - b
+	illumination[ annular ] = 1.0 - ( b[ annular ] / a[ annular ] ) ** 2
+
+	partial = ( c < a + b ) & ( c > np.abs( a - b ) )
+	a, b, c = a[ partial ], b[ partial ], c[ partial ]
+	x       = ( c * c + a * a - b * b ) / ( 2 * c )
+	y       = np.sqrt( np.maximum( a * a - x * x, 0.0 ) )
+	area    = a * a * np.arccos( np.clip( x / a, -1.0, 1.0 ) ) +\
+			  b * b * np.arccos( np.clip( ( c - x ) / b, -1.0, 1.0 ) ) - c * y
+	illumination[ partial ] = 1.0 - area / ( np.pi * a * a )
+	return illumination
+
+def calc_beta_angles( ets, coes, body = pd.earth, frame = 'J2000', args = {} ):
+	'''
+	Solar beta angles ( angle between the orbit plane and the Sun
+	vector ) at ephemeris times ets, shape ( N, ), for coes of shape
+	( N, 6 ) or ( 6, ) ordered [ a, e, i, ta, aop, raan ].
+	Sun positions are calculated with a single spkpos call.
+	With "J2" True, the raan of each coes set drifts at the secular J2
+	rate of body from ets[ 0 ]. Beta angles change slowly ( about a degree
+	per day at most ), so daily ets are enough for eclipse seasons
+	'''
+	_args = {
+		'deg': True,
+		'J2' : False
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	ets  = np.asarray( ets, dtype = float )
+	coes = np.asarray( coes, dtype = float )
+	if ets.shape[ 0 ] == 0:
+		return np.zeros( 0 )
+
+	a, e, i, raan = coes[ ..., 0 ], coes[ ..., 1 ], coes[ ..., 2 ], coes[ ..., 5 ]
+	if _args[ 'deg' ]:
+		i    = i    * nt.d2r
+		raan = raan * nt.d2r
+
+	if _args[ 'J2' ]:
+		p     = a * ( 1 - e * e )
+		n     = np.sqrt( body[ 'mu' ] / a ** 3 )
+		raan  = raan - 1.5 * n * body[ 'J2' ] * ( body[ 'radius' ] / p ) ** 2 *\
+			np.cos( i ) * ( ets - ets[ 0 ] )
+
+	h_hats = np.stack( np.broadcast_arrays(
+		 np.sin( i ) * np.sin( raan ),
+		-np.sin( i ) * np.cos( raan ),
+		 np.cos( i ) * np.ones( ets.shape[ 0 ] ) ), axis = -1 )
+
+	rs_sun = np.array( spice.spkpos(
+		'SUN', ets, frame, 'LT', str( body[ 'SPICE_ID' ] ) )[ 0 ] )
+	s_hats = rs_sun / np.linalg.norm( rs_sun, axis = 1 )[ :, None ]
+
+	betas = np.arcsin( np.clip(
+		np.sum( h_hats * s_hats, axis = 1 ), -1.0, 1.0 ) )
+	if _args[ 'deg' ]:
+		betas *= nt.r2d
+	return betas
+
+def calc_shadow_durations( betas, a, body = pd.earth, deg = True ):
+	'''
+	Maximum time in shadow per orbit for circular orbits of radius a
+	at beta angles betas, with a cylindrical shadow of body:
+	T / pi * arccos( sqrt( a^2 - R^2 ) / ( a * cos( beta ) ) ),
+	zero above the critical beta angle arcsin( R / a )
+	'''
+	betas = np.asarray( betas, dtype = float )
+	if deg:
+		betas = betas * nt.d2r
+
+	period = 2 * np.pi * np.sqrt( a ** 3 / body[ 'mu' ] )
+	cosx   = np.sqrt( a * a - body[ 'radius' ] ** 2 ) /\
+		( a * np.cos( betas ) )
+	return period / np.pi * np.arccos( np.minimum( cosx, 1.0 ) )
+
+def find_eclipse_seasons( ets, betas, a, body = pd.earth, deg = True,
+	v = False, vv = False ):
+	'''
+	Eclipse seasons of a circular orbit of radius a from its beta angles
+	at ephemeris times ets, i.e. the spans where | beta | is below the
+	critical beta angle arcsin( R / a ). Boundaries are linearly
+	interpolated between samples, and seasons in progress at the first
+	or last et start or end there. Returns the same keys as find_eclipses
+	except for "idxs", plus the per season "max_shadow" duration
+	( calc_shadow_durations ) and the per et "shadow_durations"
+	'''
+	ets   = np.asarray( ets,   dtype = float )
+	betas = np.asarray( betas, dtype = float )
+	beta_crit = math.asin( body[ 'radius' ] / a )
+	if deg:
+		beta_crit *= nt.r2d
+
+	shadow_durations = calc_shadow_durations( betas, a, body, deg )
+	margins  = beta_crit - np.abs( betas )
+	inside   = margins > 0.0
+	diff     = np.diff( inside.astype( int ) )
+	idxs     = np.where( diff != 0 )[ 0 ]
+	crossing = ets[ idxs ] + margins[ idxs ] / ( margins[ idxs ] -
+		margins[ idxs + 1 ] ) * ( ets[ idxs + 1 ] - ets[ idxs ] )
+
+	entrances = list( crossing[ diff[ idxs ] ==  1 ] )
+	exits     = list( crossing[ diff[ idxs ] == -1 ] )
+	if inside[ 0 ]:
+		entrances.insert( 0, ets[ 0 ] )
+	if inside[ -1 ]:
+		exits.append( ets[ -1 ] )
+
+	if len( entrances ) == 0:
+		return {}
+
+	ecls                 = {}
+	ecls[ 'ets'        ] = [ [ et0, etf ] for et0, etf in zip( entrances, exits ) ]
+	ecls[ 'durations'  ] = [ etf - et0 for et0, etf in ecls[ 'ets' ] ]
+	ecls[ 'max_shadow' ] = [ shadow_durations[ ( ets >= et0 ) & ( ets <= etf ) ].max(
+		initial = 0.0 ) for et0, etf in ecls[ 'ets' ] ]
+	ecls[ 'total_time' ] = sum( ecls[ 'durations' ] )
+	ecls[ 'max_time'   ] = max( ecls[ 'durations' ] )
+	ecls[ 'ratio'      ] = ecls[ 'total_time' ] / ( ets[ -1 ] - ets[ 0 ] )
+	ecls[ 'beta_crit'  ] = beta_crit
+	ecls[ 'shadow_durations' ] = shadow_durations
+
+	if v or vv:
+		print_eclipses( ecls, vv )
+
+	return ecls
+
 def find_eclipses( ets, a, method = 'either', v = False, vv = False ):
 	diff          = np.diff( a )
 	idxs          = ECLIPSE_MAP[ method ]
@@ -279,20 +988,98 @@ def find_eclipses( ets, a, method = 'either', v = False, vv = False ):
 	ecls[ 'ratio'      ] = ecls[ 'total_time' ] / ( ets[ -1 ] - ets[ 0 ] )
 
 	if v or vv:
-		print( '\n******** ECLIPSE SUMMARY START ********' )
-		print( f'Number of eclipses: {len(ecls["idxs"])}' )
-		print( 'Eclipse durations (seconds): ', end = '' )
-		print( [ float(f'{a:.2f}') for a in ecls[ "durations" ] ] )
-		print( f'Max eclipse duration: {ecls["max_time"]:.2f} seconds' )
-		print( f'Eclipse time ratio: {ecls["ratio"]:.3f}' )
-		if vv:
-			print( 'Eclipse entrances and exits:' )
-			for n in range( len( ecls[ 'ets' ] ) ):
-				print(
-					spice.et2utc( ecls[ 'ets' ][ n ][ 0 ], 'C', 1 ),
-					'-->',
-					spice.et2utc( ecls[ 'ets' ][ n ][ 1 ], 'C', 1 )
-				)
-		print( '******** ECLIPSE SUMMARY END ********\n' )
+		print_eclipses( ecls, vv )
+
+	return ecls
+
+def calc_shadow_functions( r, r_sun2body, Dp ):
+	'''
+	Continuous umbra and penumbra shadow functions of position r
+	w.r.t a body of diameter Dp, negative inside the shadow cones
+	( same regions as check_umbra and check_penumbra ). On the sunlit
+	side of the body the rejection from the shadow axis is replaced by
+	the distance to the body, which is equal to it at the terminator plane
+	'''
+	delta_ps    = nt.norm( r_sun2body )
+	s_hat       = r_sun2body / delta_ps
+	proj_scalar = np.dot( r, s_hat )
+
+	if proj_scalar <= 0.0:
+		rej_norm    = nt.norm( r )
+		proj_scalar = 0.0
+	else:
+		rej_norm = nt.norm( r - proj_scalar * s_hat )
+
+	Xu    = ( Dp * delta_ps ) / ( pd.sun[ 'diameter' ] - Dp )
+	Xp    = ( Dp * delta_ps ) / ( pd.sun[ 'diameter' ] + Dp )
+	zeta  = ( Xu - proj_scalar ) * math.tan( math.asin( Dp / ( 2 * Xu ) ) )
+	kappa = ( Xp + proj_scalar ) * math.tan( math.asin( Dp / ( 2 * Xp ) ) )
+	return rej_norm - zeta, rej_norm - kappa
+
+def find_eclipses_events( et0, etf, ets_umbra, ets_penumbra,
+	umbra0, penumbra0, method = 'either', v = False, vv = False ):
+	'''
+	Eclipse table from the umbra and penumbra boundary crossing times
+	( e.g. located as integrator events ), with the same keys as
+	find_eclipses except for "idxs". umbra0 and penumbra0 are whether
+	the spacecraft is inside each cone at et0
+	'''
+	regions = {
+		'umbra'   : lambda umbra, penumbra: umbra,
+		'penumbra': lambda umbra, penumbra: penumbra and not umbra,
+		'either'  : lambda umbra, penumbra: penumbra
+	}
+	region    = regions[ method ]
+	sign      = 1 if etf >= et0 else -1
+	crossings = sorted(
+		[ ( sign * et, 0 ) for et in ets_umbra    ] +
+		[ ( sign * et, 1 ) for et in ets_penumbra ] )
+
+	inside    = [ bool( umbra0 ), bool( penumbra0 ) ]
+	in_ecl    = region( *inside )
+	entrance  = et0 if in_ecl else None
+	ecl_ets   = []
+
+	for et, n in crossings:
+		inside[ n ] = not inside[ n ]
+		_in_ecl     = region( *inside )
+		if _in_ecl and not in_ecl:
+			entrance = sign * et
+		elif in_ecl and not _in_ecl:
+			ecl_ets.append( [ entrance, sign * et ] )
+		in_ecl = _in_ecl
+
+	if in_ecl:
+		ecl_ets.append( [ entrance, etf ] )
+
+	if len( ecl_ets ) == 0:
+		return {}
+
+	ecls                 = {}
+	ecls[ 'ets'        ] = ecl_ets
+	ecls[ 'durations'  ] = [ abs( ets[ 1 ] - ets[ 0 ] ) for ets in ecl_ets ]
+	ecls[ 'total_time' ] = sum( ecls[ 'durations' ] )
+	ecls[ 'max_time'   ] = max( ecls[ 'durations' ] )
+	ecls[ 'ratio'      ] = ecls[ 'total_time' ] / abs( etf - et0 )
+
+	if v or vv:
+		print_eclipses( ecls, vv )
 
 	return ecls
+
+def print_eclipses( ecls, vv = False ):
+	print( '\n******** ECLIPSE SUMMARY START ********' )
+	print( f'Number of eclipses: {len(ecls["ets"])}' )
+	print( 'Eclipse durations (seconds): ', end = '' )
+	print( [ float(f'{a:.2f}') for a in ecls[ "durations" ] ] )
+	print( f'Max eclipse duration: {ecls["max_time"]:.2f} seconds' )
+	print( f'Eclipse time ratio: {ecls["ratio"]:.3f}' )
+	if vv:
+		print( 'Eclipse entrances and exits:' )
+		for n in range( len( ecls[ 'ets' ] ) ):
+			print(
+				spice.et2utc( ecls[ 'ets' ][ n ][ 0 ], 'C', 1 ),
+				'-->',
+				spice.et2utc( ecls[ 'ets' ][ n ][ 1 ], 'C', 1 )
+			)
+	print( '******** ECLIPSE SUMMARY END ********\n' )
@@ -0,0 +1,62 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Parallel Processing Tools Library
+'''
+
+# Python standard libraries
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# 3rd party libraries
+import spiceypy as spice
+
+# AWP library
+import spice_data as sd
+
+def null_pool_args():
+	return {
+		'n_workers': os.cpu_count(),
+		'chunksize': 16,
+		'kernels'  : [ sd.leapseconds_kernel ],
+		'progress' : None
+	}
+
+def init_worker( kernels ):
+	'''
+	Process pool initializer. CSPICE is not thread-safe, so each
+	worker process furnishes its own copy of the kernels once
+	at startup
+	'''
+	for kernel in kernels:
+		spice.furnsh( kernel )
+
+def pool_map( func, tasks, args = {} ):
+	'''
+	Map func over tasks in a process pool, returning results in the
+	same order as tasks. Tasks are submitted in chunks of
+	args[ 'chunksize' ], and args[ 'progress' ] (if given) is called
+	as progress( n_completed, n_tasks ) each time a result comes back
+	'''
+	_args = null_pool_args()
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	tasks   = list( tasks )
+	n_tasks = len( tasks )
+	results = []
+
+	with ProcessPoolExecutor( max_workers = _args[ 'n_workers' ],
+		initializer = init_worker,
+		initargs    = ( _args[ 'kernels' ], ) ) as executor:
+
+		for result in executor.map( func, tasks,
+			chunksize = _args[ 'chunksize' ] ):
+			results.append( result )
+
+			if _args[ 'progress' ] is not None:
+				_args[ 'progress' ]( len( results ), n_tasks )
+
+	return results
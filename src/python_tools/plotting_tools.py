@@ -822,6 +822,79 @@ def plot_eclipse_array( ets, arr, args ):
 
 	plt.close()
 
+def plot_porkchop( porkchop, args ):
+	'''
+	Contours of departure C3, arrival v-infinity (or total delta-v)
+	and time of flight from porkchop_tools.calc_porkchop
+	'''
+	_args = {
+		'figsize'     : ( 16, 10 ),
+		'C3_levels'   : [ 8, 10, 12, 15, 20, 25, 30, 40, 50 ],
+		'vinf_levels' : [ 2, 2.5, 3, 3.5, 4, 5, 6, 8 ],
+		'tof_levels'  : 10,
+		'arrival_key' : 'vinf_arrive',
+		'C3_color'    : 'm',
+		'vinf_color'  : 'c',
+		'tof_color'   : 'w',
+		'lw'          : 1.5,
+		'fontsize'    : 10,
+		'labelsize'   : 15,
+		'title'       : 'Porkchop Plot',
+		'show'        : False,
+		'filename'    : False,
+		'dpi'         : 300,
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	x = ( porkchop[ 'ets_depart' ] - porkchop[ 'ets_depart' ][ 0 ] ) / 86400.0
+	y = ( porkchop[ 'ets_arrive' ] - porkchop[ 'ets_arrive' ][ 0 ] ) / 86400.0
+
+	fig, ax0 = plt.subplots( 1, 1, figsize = _args[ 'figsize' ] )
+
+	cs = ax0.contour( x, y, porkchop[ 'C3' ],
+		levels = _args[ 'C3_levels' ], colors = _args[ 'C3_color' ],
+		linewidths = _args[ 'lw' ] )
+	ax0.clabel( cs, fontsize = _args[ 'fontsize' ] )
+
+	cs = ax0.contour( x, y, porkchop[ _args[ 'arrival_key' ] ],
+		levels = _args[ 'vinf_levels' ], colors = _args[ 'vinf_color' ],
+		linewidths = _args[ 'lw' ] )
+	ax0.clabel( cs, fontsize = _args[ 'fontsize' ] )
+
+	cs = ax0.contour( x, y, porkchop[ 'tofs' ] / 86400.0,
+		levels = _args[ 'tof_levels' ], colors = _args[ 'tof_color' ],
+		linewidths = _args[ 'lw' ] / 2, linestyles = 'dotted' )
+	ax0.clabel( cs, fontsize = _args[ 'fontsize' ], fmt = '%d days' )
+
+	ax0.plot( [], [], color = _args[ 'C3_color' ],
+		label = r'C3 $(\dfrac{km^2}{s^2})$' )
+	ax0.plot( [], [], color = _args[ 'vinf_color' ],
+		label = r'Arrival $V_{\infty}$ $(\dfrac{km}{s})$'
+		if _args[ 'arrival_key' ] == 'vinf_arrive' else
+		r'Total $\Delta V$ $(\dfrac{km}{s})$' )
+	ax0.plot( [], [], ':', color = _args[ 'tof_color' ],
+		label = 'Time of flight' )
+
+	ax0.grid( linestyle = 'dotted' )
+	ax0.set_xlabel( f'Departure (days past {porkchop[ "date0" ]})',
+		size = _args[ 'labelsize' ] )
+	ax0.set_ylabel( f'Arrival (days past {porkchop[ "date1" ]})',
+		size = _args[ 'labelsize' ] )
+	ax0.legend( fontsize = 'large' )
+
+	plt.suptitle( _args[ 'title' ] )
+	plt.tight_layout()
+
+	if _args[ 'filename' ]:
+		plt.savefig( _args[ 'filename' ], dpi = _args[ 'dpi' ] )
+		print( 'Saved', _args[ 'filename' ] )
+
+	if _args[ 'show' ]:
+		plt.show()
+
+	plt.close()
+
 def plot_cr3bp_2d( mu, rs, args ):
 	_args = {
 		'figsize'      : ( 10, 10 ),
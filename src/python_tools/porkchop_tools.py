@@ -0,0 +1,129 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Porkchop Plot / Launch Window Grid Library
+'''
+
+# 3rd party libraries
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+import lamberts_tools as lt
+import planetary_data as pd
+import spice_tools    as st
+
+def null_porkchop_args():
+	return {
+		'frame'    : 'ECLIPJ2000',
+		'center'   : 0,
+		'mu'       : pd.sun[ 'mu' ],
+		'prograde' : True,
+		'tm'       : 1,
+		'park0'    : None,
+		'park1'    : None,
+		'solver'   : 'batch',
+		'tol'      : 1e-6,
+		'max_steps': 200
+	}
+
+def calc_park_dv( vinfs, park ):
+	'''
+	Impulsive delta-v between a circular parking orbit [ mu, radius ]
+	and a hyperbola with v-infinity vinfs, or vinfs if park is None
+	'''
+	if park is None:
+		return vinfs
+	mu, r = park
+	return np.sqrt( vinfs ** 2 + 2 * mu / r ) - np.sqrt( mu / r )
+
+def calc_porkchop( planet0, planet1, ets_depart, ets_arrive, args = {} ):
+	'''
+	Lambert transfers from planet0 to planet1 (SPICE IDs) for every
+	combination of departure and arrival times. Planet states come
+	from one spkezr call per date axis, and all cells are solved in
+	one lamberts_universal_variables_array call ( "solver" 'batch' ), or
+	walked cell by cell with warm starts from neighboring cells by
+	lamberts_sweep ( "solver" 'sweep', adds "steps" per cell ).
+	With "prograde" True, tm is chosen per cell so that transfers are
+	prograde w.r.t. the frame's z-axis, otherwise "tm" is used for
+	every cell.
+	Matrices have shape ( len( ets_arrive ), len( ets_depart ) ), with
+	nan where the arrival is before the departure or Lambert failed.
+	Total delta-v is the sum of the departure and arrival v-infinities,
+	or of the burns from / into circular parking orbits if "park0" /
+	"park1" are given as [ mu, radius ]
+	'''
+	_args = null_porkchop_args()
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	ets_depart = np.asarray( ets_depart, dtype = float )
+	ets_arrive = np.asarray( ets_arrive, dtype = float )
+	states0    = st.calc_ephemeris( str( planet0 ), ets_depart,
+		_args[ 'frame' ], str( _args[ 'center' ] ) )
+	states1    = st.calc_ephemeris( str( planet1 ), ets_arrive,
+		_args[ 'frame' ], str( _args[ 'center' ] ) )
+
+	idx1, idx0 = np.meshgrid( np.arange( ets_arrive.shape[ 0 ] ),
+		np.arange( ets_depart.shape[ 0 ] ), indexing = 'ij' )
+	tofs  = ets_arrive[ idx1 ] - ets_depart[ idx0 ]
+	valid = tofs > 0.0
+	r0s   = states0[ idx0, :3 ]
+	r1s   = states1[ idx1, :3 ]
+
+	if _args[ 'prograde' ]:
+		tms = np.where( np.cross( r0s, r1s )[ ..., 2 ] >= 0.0, 1, -1 )
+	else:
+		tms = np.full( tofs.shape, _args[ 'tm' ] )
+
+	solver_args = {
+		'mu'       : _args[ 'mu' ],
+		'tol'      : _args[ 'tol' ],
+		'max_steps': _args[ 'max_steps' ]
+	}
+	if _args[ 'solver' ] == 'sweep':
+		solver_args[ 'tm' ] = tms
+		v0s, v1s, steps, solved = lt.lamberts_sweep(
+			r0s, r1s, tofs, solver_args )
+		v0s, v1s, solved = v0s[ valid ], v1s[ valid ], solved[ valid ]
+	else:
+		solver_args[ 'tm' ] = tms[ valid ]
+		v0s, v1s, solved = lt.lamberts_universal_variables_array(
+			r0s[ valid ], r1s[ valid ], tofs[ valid ], solver_args )
+
+	vinfs0 = np.linalg.norm( v0s - states0[ idx0[ valid ], 3: ], axis = 1 )
+	vinfs1 = np.linalg.norm( v1s - states1[ idx1[ valid ], 3: ], axis = 1 )
+
+	shape = tofs.shape
+	C3    = np.full( shape, np.nan )
+	vinf0 = np.full( shape, np.nan )
+	vinf1 = np.full( shape, np.nan )
+	dv    = np.full( shape, np.nan )
+	C3   [ valid ] = vinfs0 ** 2
+	vinf0[ valid ] = vinfs0
+	vinf1[ valid ] = vinfs1
+	dv   [ valid ] = calc_park_dv( vinfs0, _args[ 'park0' ] ) +\
+					 calc_park_dv( vinfs1, _args[ 'park1' ] )
+
+	_solved          = np.zeros( shape, dtype = bool )
+	_solved[ valid ] = solved
+	tofs[ ~valid ]   = np.nan
+
+	porkchop = {
+		'ets_depart' : ets_depart,
+		'ets_arrive' : ets_arrive,
+		'date0'      : spice.et2utc( ets_depart[ 0 ], 'C', 0 )[ :11 ],
+		'date1'      : spice.et2utc( ets_arrive[ 0 ], 'C', 0 )[ :11 ],
+		'tofs'       : tofs,
+		'C3'         : C3,
+		'vinf_depart': vinf0,
+		'vinf_arrive': vinf1,
+		'dv_total'   : dv,
+		'solved'     : _solved
+	}
+	if _args[ 'solver' ] == 'sweep':
+		porkchop[ 'steps' ] = steps
+	return porkchop
@@ -6,8 +6,13 @@ https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
 SPICE convenience functions using SpiceyPy
 '''
 
+# Python standard libraries
+import math
+import bisect
+
 # 3rd party libraries
 import spiceypy as spice
+import numpy    as np
 from numpy import array, zeros
 
 def calc_ephemeris( target, ets, frame, observer ):
@@ -25,6 +30,13 @@ def calc_ephemeris( target, ets, frame, observer ):
 			states[ n ] = spice.spkgeo( target, ets[ n ], frame, observer )[ 0 ]
 		return states
 
+def get_loaded_kernels():
+	'''
+	File names of all furnished kernels, in load order
+	'''
+	return [ spice.kdata( n, 'ALL' )[ 0 ]
+		for n in range( spice.ktotal( 'ALL' ) ) ]
+
 def write_bsp( ets, states, args = {} ):
 	'''
 	Write or append to a BSP / SPK kernel from a NumPy array
@@ -59,3 +71,193 @@ def write_bsp( ets, states, args = {} ):
 
 	if _args[ 'verbose' ]:
 		print( f'{action} { _args[ "bsp_fn" ] }.' )
+
+def fit_ephemeris_table( target, et0, etf, frame, observer, args = {} ):
+	'''
+	Fit piecewise Chebyshev polynomials to the position of target
+	w.r.t observer over [ et0, etf ]. Each segment is interpolated at
+	its Chebyshev nodes and checked in between them, and only the
+	segments over the requested tolerance (km) are split, into as many
+	pieces as the error estimate calls for. The samples of a split
+	segment are kept as extra check points for its pieces
+	'''
+	_args = {
+		'tol'         : 1e-3,
+		'degree'      : 12,
+		'n_segments'  : 1,
+		'max_segments': 2 ** 16,
+		'abcorr'      : 'NONE'
+	}
+	for key in args.keys():
+		_args[ key ] = args[ key ]
+
+	degree = _args[ 'degree' ]
+	ks     = np.arange( degree + 1, dtype = float )
+	nodes  = -np.cos( np.pi * ( ks + 0.5 ) / ( degree + 1 ) )
+	checks = np.concatenate( ( [ -1.0 ],
+		( nodes[ :-1 ] + nodes[ 1: ] ) / 2.0, [ 1.0 ] ) )
+
+	'''
+	Interpolation at the Chebyshev nodes is a discrete cosine transform,
+	so the coefficients of every segment come from one matrix product
+	'''
+	fit_matrix        = 2.0 / ( degree + 1 ) * np.cos( np.outer( ks,
+		np.arccos( nodes ) ) )
+	fit_matrix[ 0 ] /= 2.0
+	check_matrix      = np.cos( np.outer( np.arccos( checks ), ks ) )
+
+	def calc_positions( ets ):
+		return np.array( spice.spkpos( str( target ), ets, frame,
+			_args[ 'abcorr' ], str( observer ) )[ 0 ] ).reshape( -1, 3 )
+
+	bounds    = np.linspace( et0, etf, _args[ 'n_segments' ] + 1 )
+	segments  = list( zip( bounds[ :-1 ], bounds[ 1: ] ) )
+	inherited = [ ( np.zeros( 0 ), np.zeros( ( 0, 3 ) ) ) ] * len( segments )
+	parents   = [ None ] * len( segments )
+	fitted    = []
+	max_error = 0.0
+
+	while segments:
+		ab        = np.array( segments )
+		mids      = ( ab[ :, 0 ] + ab[ :, 1 ] ) / 2.0
+		halves    = ( ab[ :, 1 ] - ab[ :, 0 ] ) / 2.0
+		node_ets  = mids[ :, None ] + halves[ :, None ] * nodes
+		check_ets = mids[ :, None ] + halves[ :, None ] * checks
+		check_ets[ :, 0  ] = ab[ :, 0 ]
+		check_ets[ :, -1 ] = ab[ :, 1 ]
+
+		n_segs    = len( segments )
+		rs        = calc_positions( np.concatenate(
+			( node_ets.ravel(), check_ets.ravel() ) ) )
+		rs_nodes  = rs[ :n_segs * ( degree + 1 ) ].reshape(
+			n_segs, degree + 1, 3 )
+		rs_checks = rs[ n_segs * ( degree + 1 ): ].reshape(
+			n_segs, degree + 2, 3 )
+		coeffs    = np.einsum( 'ji,sik->sjk', fit_matrix, rs_nodes )
+		errors    = np.max( np.linalg.norm( np.einsum( 'cj,sjk->sck',
+			check_matrix, coeffs ) - rs_checks, axis = 2 ), axis = 1 )
+
+		_segments  = []
+		_inherited = []
+		_parents   = []
+		for n in range( n_segs ):
+			ets, rs_ = inherited[ n ]
+			if ets.shape[ 0 ] > 0:
+				s      = np.clip( ( ets - mids[ n ] ) / halves[ n ], -1.0, 1.0 )
+				errors[ n ] = max( errors[ n ], np.max( np.linalg.norm(
+					np.cos( np.outer( np.arccos( s ), ks ) ) @ coeffs[ n ] -
+					rs_, axis = 1 ) ) )
+
+			if errors[ n ] <= _args[ 'tol' ]:
+				fitted.append( ( segments[ n ][ 0 ], coeffs[ n ] ) )
+				max_error = max( max_error, errors[ n ] )
+				continue
+
+			'''
+			Chebyshev interpolation error scales with segment
+			length ** ( degree + 1 ) once the segments resolve the
+			motion, and more slowly before that, so the number of pieces
+			also uses the order measured against the parent segment
+			'''
+			order = degree + 1.0
+			if parents[ n ] is not None:
+				parent_error, parent_pieces = parents[ n ]
+				order = ( order + min( max( math.log( max(
+					parent_error / errors[ n ], 1.0 ) ) /
+					math.log( parent_pieces ), 1.0 ), order ) ) / 2.0
+			n_pieces = int( min( max( math.ceil( 1.1 * ( errors[ n ] /
+				_args[ 'tol' ] ) ** ( 1.0 / order ) ), 2 ), 64 ) )
+			ets  = np.concatenate( ( ets, node_ets[ n ], check_ets[ n ] ) )
+			rs_  = np.concatenate( ( rs_, rs_nodes[ n ], rs_checks[ n ] ) )
+			_bounds = np.linspace( segments[ n ][ 0 ], segments[ n ][ 1 ],
+				n_pieces + 1 )
+			for a, b in zip( _bounds[ :-1 ], _bounds[ 1: ] ):
+				mask = ( ets >= a ) & ( ets <= b )
+				_segments.append( ( a, b ) )
+				_inherited.append( ( ets[ mask ], rs_[ mask ] ) )
+				_parents.append( ( errors[ n ], n_pieces ) )
+
+		if len( fitted ) + len( _segments ) > _args[ 'max_segments' ]:
+			raise RuntimeError(
+				'Ephemeris table did not reach requested tolerance.' )
+		segments, inherited, parents = _segments, _inherited, _parents
+
+	fitted.sort( key = lambda segment: segment[ 0 ] )
+	return {
+		'target'    : target,
+		'observer'  : observer,
+		'frame'     : frame,
+		'et0'       : et0,
+		'etf'       : etf,
+		'slack'     : np.spacing( max( abs( et0 ), abs( etf ) ) ),
+		'bounds'    : np.array( [ seg[ 0 ] for seg in fitted ] + [ etf ] ),
+		'n_segments': len( fitted ),
+		'ks'        : ks,
+		'coeffs'    : np.array( [ seg[ 1 ] for seg in fitted ] ),
+		'max_error' : max_error
+	}
+
+def check_ephemeris_table( table, et0, etf, frame, observer ):
+	'''
+	Check that an ephemeris table covers [ et0, etf ] in the given
+	frame w.r.t the given observer, so that tables passed in by the
+	user can't be evaluated outside of their fit
+	'''
+	if table[ 'frame' ] != frame or\
+		str( table[ 'observer' ] ) != str( observer ):
+		raise RuntimeError(
+			f'Ephemeris table of {table[ "target" ]} is in frame '
+			f'{table[ "frame" ]} w.r.t {table[ "observer" ]}, '
+			f'expected {frame} w.r.t {observer}.' )
+
+	if table[ 'et0' ] > et0 or table[ 'etf' ] < etf:
+		raise RuntimeError(
+			f'Ephemeris table of {table[ "target" ]} does not cover '
+			'the propagation time span.' )
+
+def eval_ephemeris_table( table, et ):
+	'''
+	Evaluate an ephemeris table from fit_ephemeris_table at a single
+	ephemeris time (returns shape (3,)) or an array of them (shape (N, 3)).
+	Raises RuntimeError for epochs outside of [ et0, etf ]
+	( within floating point precision )
+	'''
+	if np.ndim( et ) == 0:
+		return ephemeris_table_func( table )( et )
+
+	et = np.asarray( et )
+	if np.any( et < table[ 'et0' ] - table[ 'slack' ] ) or\
+		np.any( et > table[ 'etf' ] + table[ 'slack' ] ):
+		raise RuntimeError( 'Epoch outside of ephemeris table span.' )
+
+	bounds = table[ 'bounds' ]
+	idxs   = np.clip( np.searchsorted( bounds, et, 'right' ) - 1,
+		0, table[ 'n_segments' ] - 1 )
+	s      = np.clip( ( 2.0 * et - bounds[ idxs ] - bounds[ idxs + 1 ] ) /
+		( bounds[ idxs + 1 ] - bounds[ idxs ] ), -1.0, 1.0 )
+	Ts     = np.cos( np.arccos( s )[ :, None ] * table[ 'ks' ] )
+	return np.einsum( 'nk,nkj->nj', Ts, table[ 'coeffs' ][ idxs ] )
+
+def ephemeris_table_func( table ):
+	'''
+	Scalar evaluation function of an ephemeris table, with the segment
+	bounds unpacked once, for use inside equations of motion
+	'''
+	et0      = table[ 'et0' ] - table[ 'slack' ]
+	etf      = table[ 'etf' ] + table[ 'slack' ]
+	bounds   = table[ 'bounds' ].tolist()
+	mids     = ( ( table[ 'bounds' ][ :-1 ] + table[ 'bounds' ][ 1: ] ) /
+		2.0 ).tolist()
+	scales   = ( 2.0 / np.diff( table[ 'bounds' ] ) ).tolist()
+	last     = table[ 'n_segments' ] - 1
+	ks       = table[ 'ks' ]
+	coeffs   = table[ 'coeffs' ]
+
+	def eval_func( et ):
+		if not et0 <= et <= etf:
+			raise RuntimeError( 'Epoch outside of ephemeris table span.' )
+		idx = min( max( bisect.bisect_right( bounds, et ) - 1, 0 ), last )
+		s   = min( max( ( et - mids[ idx ] ) * scales[ idx ], -1.0 ), 1.0 )
+		return np.cos( ks * math.acos( s ) ) @ coeffs[ idx ]
+
+	return eval_func
@@ -13,6 +13,7 @@ import spiceypy as spice
 
 # AWP library
 from ITVIM import ITVIM
+import ITVIM as it
 import numerical_tools as nt
 import planetary_data  as pd
 import spice_data      as sd
@@ -134,6 +135,142 @@ def test_EVME_1966( plot = False ):
 			'show'     : True
 			} )
 
+def test_ITVIM_search_sequences_EVM_1978():
+	'''
+	Earth-Venus-Mars search over 1978 launch dates, serially and
+	across a process pool, where the best trajectory found is
+	reproduced by ITVIM
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0        = spice.str2et( '1978-01-01' )
+	ets_launch = et0 + np.arange( 0, 360, 30 ) / nt.sec2day
+	candidates = [ {
+		'planets': [ pd.earth, pd.venus, pd.mars ],
+		'tofs'   : [ np.arange( 100, 200, 25 ) / nt.sec2day,
+					 np.arange( 150, 400, 50 ) / nt.sec2day ]
+		} ]
+	args    = { 'max_vinf_depart': 8.0, 'n_workers': 1 }
+	records = it.search_sequences( candidates, ets_launch, args )
+	assert len( records ) > 0
+
+	args[ 'n_workers' ] = 2
+	records_pool = it.search_sequences( candidates, ets_launch, args )
+	assert [ r[ 'cost' ] for r in records ] ==\
+		   [ r[ 'cost' ] for r in records_pool ]
+
+	costs = [ r[ 'cost' ] for r in records ]
+	assert costs == sorted( costs )
+	for record in records:
+		assert record[ 'v_infinities' ][ 0 ] <= 8.0
+		assert record[ 'periapses' ][ 1 ] >= pd.venus[ 'radius' ] + 200.0
+
+	itvim = ITVIM( { 'sequence': records[ 0 ][ 'sequence' ] } )
+	for n in range( itvim.n_steps ):
+		assert itvim.seq[ n ][ 'v_infinity' ] == pytest.approx(
+			records[ 0 ][ 'v_infinities' ][ n ], rel = 1e-6 )
+	assert itvim.seq[ 1 ][ 'periapsis' ] == pytest.approx(
+		records[ 0 ][ 'periapses' ][ 1 ], rel = 1e-6 )
+
+	args[ 'n_workers'       ] = 1
+	args[ 'max_vinf_depart' ] = 1.0
+	assert it.search_sequences( candidates, ets_launch, args ) == []
+
+def test_ITVIM_repeated_solves_do_not_mutate_sequence():
+	'''
+	Solving twice from the same sequence list gives identical
+	per-leg records, leaves the list untouched, and memoizes
+	planet states within each solve
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	sequence = [
+		{
+		'planet': 3,
+		'time'  : '1978-11-27',
+		'tm'    : -1
+		},
+		{
+		'planet'   : 2,
+		'planet_mu': pd.venus[ 'mu' ],
+		'time'     : '1979-05-20 23:59:59',
+		'tm'       : 1,
+		'tol'      : 1e-5
+		},
+		{
+		'planet'   : 4,
+		'planet_mu': pd.mars[ 'mu' ],
+		'time'     : '1980-01-22 05:54:54',
+		'tol'      : 1e-5
+		}
+	]
+	keys   = [ set( step.keys() ) for step in sequence ]
+	itvim0 = ITVIM( { 'sequence': sequence } )
+	itvim1 = ITVIM( { 'sequence': sequence } )
+
+	assert [ set( step.keys() ) for step in sequence ] == keys
+	assert np.array_equal( itvim0.seq, itvim1.seq )
+	assert itvim0.seq[ 2 ][ 'et' ] == pytest.approx(
+		spice.str2et( '1980-01-22' ), abs = 24 * 3600.0 )
+	assert itvim0.seq[ 1 ][ 'periapsis' ] > pd.venus[ 'radius' ]
+	assert len( itvim0.ephemeris ) < 2 * itvim0.n_steps
+
+	itvim0.plot_orbits( {
+		'planets'     : [ pd.earth, pd.venus, pd.mars ],
+		'colors'      : [ 'm', 'c' ],
+		'sc_labels'   : [ 'SC 0', 'SC 1' ],
+		'axes_no_fill': False,
+		'show'        : False
+		} )
+
+def test_ITVIM_forwards_step_options( monkeypatch ):
+	'''
+	Step keys other than planet, planet_mu and time are passed on
+	to vinfinity_match, and time_cal is always et2utc output
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	match_args       = []
+	vinfinity_match  = it.oc.vinfinity_match
+	def _vinfinity_match( planet0, planet1, v0_sc, et0, tof0, args ):
+		match_args.append( args )
+		return vinfinity_match( planet0, planet1, v0_sc, et0, tof0, args )
+	monkeypatch.setattr( it.oc, 'vinfinity_match', _vinfinity_match )
+
+	sequence = [
+		{
+		'planet': 3,
+		'time'  : '1978 November 27 00:00:00.000000000 UTC',
+		'tm'    : -1
+		},
+		{
+		'planet'   : 2,
+		'planet_mu': pd.venus[ 'mu' ],
+		'time'     : '1979-05-20 23:59:59',
+		'tm'       : 1,
+		'tol'      : 1e-5,
+		'analytic' : False,
+		'diff_step': 1e-2
+		},
+		{
+		'planet'   : 4,
+		'planet_mu': pd.mars[ 'mu' ],
+		'time'     : '1980-01-22 05:54:54',
+		'tol'      : 1e-5
+		}
+	]
+	itvim = ITVIM( { 'sequence': sequence } )
+
+	assert len( match_args ) == 1
+	assert match_args[ 0 ][ 'analytic'  ] is False
+	assert match_args[ 0 ][ 'diff_step' ] == 1e-2
+	assert match_args[ 0 ][ 'tol'       ] == 1e-5
+	assert itvim.seq[ 0 ][ 'time_cal' ] ==\
+		spice.et2utc( spice.str2et( sequence[ 0 ][ 'time' ] ), 'C', 5 )
+
 if __name__ == '__main__':
 	test_ITVIM_EME_1963_2_year( plot = True )
 	test_EVME_1966( plot = True )
\ No newline at end of file
@@ -13,10 +13,13 @@ import spiceypy as spice
 
 # AWP library
 from Spacecraft import Spacecraft as SC
+import Spacecraft                 as scm
 import planetary_data             as pd
 import spice_tools                as st
 import plotting_tools             as pt
 import spice_data                 as sd
+import gravity_tools              as gt
+import orbit_calculations         as oc
 
 # Treat all warnings as errors
 pytestmark = pytest.mark.filterwarnings( 'error' )
@@ -240,6 +243,444 @@ def test_Spacecraft_enter_SOI_voyager2_jupiter( plot = False ):
 			'show'  : True
 			} )
 
+def test_Spacecraft_fused_rhs_matches_diffy_q():
+	'''
+	The fused right-hand side has to return the same state derivative
+	as the generic diffy_q method for each supported orbit_perts set
+	'''
+	coes = [ pd.earth[ 'radius' ] + 600.0, 0.05, 51.6, 30.0, 10.0, 20.0 ]
+
+	for orbit_perts in [ {}, { 'J2': True } ]:
+		sc = SC( {
+			'coes'       : coes,
+			'tspan'      : '2',
+			'orbit_perts': orbit_perts,
+			'fused_rhs'  : True,
+			'rtol'       : 1e-9
+			} )
+		state_dot0 = sc.diffy_q ( sc.et0, sc.state0 )
+		state_dot1 = sc.ode_func( sc.et0, sc.state0 )
+		assert state_dot1 == pytest.approx( state_dot0, rel = 1e-14 )
+
+		sc_ref = SC( {
+			'coes'       : coes,
+			'tspan'      : '2',
+			'orbit_perts': orbit_perts,
+			'rtol'       : 1e-9
+			} )
+		assert sc.states[ -1 ] == pytest.approx( sc_ref.states[ -1 ],
+			abs = 1e-3 )
+
+def test_Spacecraft_fused_rhs_n_bodies():
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	sc = SC( {
+		'coes'       : [ 42164.0, 0.001, 0.1, 0.0, 0.0, 0.0 ],
+		'date0'      : '1980-06-01',
+		'tspan'      : '1',
+		'orbit_perts': { 'J2': True, 'n_bodies': [ pd.moon, pd.sun ] },
+		'fused_rhs'  : True,
+		'propagate'  : False
+		} )
+	state_dot0 = sc.diffy_q ( sc.et0, sc.state0 )
+	state_dot1 = sc.ode_func( sc.et0, sc.state0 )
+	assert state_dot1 == pytest.approx( state_dot0, rel = 1e-12 )
+
+def test_Spacecraft_ephemeris_tables_n_bodies():
+	'''
+	Propagating with Chebyshev ephemeris tables for the perturbing
+	bodies should give the same trajectory as calling SPICE directly
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	config = {
+		'coes'       : [ 42164.0, 0.001, 0.1, 0.0, 0.0, 0.0 ],
+		'date0'      : '1980-06-01',
+		'tspan'      : '5',
+		'orbit_perts': { 'n_bodies': [ pd.moon, pd.sun ] },
+		'rtol'       : 1e-10,
+		'atol'       : 1e-10
+		}
+	sc0 = SC( config )
+
+	config[ 'ephemeris_tables' ] = True
+	config[ 'fused_rhs'        ] = True
+	sc1 = SC( config )
+
+	assert set( sc1.ephemeris_tables.keys() ) == { 301, 10 }
+	assert sc1.states[ -1, :3 ] == pytest.approx(
+		sc0.states[ -1, :3 ], abs = 1e-1 )
+
+	'''
+	Tables passed in through the config are reused as is
+	'''
+	config[ 'ephemeris_tables' ] = sc1.ephemeris_tables
+	config[ 'propagate'        ] = False
+	sc2 = SC( config )
+	assert sc2.ephemeris_tables[ 301 ] is sc1.ephemeris_tables[ 301 ]
+
+	'''
+	Passed in tables that don't cover the time span, or are in
+	a different frame, are rejected instead of extrapolated
+	'''
+	config[ 'tspan' ] = '10'
+	with pytest.raises( RuntimeError ):
+		SC( config )
+
+	config[ 'tspan' ] = '5'
+	config[ 'frame' ] = 'ECLIPJ2000'
+	with pytest.raises( RuntimeError ):
+		SC( config )
+
+	'''
+	Spans whose last segment boundary rounds past the end
+	'''
+	config[ 'frame'            ] = 'J2000'
+	config[ 'ephemeris_tables' ] = True
+	for tspan in [ '29', '33' ]:
+		config[ 'tspan' ] = tspan
+		SC( config )
+
+def test_Spacecraft_propagate_batch():
+	'''
+	Batch propagation across a process pool should return the same
+	ets and states as propagating each config one at a time,
+	in the same order as the configs were passed in
+	'''
+	configs = [ {
+		'coes' : [ pd.earth[ 'radius' ] + alt, 0.01, inc, 0.0, 0.0, 0.0 ],
+		'tspan': '1',
+		'rtol' : 1e-9
+		} for alt, inc in [ ( 500.0, 10.0 ), ( 1500.0, 50.0 ),
+		( 3000.0, 90.0 ), ( 800.0, 120.0 ), ( 20000.0, 0.0 ) ] ]
+	progress = []
+
+	results = scm.propagate_batch( configs, {
+		'n_workers': 2,
+		'chunksize': 2,
+		'progress' : lambda n, total: progress.append( ( n, total ) )
+		} )
+
+	assert len( results ) == len( configs )
+	assert progress == [ ( n + 1, len( configs ) )
+		for n in range( len( configs ) ) ]
+
+	for config, ( ets, states ) in zip( configs, results ):
+		sc = SC( config )
+		assert np.all( ets    == sc.ets    )
+		assert np.all( states == sc.states )
+
+def test_Spacecraft_propagate_batch_kernels():
+	'''
+	Workers furnish the kernels each config requires, and configs
+	with "propagate" False are still propagated
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	config = {
+		'coes'       : [ 42164.0, 0.001, 0.1, 0.0, 0.0, 0.0 ],
+		'date0'      : '1980-06-01',
+		'tspan'      : '1',
+		'orbit_perts': { 'n_bodies': [ pd.moon ] },
+		'propagate'  : False
+		}
+	assert scm.config_spice_kernels( config ) ==\
+		[ sd.leapseconds_kernel, sd.de432 ]
+	assert scm.config_spice_kernels(
+		{ 'orbit_perts': { 'gravity_field': ( 4, 4 ) } } ) ==\
+		[ sd.leapseconds_kernel, sd.pck00010 ]
+
+	( ets, states ), = scm.propagate_batch( [ config ], { 'n_workers': 1 } )
+	config[ 'propagate' ] = True
+	sc = SC( config )
+	assert np.all( ets    == sc.ets    )
+	assert np.all( states == sc.states )
+
+def test_Spacecraft_kepler_matches_lsoda():
+	'''
+	Without perturbations, the analytic Kepler propagator
+	should agree with a tight tolerance numerical integration
+	'''
+	config = {
+		'coes' : [ pd.earth[ 'radius' ] + 1000.0, 0.1, 50.0, 20.0, 30.0, 0.0 ],
+		'tspan': '3',
+		'rtol' : 1e-12,
+		'atol' : 1e-12
+	}
+	sc_num = SC( config )
+	config[ 'propagator' ] = 'kepler'
+	sc_kep = SC( config )
+
+	assert sc_kep.ode_sol.status == 0
+	assert sc_kep.ets[ -1 ] == sc_num.ets[ -1 ]
+	assert sc_kep.states[ -1 ] == pytest.approx( sc_num.states[ -1 ], abs = 1e-2 )
+	assert sc_kep.n_steps == 1001
+
+def test_Spacecraft_kepler_minimum_altitude_stop_condition():
+	'''
+	The minimum altitude stop condition should be located on the
+	analytic trajectory, matching the event found by solve_ivp
+	'''
+	config = {
+		'coes'           : [ pd.earth[ 'radius' ] + 1000.0, 0.5, 0, 90, 0, 0 ],
+		'tspan'          : '1',
+		'stop_conditions': { 'min_alt': 100.0 },
+		'rtol'           : 1e-12,
+		'atol'           : 1e-12
+	}
+	sc_num = SC( config )
+	config[ 'propagator' ] = 'kepler'
+	sc_kep = SC( config )
+
+	assert sc_kep.ode_sol.status == 1
+	assert sc_kep.ode_sol.t_events[ 0 ][ 0 ] == pytest.approx(
+		sc_num.ode_sol.t_events[ 0 ][ 0 ], abs = 1e-3 )
+	assert np.linalg.norm( sc_kep.states[ -1, :3 ] ) == pytest.approx(
+		pd.earth[ 'radius' ] + 100.0 )
+
+@pytest.mark.parametrize( 'propagator', [ 'dopri5', 'dop853' ] )
+def test_Spacecraft_native_rk_propagators( propagator ):
+	'''
+	Native adaptive propagators should match solve_ivp and
+	honor the same stop conditions
+	'''
+	config = {
+		'coes'           : [ pd.earth[ 'radius' ] + 1000.0, 0.5, 0, 90, 0, 0 ],
+		'tspan'          : '1',
+		'stop_conditions': { 'min_alt': 100.0 },
+		'orbit_perts'    : { 'J2': True },
+		'rtol'           : 1e-10,
+		'atol'           : 1e-10
+	}
+	sc_ivp = SC( config )
+	config[ 'propagator' ] = propagator
+	sc_rk  = SC( config )
+
+	assert sc_rk.ode_sol.status == 1
+	assert sc_rk.ets[ -1 ] == pytest.approx( sc_ivp.ets[ -1 ], abs = 1e-3 )
+	assert sc_rk.states[ -1 ] == pytest.approx( sc_ivp.states[ -1 ], abs = 1e-3 )
+
+def test_Spacecraft_symplectic_propagator():
+	'''
+	Yoshida 8th order propagation with J2 should match solve_ivp
+	and stop at the minimum altitude on the interpolated trajectory
+	'''
+	config = {
+		'coes'           : [ pd.earth[ 'radius' ] + 1000.0, 0.1, 50, 0, 0, 0 ],
+		'tspan'          : '5',
+		'orbit_perts'    : { 'J2': True },
+		'rtol'           : 1e-12,
+		'atol'           : 1e-12
+	}
+	sc_ivp = SC( config )
+	config[ 'propagator' ] = 'yoshida8'
+	config[ 'dt'         ] = 60.0
+	sc_sym = SC( config )
+
+	assert sc_sym.ode_sol.status == 0
+	assert sc_sym.ets[ -1 ] == sc_ivp.ets[ -1 ]
+	assert sc_sym.states[ -1 ] == pytest.approx( sc_ivp.states[ -1 ], abs = 1e-2 )
+
+	config[ 'stop_conditions' ] = { 'min_alt': 500.0 }
+	sc_sym = SC( config )
+	assert sc_sym.ode_sol.status == 1
+	assert np.linalg.norm( sc_sym.states[ -1, :3 ] ) == pytest.approx(
+		pd.earth[ 'radius' ] + 500.0 )
+
+def test_Spacecraft_gauss_jackson_propagator():
+	'''
+	Gauss-Jackson propagation with J2 and drag should match solve_ivp
+	and stop at the minimum altitude on the interpolated trajectory
+	'''
+	config = {
+		'coes'           : [ pd.earth[ 'radius' ] + 1000.0, 0.1, 50, 0, 0, 0 ],
+		'tspan'          : '5',
+		'orbit_perts'    : { 'J2': True, 'drag': { 'area': 10.0 } },
+		'mass0'          : 100.0,
+		'rtol'           : 1e-12,
+		'atol'           : 1e-12
+	}
+	sc_ivp = SC( config )
+	config[ 'propagator' ] = 'gauss_jackson'
+	config[ 'dt'         ] = 60.0
+	sc_gj  = SC( config )
+
+	assert sc_gj.ode_sol.status == 0
+	assert sc_gj.ets[ -1 ] == sc_ivp.ets[ -1 ]
+	assert sc_gj.states[ -1 ] == pytest.approx( sc_ivp.states[ -1 ], abs = 1e-2 )
+	assert sc_gj.ode_sol.nfev < sc_ivp.ode_sol.nfev
+
+	config[ 'stop_conditions' ] = { 'min_alt': 500.0 }
+	sc_gj = SC( config )
+	assert sc_gj.ode_sol.status == 1
+	assert np.linalg.norm( sc_gj.states[ -1, :3 ] ) == pytest.approx(
+		pd.earth[ 'radius' ] + 500.0 )
+
+def test_Spacecraft_encke_matches_cowell():
+	'''
+	Encke's method should match the Cowell propagation (including
+	across rectifications) with fewer RHS evaluations
+	'''
+	config = {
+		'coes'       : [ 42164.0, 0.001, 5.0, 0.0, 0.0, 0.0 ],
+		'tspan'      : 3 * 86400.0,
+		'orbit_perts': { 'J2': True },
+		'rtol'       : 1e-10,
+		'atol'       : 1e-10
+	}
+	sc_cowell = SC( config )
+	config[ 'encke'     ] = True
+	config[ 'encke_tol' ] = 1e-3
+	sc_encke  = SC( config )
+
+	assert sc_encke.n_rectifications > 0
+	assert sc_encke.ode_sol.nfev < sc_cowell.ode_sol.nfev
+	assert sc_encke.ets[ -1 ] == sc_cowell.ets[ -1 ]
+	assert np.all( np.diff( sc_encke.ets ) > 0 )
+	assert sc_encke.states[ -1 ] == pytest.approx(
+		sc_cowell.states[ -1 ], abs = 1e-2 )
+
+	'''
+	Encke's method is only implemented with the solve_ivp propagators
+	'''
+	for propagator in [ 'kepler', 'yoshida4' ]:
+		config[ 'propagator' ] = propagator
+		with pytest.raises( ValueError ):
+			SC( config )
+
+def test_Spacecraft_encke_minimum_altitude_stop_condition():
+	config = {
+		'coes'           : [ pd.earth[ 'radius' ] + 1000.0, 0.1, 50, 0, 0, 0 ],
+		'tspan'          : '2',
+		'orbit_perts'    : { 'J2': True },
+		'stop_conditions': { 'min_alt': 500.0 },
+		'encke'          : True,
+		'rtol'           : 1e-10,
+		'atol'           : 1e-10
+	}
+	sc = SC( config )
+	assert sc.ode_sol.status == 1
+	assert sc.ode_sol.t_events[ 0 ][ 0 ] == sc.ets[ -1 ]
+	assert np.linalg.norm( sc.states[ -1, :3 ] ) == pytest.approx(
+		pd.earth[ 'radius' ] + 500.0 )
+
+def test_Spacecraft_gravity_field_matches_J2():
+	'''
+	A degree 2, order 0 gravity field should match the J2 perturbation
+	when the central body uses the gravity model's J2, mu and radius.
+	The IAU_EARTH pole is the J2000 z-axis at the J2000 epoch
+	'''
+	model = gt.gravity_models[ 'Earth' ]
+	C, S  = gt.load_coefficients( model[ 'filename' ], model[ 'max_degree' ] )
+	cb    = dict( pd.earth )
+	cb[ 'J2'     ] = -C[ 2, 0 ]
+	cb[ 'mu'     ] = model[ 'mu' ]
+	cb[ 'radius' ] = model[ 'radius' ]
+
+	config = {
+		'cb'         : cb,
+		'coes'       : [ 7000.0, 0.01, 51.6, 0.0, 10.0, 20.0 ],
+		'date0'      : '2000-01-01 12:00:00 TDB',
+		'tspan'      : '2',
+		'orbit_perts': { 'J2': True },
+		'rtol'       : 1e-11,
+		'atol'       : 1e-11
+	}
+	sc_J2 = SC( config )
+	config[ 'orbit_perts' ] = { 'gravity_field': ( 2, 0 ) }
+	sc_gf = SC( config )
+
+	assert sc_gf.states[ -1 ] == pytest.approx( sc_J2.states[ -1 ], abs = 1e-4 )
+
+def test_Spacecraft_gravity_field_J2_expect_throw():
+	with pytest.raises( RuntimeError ):
+		SC( {
+			'coes'       : [ pd.earth[ 'radius' ] + 1000.0, 0, 0, 0, 0, 0 ],
+			'tspan'      : '1',
+			'orbit_perts': { 'J2': True, 'gravity_field': ( 4, 4 ) }
+		} )
+
+def test_Spacecraft_drag_decay():
+	'''
+	A low orbit with a large area to mass ratio should decay
+	down to the deorbit altitude within the time span
+	'''
+	sc = SC( {
+		'coes'       : [ pd.earth[ 'radius' ] + 250.0, 0.001, 51.6, 0, 0, 0 ],
+		'tspan'      : 5 * 86400.0,
+		'date0'      : '1980-06-01',
+		'orbit_perts': { 'drag': { 'Cd': 2.2, 'area': 10.0 } },
+		'mass0'      : 100.0,
+		'rtol'       : 1e-9,
+		'atol'       : 1e-9
+	} )
+	sc.calc_coes()
+
+	assert sc.ode_sol.status == 1
+	assert sc.ets[ -1 ] - sc.et0 < 5 * 86400.0
+	assert np.linalg.norm( sc.states[ -1, :3 ] ) == pytest.approx(
+		pd.earth[ 'radius' ] + pd.earth[ 'deorbit_altitude' ] )
+	assert sc.coes[ -1, 0 ] < sc.coes[ 0, 0 ] - 100.0
+
+def test_Spacecraft_drag_no_mass_expect_throw():
+	with pytest.raises( RuntimeError ):
+		SC( {
+			'coes'       : [ pd.earth[ 'radius' ] + 300.0, 0, 0, 0, 0, 0 ],
+			'tspan'      : '1',
+			'orbit_perts': { 'drag': {} }
+		} )
+
+def test_Spacecraft_eclipse_events_match_sampled_eclipses():
+	'''
+	Eclipse entrances and exits located as integrator events should
+	match the ones found from a densely sampled eclipse array
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	sc = SC( {
+		'date0'         : '1980-03-03 22:10:35 TDB',
+		'coes'          : [ 7480.0, 0.09, 5.5, 6.26, 5.95, 0.2 ],
+		'tspan'         : 12000.0,
+		'eclipse_events': True,
+		'dense_output'  : True,
+		'rtol'          : 1e-10,
+		'atol'          : 1e-10
+	} )
+	dt  = 0.1
+	ets = np.arange( sc.ets[ 0 ], sc.ets[ -1 ], dt )
+	a   = oc.calc_eclipse_array( ets, sc.ode_sol.sol( ets )[ :3 ].T, sc.cb )
+
+	for method in [ 'either', 'umbra', 'penumbra' ]:
+		table   = sc.calc_eclipse_table( method )
+		sampled = oc.find_eclipses( ets, a, method )
+
+		assert len( table[ 'ets' ] ) == len( sampled[ 'ets' ] ) > 0
+		assert np.array( table[ 'ets' ] ) == pytest.approx(
+			np.array( sampled[ 'ets' ] ), abs = dt )
+		assert table[ 'ratio' ] == pytest.approx( sampled[ 'ratio' ], abs = 1e-4 )
+
+def test_Spacecraft_kepler_eclipse_events_expect_throw():
+	with pytest.raises( RuntimeError ):
+		SC( {
+			'coes'          : [ pd.earth[ 'radius' ] + 1000.0, 0, 0, 0, 0, 0 ],
+			'tspan'         : '1',
+			'propagator'    : 'kepler',
+			'eclipse_events': True
+		} )
+
+def test_Spacecraft_kepler_perturbations_expect_throw():
+	with pytest.raises( RuntimeError ):
+		SC( {
+			'coes'       : [ pd.earth[ 'radius' ] + 1000.0, 0, 0, 0, 0, 0 ],
+			'tspan'      : '1',
+			'propagator' : 'kepler',
+			'orbit_perts': { 'J2': True }
+		} )
+
 if __name__ == '__main__':
 	test_Spacecraft_basic_propagation( plot = True )
 	test_Spacecraft_inclination_latitude( plot = True )
@@ -0,0 +1,165 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+SpacecraftEnsemble Class Unit Tests
+'''
+
+# 3rd party libraries
+import pytest
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+from SpacecraftEnsemble import SpacecraftEnsemble as SE
+from Spacecraft         import Spacecraft         as SC
+import numerical_tools as nt
+import planetary_data  as pd
+import spice_data      as sd
+
+# Treat all warnings as errors
+pytestmark = pytest.mark.filterwarnings( 'error' )
+
+ER = pd.earth[ 'radius' ]
+
+def test_SpacecraftEnsemble_no_members_expect_throw():
+	with pytest.raises( RuntimeError ):
+		SE( { 'tspan': 100.0 } )
+
+def test_SpacecraftEnsemble_matches_Spacecraft():
+	'''
+	Every ensemble member should end up where an individually
+	propagated Spacecraft with the same config ends up
+	'''
+	coes = [
+		[ ER + 1000.0, 0.01, 30.0,  0.0,  0.0,  0.0 ],
+		[ ER + 800.0,  0.05, 60.0, 10.0, 20.0, 30.0 ],
+		[ 26600.0,     0.7,  63.4,  0.0, 270.0, 0.0 ]
+	]
+	config = {
+		'tspan'      : 20000.0,
+		'orbit_perts': { 'J2': True },
+		'rtol'       : 1e-10,
+		'atol'       : 1e-10
+	}
+	se = SE( dict( config, coes = coes ) )
+	assert se.states.shape == ( 3, se.n_steps, 7 )
+	assert np.all( se.active )
+
+	for n in range( len( coes ) ):
+		sc = SC( dict( config, coes = coes[ n ], propagator = 'DOP853' ) )
+		assert se.states[ n, -1, :6 ] == pytest.approx(
+			sc.states[ -1, :6 ], abs = 1e-4 )
+
+def test_SpacecraftEnsemble_drag_matches_Spacecraft():
+	'''
+	Per member drag areas should give the same
+	decay as individually propagated Spacecraft
+	'''
+	coes  = [
+		[ ER + 300.0, 0.001, 51.6,  0.0, 0.0, 0.0 ],
+		[ ER + 350.0, 0.01,  97.0, 10.0, 0.0, 0.0 ]
+	]
+	areas  = [ 5.0, 10.0 ]
+	config = {
+		'tspan'     : 43200.0,
+		'date0'     : '1980-06-01',
+		'mass0'     : 100.0,
+		'rtol'      : 1e-10,
+		'atol'      : 1e-10,
+		'print_stop': False
+	}
+	se = SE( dict( config, coes = coes,
+		orbit_perts = { 'drag': { 'area': areas } } ) )
+
+	for n in range( len( coes ) ):
+		sc = SC( dict( config, coes = coes[ n ], propagator = 'DOP853',
+			orbit_perts = { 'drag': { 'area': areas[ n ] } } ) )
+		assert se.states[ n, -1, :6 ] == pytest.approx(
+			sc.states[ -1, :6 ], abs = 1e-2 )
+
+def test_SpacecraftEnsemble_masks_stopped_members():
+	'''
+	The second member crosses the minimum altitude and should
+	be masked out at that time, while the others continue
+	until the end of the time span
+	'''
+	coes = [
+		[ ER + 1000.0, 0.01, 0.0,  0.0, 0.0, 0.0 ],
+		[ ER + 1000.0, 0.5,  0.0, 90.0, 0.0, 0.0 ],
+		[ ER + 2000.0, 0.0,  0.0,  0.0, 0.0, 0.0 ]
+	]
+	se = SE( {
+		'coes'           : coes,
+		'tspan'          : '1',
+		'rtol'           : 1e-9,
+		'atol'           : 1e-9,
+		'stop_conditions': { 'min_alt': 100.0 }
+		} )
+
+	assert list( se.active ) == [ True, False, True ]
+	assert se.stop_events[ 1 ] == 'min_alt'
+	assert se.ets[ -1 ] == pytest.approx( se.et0 + se.config[ 'tspan' ] )
+	assert nt.norm( se.stop_states[ 1, :3 ] ) - ER ==\
+		pytest.approx( 100.0, abs = 1e-3 )
+
+	'''
+	Stopped member holds its stop state
+	'''
+	idx = se.stop_idxs[ 1 ]
+	assert np.all( se.states[ 1, idx: ] == se.stop_states[ 1 ] )
+
+	se.calc_altitudes()
+	assert np.all( se.altitudes[ 1 ] >= 100.0 - 1e-3 )
+
+	sc = SC( {
+		'coes'           : coes[ 1 ],
+		'tspan'          : se.config[ 'tspan' ],
+		'rtol'           : 1e-9,
+		'atol'           : 1e-9,
+		'propagator'     : 'DOP853',
+		'stop_conditions': { 'min_alt': 100.0 }
+		} )
+	assert se.stop_ets[ 1 ] == pytest.approx( sc.ets[ -1 ], abs = 1e-2 )
+
+def test_SpacecraftEnsemble_quiet( capsys ):
+	'''
+	With verbose and print_stop False nothing is printed,
+	including when a member reaches a stop condition
+	'''
+	se = SE( {
+		'coes'           : [
+			[ ER + 1000.0, 0.5, 0.0, 90.0, 0.0, 0.0 ],
+			[ ER + 2000.0, 0.0, 0.0,  0.0, 0.0, 0.0 ] ],
+		'tspan'          : '1',
+		'stop_conditions': { 'min_alt': 100.0 },
+		'verbose'        : False,
+		'print_stop'     : False
+		} )
+	se.calc_coes()
+
+	assert list( se.active ) == [ False, True ]
+	assert capsys.readouterr().out == ''
+
+def test_SpacecraftEnsemble_latlons_coes():
+	spice.furnsh( sd.pck00010 )
+
+	coes = [
+		[ ER + 1000.0, 0.01, 50.0, 0.0, 0.0, 0.0 ],
+		[ ER + 600.0,  0.0,  20.0, 0.0, 0.0, 0.0 ]
+	]
+	se = SE( { 'coes': coes, 'tspan': '2', 'rtol': 1e-9, 'atol': 1e-9 } )
+
+	se.calc_latlons()
+	assert np.all( np.abs( se.latlons[ 0, :, 2 ] ) <= 50.0 )
+	assert np.all( np.abs( se.latlons[ 1, :, 2 ] ) <= 20.0 )
+
+	latlons = nt.cart2lat( se.states[ 0, :, :3 ],
+		'J2000', 'IAU_EARTH', se.ets )
+	assert se.latlons[ 0 ] == pytest.approx( latlons, abs = 1e-9 )
+
+	se.calc_coes()
+	assert se.coes.shape == ( 2, se.n_steps, 6 )
+	for n in range( len( coes ) ):
+		assert se.coes[ n, :, 0 ] == pytest.approx( coes[ n ][ 0 ], rel = 1e-6 )
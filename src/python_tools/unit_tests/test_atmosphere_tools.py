@@ -0,0 +1,43 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Atmosphere Tools Library Unit Tests
+'''
+
+# 3rd party libraries
+import pytest
+import numpy as np
+
+# AWP library
+import atmosphere_tools as at
+
+# Treat all warnings as errors
+pytestmark = pytest.mark.filterwarnings( 'error' )
+
+def test_exponential_atmosphere_table_rows():
+	'''
+	Densities at the base altitudes should be the nominal densities,
+	and densities just below them should come from the row below
+	'''
+	atm   = at.ExponentialAtmosphere()
+	table = at.EARTH_EXPONENTIAL_TABLE
+
+	for h0, rho0, H in table:
+		assert atm.calc_density( h0 ) == pytest.approx( rho0, rel = 1e-14 )
+
+	for n in range( 1, table.shape[ 0 ] ):
+		h0, rho0, H = table[ n - 1 ]
+		alt         = table[ n, 0 ] - 1e-6
+		assert atm.calc_density( alt ) == pytest.approx(
+			rho0 * np.exp( ( h0 - alt ) / H ), rel = 1e-14 )
+
+def test_exponential_atmosphere_vectorized():
+	atm  = at.ExponentialAtmosphere()
+	alts = np.array( [ -10.0, 0.0, 24.9, 25.0, 412.3, 999.9, 1000.0, 1500.0 ] )
+	rhos = atm.calc_densities( alts )
+
+	assert rhos == pytest.approx(
+		[ atm.calc_density( alt ) for alt in alts ], rel = 1e-14 )
+	assert np.all( np.diff( rhos[ 1: ] ) < 0 )
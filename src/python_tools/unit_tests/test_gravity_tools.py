@@ -0,0 +1,81 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Gravity Tools Library Unit Tests
+'''
+
+# Python standard libraries
+import math
+
+# 3rd party libraries
+import pytest
+import numpy as np
+from scipy.special import lpmv
+
+# AWP library
+import gravity_tools as gt
+
+# Treat all warnings as errors
+pytestmark = pytest.mark.filterwarnings( 'error' )
+
+R_TEST = np.array( [ 6800.0, 1200.0, -2500.0 ] )
+
+def test_gravity_field_potential_direct_sum():
+	'''
+	Potential from the V, W buffer should match a direct sum over
+	all terms using SciPy's Legendre functions (which include the
+	Condon-Shortley phase)
+	'''
+	field = gt.GravityField( 20, 20 )
+	C, S  = gt.load_coefficients( gt.EGM96_FILE, 36 )
+	r     = np.linalg.norm( R_TEST )
+	u     = R_TEST[ 2 ] / r
+	lon   = math.atan2( R_TEST[ 1 ], R_TEST[ 0 ] )
+
+	U = 0.0
+	for n in range( 2, 21 ):
+		for m in range( n + 1 ):
+			U += ( field.radius / r ) ** n * ( -1 ) ** m * lpmv( m, n, u ) *\
+				( C[ n, m ] * math.cos( m * lon ) + S[ n, m ] * math.sin( m * lon ) )
+	U *= field.mu / r
+
+	assert field.calc_potential( R_TEST ) == pytest.approx( U, rel = 1e-12 )
+
+def test_gravity_field_acceleration_potential_gradient():
+	field = gt.GravityField( 20, 20 )
+	h     = 1e-2
+	grad  = np.array( [ ( field.calc_potential( R_TEST + h * e ) -
+		field.calc_potential( R_TEST - h * e ) ) / ( 2 * h )
+		for e in np.eye( 3 ) ] )
+
+	assert field.calc_accel( R_TEST ) == pytest.approx( grad, rel = 1e-8 )
+
+def test_gravity_field_J2():
+	'''
+	A degree 2, order 0 field should match the closed form J2 acceleration
+	'''
+	field  = gt.GravityField( 2, 0 )
+	C, S   = gt.load_coefficients( gt.EGM96_FILE, 36 )
+	J2     = -C[ 2, 0 ]
+	r      = np.linalg.norm( R_TEST )
+	t      = 5 * R_TEST[ 2 ] ** 2 / r ** 2
+	a_J2   = 1.5 * J2 * field.mu * field.radius ** 2 / r ** 4 *\
+		R_TEST / r * np.array( [ t - 1, t - 1, t - 3 ] )
+
+	assert field.calc_accel( R_TEST ) == pytest.approx( a_J2, rel = 1e-12 )
+
+@pytest.mark.parametrize( 'u', [ -1.0, -0.99, 0.0, 0.3, 1.0 ] )
+def test_calc_legendre_recursion( u ):
+	P0 = gt.calc_legendre( 37, 37, u )
+	P1 = gt.calc_legendre_recursion( 37, 37, u )
+
+	assert P1 == pytest.approx( P0, rel = 1e-11, abs = 1e-300 )
+
+def test_gravity_field_expect_throw():
+	with pytest.raises( RuntimeError ):
+		gt.GravityField( 40, 40 )
+
+	with pytest.raises( RuntimeError ):
+		gt.GravityField( 4, 5 )
@@ -8,12 +8,15 @@ Lambert Solvers Unit Tests
 
 # 3rd party libraries
 import pytest
+import math
 import numpy as np
 import spiceypy as spice
 
 # AWP library
 from Spacecraft import Spacecraft
 import lamberts_tools as lt
+import numerical_tools as nt
+import orbit_calculations as oc
 import spice_tools    as st
 import planetary_data as pd
 import spice_data     as sd
@@ -29,6 +32,171 @@ def test_stumpffs_negative_psi_expect_throw():
 	with pytest.raises( ValueError ):
 		lt.C3( -1.0 )
 
+def test_stumpffs_array_match_scalar():
+	psis = np.array( [ 0.5, 2.0, 30.0, 100.0, 4 * np.pi ** 2 - 0.1 ] )
+	assert lt.C2_array( psis ) == pytest.approx(
+		[ lt.C2( psi ) for psi in psis ], rel = 1e-12 )
+	assert lt.C3_array( psis ) == pytest.approx(
+		[ lt.C3( psi ) for psi in psis ], rel = 1e-12 )
+	assert lt.C2_array( 0.0 ) == pytest.approx( 0.5 )
+	assert lt.C3_array( 0.0 ) == pytest.approx( 1 / 6.0 )
+	assert lt.C2_array( -4.0 ) == pytest.approx( ( np.cosh( 2.0 ) - 1 ) / 4.0 )
+
+def test_stumpffs_scalar_match_array():
+	for psi in [ -50.0, -1.0, -0.3, 0.0, 1e-9, 0.7, 1.0, 30.0 ]:
+		c2, c3 = lt.stumpffs( psi )
+		assert c2 == pytest.approx( lt.C2_array( psi ), rel = 1e-14 )
+		assert c3 == pytest.approx( lt.C3_array( psi ), rel = 1e-14 )
+
+def test_lambert_uv_array_matches_scalar():
+	rng = np.random.default_rng( 0 )
+	r0s = rng.normal( size = ( 200, 3 ) ) * 1.5e8
+	r1s = rng.normal( size = ( 200, 3 ) ) * 2.0e8
+	dts = rng.uniform( 50.0, 400.0, 200 ) * 86400.0
+	tms = np.where( rng.random( 200 ) < 0.5, 1, -1 )
+
+	v0s, v1s, solved = lt.lamberts_universal_variables_array(
+		r0s, r1s, dts, { 'tm': tms } )
+
+	n_compared = 0
+	for n in range( 200 ):
+		try:
+			v0, v1 = lt.lamberts_universal_variables(
+				r0s[ n ], r1s[ n ], dts[ n ], { 'tm': tms[ n ] } )
+		except ( ValueError, RuntimeWarning ):
+			continue
+		n_compared += 1
+		assert solved[ n ]
+		assert v0s[ n ] == pytest.approx( v0, rel = 1e-9 )
+		assert v1s[ n ] == pytest.approx( v1, rel = 1e-9 )
+
+	assert n_compared > 100
+	assert np.all( np.isnan( v0s[ ~solved ] ) )
+
+def test_lambert_uv_array_reports_failures():
+	r0s = np.array( [ [ 1.5e8, 0, 0 ], [ 1.5e8, 0, 0 ], [ 1.5e8, 0, 0 ] ] )
+	r1s = np.array( [ [ -2e8,  0, 0 ], [ 0, 2e8,    0 ], [ 0, 2e8,    0 ] ] )
+	dts = np.array( [ 200.0, 200.0, 1e-3 ] ) * 86400.0
+
+	v0s, v1s, solved = lt.lamberts_universal_variables_array( r0s, r1s, dts )
+
+	assert list( solved ) == [ False, True, False ]
+	assert np.all( np.isnan( v0s[ [ 0, 2 ] ] ) )
+	assert np.all( np.isfinite( v1s[ 1 ] ) )
+
+def test_lamberts_sweep_warm_start():
+	'''
+	Warm started sweeps over a grid of neighboring problems should
+	match the bisection solutions with fewer time of flight
+	evaluations than cold starts
+	'''
+	ths     = np.linspace( 0.5, 2.5, 20 )
+	r0s     = np.zeros( ( 15, 20, 3 ) )
+	r0s[ ..., 0 ] = 1.5e8
+	r1s     = np.zeros( ( 15, 20, 3 ) )
+	r1s[ ..., 0 ] = 2.2e8 * np.cos( ths )
+	r1s[ ..., 1 ] = 2.2e8 * np.sin( ths )
+	r1s[ ..., 2 ] = 1e6
+	deltats = np.linspace( 150.0, 300.0, 15 )[ :, None ] * 86400.0 *\
+		np.ones( ( 1, 20 ) )
+
+	v0s, v1s, steps, solved = lt.lamberts_sweep( r0s, r1s, deltats )
+	_, _, cold_steps, _     = lt.lamberts_sweep( r0s, r1s, deltats,
+		{ 'warm_start': False } )
+
+	assert np.all( solved )
+	assert steps.shape == ( 15, 20 )
+	assert np.mean( steps ) < 0.75 * np.mean( cold_steps )
+
+	for i, j in [ ( 0, 0 ), ( 7, 13 ), ( 14, 19 ), ( 14, 0 ) ]:
+		v0, v1 = lt.lamberts_universal_variables(
+			r0s[ i, j ], r1s[ i, j ], deltats[ i, j ], {} )
+		assert v0s[ i, j ] == pytest.approx( v0, rel = 1e-9 )
+		assert v1s[ i, j ] == pytest.approx( v1, rel = 1e-9 )
+
+def test_lamberts_uv_secant_stale_slope():
+	'''
+	A stale slope far too large for the problem gives secant steps
+	that round to zero, which must not be reported as converged
+	'''
+	r0      = np.array( [ 1.5e8, 0.0, 0.0 ] )
+	r1      = np.array( [ 0.0, 2.2e8, 1e6 ] )
+	deltat  = 200.0 * 86400.0
+	r0_norm = nt.norm( r0 )
+	r1_norm = nt.norm( r1 )
+	A       = math.sqrt( r0_norm * r1_norm )
+
+	psi, B, _, _, ok = lt.lamberts_uv_secant(
+		r0_norm, r1_norm, A, deltat, 0.0, -4 * math.pi ** 2, 4 * math.pi ** 2 )
+	_psi, _B, _, _, _ok = lt.lamberts_uv_secant(
+		r0_norm, r1_norm, A, deltat, 1.0, -4 * math.pi ** 2, 4 * math.pi ** 2,
+		1e30 )
+	assert ok and _ok
+	assert _psi == pytest.approx( psi, rel = 1e-9 )
+	assert _B   == pytest.approx( B,   rel = 1e-9 )
+
+def test_lambert_izzo_matches_uv():
+	rng = np.random.default_rng( 1 )
+	n_compared = 0
+	for n in range( 200 ):
+		r0 = rng.normal( size = 3 ) * 1.5e8
+		r1 = rng.normal( size = 3 ) * 2.0e8
+		dt = rng.uniform( 50.0, 400.0 ) * 86400.0
+		tm = rng.choice( [ 1, -1 ] )
+		v0, v1 = lt.lamberts_izzo( r0, r1, dt, { 'tm': tm } )
+		try:
+			_v0, _v1 = lt.lamberts_universal_variables(
+				r0, r1, dt, { 'tm': tm } )
+		except ValueError:
+			continue
+		n_compared += 1
+		assert v0 == pytest.approx( _v0, rel = 1e-9 )
+		assert v1 == pytest.approx( _v1, rel = 1e-9 )
+
+	assert n_compared > 100
+
+def test_lambert_izzo_iterations():
+	'''
+	Householder iterations should converge in 2-4 steps
+	for the vast majority of single revolution problems
+	'''
+	rng   = np.random.default_rng( 2 )
+	steps = []
+	for n in range( 500 ):
+		r0 = rng.normal( size = 3 ) * 1.5e8
+		r1 = rng.normal( size = 3 ) * 2.0e8
+		ll = rng.choice( [ 1, -1 ] ) * np.sqrt( 1 - np.linalg.norm( r1 - r0 ) /
+			( ( np.linalg.norm( r0 ) + np.linalg.norm( r1 ) +
+				np.linalg.norm( r1 - r0 ) ) / 2.0 ) )
+		steps.append( lt.izzo_find_x( ll, rng.uniform( 0.1, 10.0 ), 0 )[ 1 ] )
+
+	steps = np.array( steps )
+	assert np.max( steps ) <= 8
+	assert np.mean( ( steps >= 2 ) & ( steps <= 4 ) ) > 0.9
+
+def test_lambert_izzo_multi_rev():
+	mu  = pd.sun[ 'mu' ]
+	r0  = np.array( [ 1.5e8, 0.0, 0.0 ] )
+	r1  = np.array( [ 0.0, 2.2e8, 1e7 ] )
+	tof = 3 * 365 * 86400.0
+
+	v0s = []
+	for M in [ 1, 2 ]:
+		for branch in [ 'left', 'right' ]:
+			v0, v1 = lt.lamberts_izzo( r0, r1, tof,
+				{ 'M': M, 'branch': branch } )
+			state1 = oc.propagate_kepler(
+				np.concatenate( ( r0, v0 ) ), [ tof ], mu )[ 0 ]
+			assert state1[ :3 ] == pytest.approx( r1, abs = 1e-3 )
+			assert state1[ 3: ] == pytest.approx( v1, abs = 1e-9 )
+			v0s.append( v0 )
+
+	assert min( np.linalg.norm( v0s[ i ] - v0s[ j ] )
+		for i in range( 4 ) for j in range( i ) ) > 1.0
+
+	with pytest.raises( ValueError ):
+		lt.lamberts_izzo( r0, r1, tof, { 'M': 5 } )
+
 def test_lambert_uv_earth_to_venus( plot = False ):
 	spice.furnsh( sd.leapseconds_kernel )
 	spice.furnsh( sd.de432 )
@@ -0,0 +1,209 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+ODE Tools Library Unit Tests
+'''
+
+# 3rd party libraries
+import pytest
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+import ode_tools          as ot
+import numerical_tools    as nt
+import orbit_calculations as oc
+import planetary_data     as pd
+
+# Treat all warnings as errors
+pytestmark = pytest.mark.filterwarnings( 'error' )
+
+mu     = pd.earth[ 'mu' ]
+state0 = np.array( [ 7000.0, 100.0, -300.0, 0.5, 7.8, 1.2 ] )
+period = oc.state2period( state0, mu )
+
+def two_body_batch( t, states ):
+	rs    = states[ :, :3 ]
+	norms = np.linalg.norm( rs, axis = 1 )
+	return np.hstack( ( states[ :, 3: ],
+		-mu * rs / norms[ :, None ] ** 3 ) )
+
+@pytest.mark.parametrize( 'method', [ 'dopri5', 'dop853' ] )
+def test_solve_rk_two_body( method ):
+	sol = ot.solve_rk( lambda t, y: oc.two_body_ode( t, y, mu ),
+		( 0, 3 * period ), state0,
+		{ 'method': method, 'rtol': 1e-11, 'atol': 1e-11,
+		  'dense_output': True } )
+
+	assert sol.status == 0
+	assert sol.y.shape == ( 6, len( sol.t ) )
+	assert sol.y[ :, -1 ] == pytest.approx(
+		spice.prop2b( mu, state0, 3 * period ), abs = 1e-4 )
+
+	ts = np.linspace( 0, 3 * period, 50 )
+	for t, state in zip( ts, sol.sol( ts ).T ):
+		assert state == pytest.approx(
+			spice.prop2b( mu, state0, t ), abs = 1e-4 )
+
+def test_solve_rk_backwards():
+	sol = ot.solve_rk( lambda t, y: oc.two_body_ode( t, y, mu ),
+		( 0, -period / 3.0 ), state0,
+		{ 'method': 'dop853', 'rtol': 1e-11, 'atol': 1e-11 } )
+	assert sol.t[ -1 ] == -period / 3.0
+	assert sol.y[ :, -1 ] == pytest.approx(
+		spice.prop2b( mu, state0, -period / 3.0 ), abs = 1e-6 )
+
+def test_solve_rk_batch():
+	'''
+	A batch of states should be propagated in the same steps,
+	each matching the analytic solution
+	'''
+	states0 = np.array( [ state0 * ( 1 + 0.01 * n ) for n in range( 20 ) ] )
+	sol     = ot.solve_rk( two_body_batch, ( 0, period ), states0,
+		{ 'method': 'dop853', 'rtol': 1e-11, 'atol': 1e-11 } )
+
+	assert sol.y.shape == ( 20, 6, len( sol.t ) )
+	for state0_, state in zip( states0, sol.y[ :, :, -1 ] ):
+		assert state == pytest.approx(
+			spice.prop2b( mu, state0_, period ), abs = 1e-5 )
+
+def test_solve_rk_terminal_event():
+	def min_radius( t, y ):
+		return nt.norm( y[ :3 ] ) - 7000.5
+	min_radius.terminal  = True
+	min_radius.direction = -1
+
+	sol = ot.solve_rk( lambda t, y: oc.two_body_ode( t, y, mu ),
+		( 0, 10 * period ), state0,
+		{ 'method': 'dopri5', 'rtol': 1e-10, 'atol': 1e-10,
+		  'events': [ min_radius ] } )
+
+	assert sol.status == 1
+	assert len( sol.t_events[ 0 ] ) == 1
+	assert sol.t[ -1 ] == sol.t_events[ 0 ][ 0 ]
+	assert nt.norm( sol.y[ :3, -1 ] ) == pytest.approx( 7000.5 )
+	assert nt.norm( sol.y_events[ 0 ][ 0, :3 ] ) == pytest.approx( 7000.5 )
+
+def test_solve_rk_batch_events():
+	'''
+	Non-terminal events are located per element of the batch
+	'''
+	radii   = 7000.5 + np.arange( 5 )
+	states0 = np.array( [ state0 ] * 5 )
+
+	def min_radius( t, states ):
+		return np.linalg.norm( states[ :, :3 ], axis = 1 ) - radii
+	min_radius.direction = -1
+
+	sol = ot.solve_rk( two_body_batch, ( 0, period ), states0,
+		{ 'method': 'dop853', 'rtol': 1e-10, 'atol': 1e-10,
+		  'events': [ min_radius ] } )
+
+	assert sol.status == 0
+	assert sorted( sol.i_events[ 0 ] ) == list( range( 5 ) )
+	for idx, state in zip( sol.i_events[ 0 ], sol.y_events[ 0 ] ):
+		assert nt.norm( state[ :3 ] ) == pytest.approx( radii[ idx ] )
+
+def test_solve_rk_unknown_method_expect_throw():
+	with pytest.raises( RuntimeError ):
+		ot.solve_rk( lambda t, y: y, ( 0, 1 ), [ 1.0 ], { 'method': 'rk8' } )
+
+def two_body_accel( t, states ):
+	rs = states[ ..., :3 ]
+	return -mu * rs / np.linalg.norm( rs, axis = -1, keepdims = True ) ** 3
+
+@pytest.mark.parametrize( 'method, order',
+	[ ( 'leapfrog', 2 ), ( 'yoshida4', 4 ),
+	  ( 'yoshida6', 6 ), ( 'yoshida8', 8 ) ] )
+def test_solve_symplectic_convergence_order( method, order ):
+	'''
+	Halving the step size should reduce the error by 2 ** order
+	'''
+	expected = spice.prop2b( mu, state0, 5 * period )
+	errors   = []
+	for steps_per_rev in [ 100, 200 ]:
+		sol = ot.solve_symplectic( two_body_accel, ( 0, 5 * period ), state0,
+			{ 'method': method, 'dt': period / steps_per_rev } )
+		errors.append( nt.norm( sol.y[ :3, -1 ] - expected[ :3 ] ) )
+
+	assert np.log2( errors[ 0 ] / errors[ 1 ] ) == pytest.approx( order, abs = 0.5 )
+
+def test_solve_symplectic_dense_output_and_events():
+	def min_radius( t, y ):
+		return nt.norm( y[ :3 ] ) - 7000.5
+	min_radius.terminal  = True
+	min_radius.direction = -1
+
+	sol = ot.solve_symplectic( two_body_accel, ( 0, 3 * period ), state0,
+		{ 'dt': period / 100, 'events': [ min_radius ],
+		  'dense_output': True } )
+
+	assert sol.status == 1
+	assert nt.norm( sol.y[ :3, -1 ] ) == pytest.approx( 7000.5 )
+	for t in np.linspace( 0, sol.t[ -1 ], 37 ):
+		assert sol.sol( t ) == pytest.approx(
+			spice.prop2b( mu, state0, t ), abs = 1e-3 )
+
+def test_solve_symplectic_energy_conservation():
+	'''
+	Energy error stays bounded over many revolutions
+	'''
+	sol = ot.solve_symplectic( two_body_accel, ( 0, 200 * period ), state0,
+		{ 'dt': period / 60 } )
+	energies = np.sum( sol.y[ 3: ] ** 2, axis = 0 ) / 2.0 -\
+		mu / np.linalg.norm( sol.y[ :3 ], axis = 0 )
+	assert np.abs( energies / energies[ 0 ] - 1 ).max() < 1e-6
+
+@pytest.mark.parametrize( 'pece', [ False, True ] )
+def test_solve_gauss_jackson_convergence_order( pece ):
+	'''
+	Halving the step size should reduce the error by about 2 ** 8,
+	with ( about ) one acceleration evaluation per step in PEC mode
+	'''
+	expected = spice.prop2b( mu, state0, 5 * period )
+	errors   = []
+	for steps_per_rev in [ 100, 200 ]:
+		sol = ot.solve_gauss_jackson( two_body_accel, ( 0, 5 * period ),
+			state0, { 'dt': period / steps_per_rev, 'pece': pece } )
+		errors.append( nt.norm( sol.y[ :3, -1 ] - expected[ :3 ] ) )
+
+	assert np.log2( errors[ 0 ] / errors[ 1 ] ) > 8.0
+	assert errors[ 0 ] < 1e-4
+	if not pece:
+		assert sol.nfev < 1.2 * 5 * 200
+
+def test_solve_gauss_jackson_batch_backwards():
+	states0 = np.array( [ state0, 1.01 * state0 ] )
+	sol     = ot.solve_gauss_jackson( two_body_accel, ( 0, -3 * period ),
+		states0, { 'dt': period / 100 } )
+
+	assert sol.t[ -1 ] == -3 * period
+	for n in range( 2 ):
+		assert sol.y[ n, :, -1 ] == pytest.approx(
+			spice.prop2b( mu, states0[ n ], -3 * period ), abs = 1e-3 )
+
+def test_solve_gauss_jackson_dense_output_and_events():
+	def min_radius( t, y ):
+		return nt.norm( y[ :3 ] ) - 7000.5
+	min_radius.terminal  = True
+	min_radius.direction = -1
+
+	sol = ot.solve_gauss_jackson( two_body_accel, ( 0, 3 * period ), state0,
+		{ 'dt': period / 100, 'events': [ min_radius ],
+		  'dense_output': True } )
+
+	assert sol.status == 1
+	assert nt.norm( sol.y[ :3, -1 ] ) == pytest.approx( 7000.5 )
+	for t in np.linspace( 0, sol.t[ -1 ], 37 ):
+		assert sol.sol( t ) == pytest.approx(
+			spice.prop2b( mu, state0, t ), abs = 1e-3 )
+
+def test_propagate_ode_adaptive_output_times():
+	ets, states = nt.propagate_ode( lambda t, y: oc.two_body_ode( t, y, mu ),
+		state0, period, 10.0, 'dop853', { 'rtol': 1e-11, 'atol': 1e-11 } )
+	assert np.all( ets == np.arange( 0, period, 10.0 ) )
+	assert states.shape == ( len( ets ), 6 )
+	assert states[ -1 ] == pytest.approx(
+		spice.prop2b( mu, state0, ets[ -1 ] ), abs = 1e-5 )
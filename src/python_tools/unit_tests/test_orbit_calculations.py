@@ -16,6 +16,7 @@ import orbit_calculations as oc
 import numerical_tools    as nt
 import spice_data         as sd
 import planetary_data     as pd
+import lamberts_tools     as lt
 
 # Treat all warnings as errors
 pytestmark = pytest.mark.filterwarnings( 'error' )
@@ -70,6 +71,179 @@ def test_penumbra_edge_cases():
 	assert oc.check_eclipse( et, r_sc0, pd.earth ) == -1
 	assert oc.check_eclipse( et, r_sc1, pd.earth ) ==  1
 
+def test_calc_eclipse_array_matches_check_eclipse():
+	'''
+	Batched eclipse codes should be identical to check_eclipse
+	at every step of an orbit passing through penumbra and umbra
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	state0 = oc.coes2states_ta( [ 7480.0, 0.09, 5.5, 6.26, 5.95, 0.2 ] )
+	et0    = spice.str2et( '1980-03-03 22:10:35 TDB' )
+	dts    = np.linspace( 0, 86400.0, 5000 )
+	rs     = oc.propagate_kepler( state0, dts )[ :, :3 ]
+	ets    = et0 + dts
+
+	eclipses = oc.calc_eclipse_array( ets, rs, pd.earth )
+	expected = [ oc.check_eclipse( et, r, pd.earth ) for et, r in zip( ets, rs ) ]
+
+	assert np.array_equal( eclipses, expected )
+	assert set( eclipses ) == { -1, 1, 2 }
+
+def test_calc_solar_eclipse_array_matches_check_solar_eclipse_latlons():
+	'''
+	Closed form shadow axis intersections should match the
+	Newton solutions of check_solar_eclipse_latlons for the
+	1979-02-26 total solar eclipse
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+	spice.furnsh( sd.pck00010 )
+
+	et0 = spice.str2et( '1979-02-26 14:00' )
+	ets = np.arange( et0, et0 + 5 * 3600.0, 60.0 )
+
+	latlons  = oc.calc_solar_eclipse_array( ets, pd.moon, pd.earth )
+	expected = []
+	for et in ets:
+		eclipse = oc.check_solar_eclipse_latlons( et, pd.moon, pd.earth )
+		if eclipse[ 0 ] == 2:
+			expected.append( eclipse[ 1 ] )
+
+	assert latlons.shape == ( len( expected ), 3 )
+	assert latlons == pytest.approx( np.array( expected ), abs = 1e-6 )
+	assert latlons[ :, 0 ] == pytest.approx( pd.earth[ 'radius' ] )
+
+	'''
+	Path of totality started in the Pacific northwest
+	and ended near Greenland
+	'''
+	assert -140.0 < latlons[  0, 1 ] < -120.0
+	assert   40.0 < latlons[  0, 2 ] <   50.0
+	assert   60.0 < latlons[ -1, 2 ] <   80.0
+
+def test_find_solar_eclipses_2017_2025():
+	'''
+	Coarse screening and refinement across a process pool
+	should find the total solar eclipses between 2017 and 2025
+	and match the serial search
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+	spice.furnsh( sd.pck00010 )
+
+	et0 = spice.str2et( '2017-01-01' )
+	etf = spice.str2et( '2025-01-01' )
+
+	ecls   = oc.find_solar_eclipses( et0, etf, pd.moon, pd.earth,
+		args = { 'n_workers': 2 } )
+	serial = oc.find_solar_eclipses( et0, etf, pd.moon, pd.earth,
+		args = { 'n_workers': 1 } )
+
+	dates = [ spice.et2utc( ets[ 0 ], 'ISOC', 0 )[ :10 ]
+		for ets in ecls[ 'ets' ] ]
+	for date in [ '2017-08-21', '2019-07-02', '2020-12-14',
+		'2021-12-04', '2023-04-20', '2024-04-08' ]:
+		assert date in dates
+
+	assert len( ecls[ 'ets' ] ) == len( serial[ 'ets' ] )
+	for n in range( len( ecls[ 'ets' ] ) ):
+		assert np.all( ecls[ 'track_ets' ][ n ] == serial[ 'track_ets' ][ n ] )
+		assert ecls[ 'durations' ][ n ] < 5 * 3600.0
+		assert ecls[ 'latlons'   ][ n ].shape ==\
+			( ecls[ 'track_ets' ][ n ].shape[ 0 ], 3 )
+
+def test_calc_shadow_functions_match_check_eclipse():
+	'''
+	Shadow functions should be negative exactly where
+	check_eclipse returns umbra or penumbra
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et         = spice.str2et( '1980-06-01' )
+	r_sun2body = spice.spkpos( '399', et, 'J2000', 'LT', 'SUN' )[ 0 ]
+	s_hat      = nt.normed( r_sun2body )
+	v_perp     = nt.normed( np.cross( s_hat, [ 1, 0, 0 ] ) )
+
+	for proj in [ -8000.0, -100.0, 100.0, 7000.0, 40000.0 ]:
+		for rej in np.linspace( 0.0, 9000.0, 91 ):
+			r = proj * s_hat + rej * v_perp
+			if nt.norm( r ) < pd.earth[ 'radius' ]:
+				continue
+
+			umbra, penumbra = oc.calc_shadow_functions(
+				r, r_sun2body, pd.earth[ 'diameter' ] )
+			eclipse = oc.check_eclipse( et, r, pd.earth )
+
+			assert ( umbra <= 0 ) == ( eclipse == 2 )
+			assert ( penumbra <= 0 ) == ( eclipse > 0 )
+
+def test_find_eclipses_events():
+	ecls = oc.find_eclipses_events( 0.0, 100.0,
+		[ 20.0, 70.0 ], [ 5.0, 25.0, 65.0, 90.0 ], False, False, 'penumbra' )
+
+	assert ecls[ 'ets' ] == [ [ 5.0, 20.0 ], [ 70.0, 90.0 ] ]
+	assert ecls[ 'durations' ] == [ 15.0, 20.0 ]
+	assert ecls[ 'ratio' ] == pytest.approx( 0.35 )
+
+	ecls = oc.find_eclipses_events( 0.0, 100.0,
+		[ 20.0, 70.0 ], [ 25.0, 65.0 ], False, True, 'either' )
+	assert ecls[ 'ets' ] == [ [ 0.0, 25.0 ], [ 65.0, 100.0 ] ]
+
+def test_calc_illumination_array():
+	'''
+	Illumination should be 0 in umbra, 1 in sunlight and in between in
+	penumbra, and go from 1 to 0 across the penumbra on eclipse entrance
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	state0 = oc.coes2states_ta( [ 7480.0, 0.09, 5.5, 6.26, 5.95, 0.2 ] )
+	et0    = spice.str2et( '1980-03-03 22:10:35 TDB' )
+	dts    = np.linspace( 0, 20000.0, 20001 )
+	rs     = oc.propagate_kepler( state0, dts )[ :, :3 ]
+	ets    = et0 + dts
+
+	illumination = oc.calc_illumination_array( ets, rs, pd.earth )
+	eclipses     = oc.calc_eclipse_array( ets, rs, pd.earth )
+
+	assert np.all( illumination[ eclipses == -1 ] == 1.0 )
+	assert np.all( illumination[ eclipses ==  2 ] == 0.0 )
+	assert np.all( ( illumination[ eclipses == 1 ] > 0.0 ) &
+				   ( illumination[ eclipses == 1 ] < 1.0 ) )
+
+	entrance = oc.find_eclipses( ets, eclipses, 'penumbra' )[ 'idxs' ][ 0 ]
+	assert np.all( np.diff(
+		illumination[ entrance[ 0 ]: entrance[ 1 ] + 2 ] ) <= 0 )
+
+def test_find_eclipse_seasons_GEO():
+	'''
+	An equatorial orbit's beta angle is the Sun's declination,
+	and GEO eclipse seasons are centered on the equinoxes with
+	a maximum shadow duration of about 70 minutes
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0   = spice.str2et( '2021-01-01' )
+	ets   = np.arange( et0, et0 + 365 * 86400.0, 3600.0 )
+	betas = oc.calc_beta_angles( ets, [ 42164.0, 0, 0, 0, 0, 0 ] )
+
+	rs_sun = np.array( spice.spkpos( 'SUN', ets, 'J2000', 'LT', 'EARTH' )[ 0 ] )
+	decs   = np.arcsin( rs_sun[ :, 2 ] / np.linalg.norm( rs_sun, axis = 1 ) )
+	assert betas == pytest.approx( decs * nt.r2d, abs = 1e-9 )
+
+	ecls = oc.find_eclipse_seasons( ets, betas, 42164.0 )
+	assert len( ecls[ 'ets' ] ) == 2
+	for etm, season in zip( [ '2021-03-20', '2021-09-22' ], ecls[ 'ets' ] ):
+		assert season[ 0 ] < spice.str2et( etm ) < season[ 1 ]
+
+	assert ecls[ 'durations'  ] == pytest.approx( [ 44 * 86400.0 ] * 2, rel = 0.1 )
+	assert ecls[ 'max_shadow' ] == pytest.approx( [ 4200.0 ] * 2, rel = 0.02 )
+	assert np.all( ecls[ 'shadow_durations' ][ np.abs( betas ) > ecls[ 'beta_crit' ] ] == 0 )
+
 def test_find_eclipses_basic_usage():
 	spice.furnsh( sd.leapseconds_kernel )
 
@@ -85,3 +259,201 @@ def test_find_eclipses_basic_usage():
 	assert eclipses[ 'idxs' ][ 1 ] == ( 11, 14 )
 	assert eclipses[ 'idxs' ][ 2 ] == ( 17, 21 )
 	assert eclipses[ 'idxs' ][ 3 ] == ( 24, 26 )
+
+def test_propagate_kepler_matches_prop2b():
+	'''
+	Elliptical and hyperbolic states, forward and backward in time
+	'''
+	mu  = pd.earth[ 'mu' ]
+	dts = np.linspace( -86400.0, 86400.0, 51 )
+	for state0 in [
+		np.array( [ 7000.0, 100.0, -300.0, 0.5, 7.8, 1.2 ] ),
+		np.array( [ 7000.0, 0.0, 0.0, 0.0, 12.0, 3.0 ] ) ]:
+		states = oc.propagate_kepler( state0, dts, mu )
+		for dt, state in zip( dts, states ):
+			expected = spice.prop2b( mu, state0, dt )
+			assert state == pytest.approx( expected, rel = 1e-10, abs = 1e-9 )
+
+def test_propagate_kepler_periodic():
+	state0 = oc.coes2state(
+		[ pd.earth[ 'radius' ] + 20000.0, 0.6, 30, 40, 50, 60 ] )
+	period = oc.state2period( state0 )
+	states = oc.propagate_kepler( state0, [ 0.0, period, 10 * period ] )
+	assert states[ 0 ] == pytest.approx( state0, rel = 1e-14 )
+	assert states[ 1 ] == pytest.approx( state0, rel = 1e-10 )
+	assert states[ 2 ] == pytest.approx( state0, rel = 1e-10 )
+
+def test_sample_conic_endpoints():
+	mu     = pd.sun[ 'mu' ]
+	state0 = np.array( [ 1.5e8, 1e6, -2e5, -1.0, 29.0, 0.5 ] )
+	tof    = 200 * 24 * 3600.0
+	rs     = oc.sample_conic( state0, tof, 1000, mu )
+	assert rs.shape == ( 1000, 3 )
+	assert rs[  0 ] == pytest.approx( state0[ :3 ], rel = 1e-14 )
+	assert rs[ -1 ] == pytest.approx(
+		spice.prop2b( mu, state0, tof )[ :3 ], rel = 1e-10 )
+
+def test_kepler_step_matches_prop2b():
+	mu  = pd.earth[ 'mu' ]
+	for state0 in [
+		np.array( [ 42164.0, 0.0, 0.0, 0.0, 3.07, 0.01 ] ),
+		np.array( [ 7000.0, 100.0, -300.0, 0.5, 7.8, 1.2 ] ),
+		np.array( [ 7000.0, 0.0, 0.0, 0.0, 12.0, 3.0 ] ) ]:
+		chi = None
+		for dt in np.linspace( -50000.0, 50000.0, 41 ):
+			state, chi = oc.kepler_step( state0, dt, mu, chi )
+			assert state == pytest.approx(
+				spice.prop2b( mu, state0, dt ), rel = 1e-12, abs = 1e-9 )
+
+def test_calc_stm_rv_matches_finite_differences():
+	mu = pd.sun[ 'mu' ]
+	for vy, dt in [ ( 30.0, 1.2e7 ), ( 45.0, 2e7 ), ( 29.7, 3e6 ) ]:
+		state0    = np.array( [ 1.5e8, 1e7, 3e6, -2.0, vy, 1.0 ] )
+		stm_rv, _ = oc.calc_stm_rv( state0, dt, mu )
+
+		expected = np.zeros( ( 3, 3 ) )
+		for n in range( 3 ):
+			dv          = np.zeros( 6 )
+			dv[ 3 + n ] = 1e-5
+			expected[ :, n ] = (
+				oc.kepler_step( state0 + dv, dt, mu )[ 0 ][ :3 ] -
+				oc.kepler_step( state0 - dv, dt, mu )[ 0 ][ :3 ] ) / 2e-5
+
+		assert stm_rv == pytest.approx( expected,
+			abs = 1e-8 * np.max( np.abs( expected ) ) )
+
+def test_vinfinity_match_analytic_matches_fd():
+	'''
+	Venus to Mars departure v-infinity matched to an incoming
+	v-infinity of the same magnitude as a 200 day transfer's
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0    = spice.str2et( '1978-06-01' )
+	tof    = 200 * 86400.0
+	state0 = spice.spkgeo( 2, et0,       'ECLIPJ2000', 0 )[ 0 ]
+	state1 = spice.spkgeo( 4, et0 + tof, 'ECLIPJ2000', 0 )[ 0 ]
+	v0, v1 = lt.lamberts_universal_variables(
+		state0[ :3 ], state1[ :3 ], tof, { 'mu': pd.sun[ 'mu' ] } )
+	v_in   = 2 * state0[ 3: ] - v0
+
+	args = {
+		'et0'           : et0,
+		'planet1_ID'    : 4,
+		'frame'         : 'ECLIPJ2000',
+		'center_ID'     : 0,
+		'mu'            : pd.sun[ 'mu' ],
+		'tm'            : 1,
+		'state0_planet0': state0,
+		'vinf'          : nt.norm( v0 - state0[ 3: ] ),
+		'cache'         : {}
+	}
+	for _tof in [ 150 * 86400.0, 250 * 86400.0 ]:
+		value, derivative, _, _ = oc.calc_vinfinity_tof( _tof, args )
+		assert value == oc.calc_vinfinity( _tof, args )
+		assert derivative == pytest.approx( ( oc.calc_vinfinity( _tof + 10.0, args ) -
+			oc.calc_vinfinity( _tof - 10.0, args ) ) / 20.0, rel = 1e-6 )
+
+	for analytic in [ True, False ]:
+		_tof, v0_sc, v1_sc = oc.vinfinity_match(
+			2, 4, v_in, et0, 170 * 86400.0, { 'analytic': analytic } )
+		assert _tof  == pytest.approx( tof )
+		assert v0_sc == pytest.approx( v0, abs = 1e-9 )
+		assert v1_sc == pytest.approx( v1, abs = 1e-9 )
+
+def test_states2coes_matches_oscltx():
+	'''
+	Every orbit type at a range of anomalies should match state2coes
+	(spice.oscltx). Near circular orbits have noise dominated periapsis
+	directions, so only their argument of latitude ( aop + ta ) is compared
+	'''
+	mu     = pd.earth[ 'mu' ]
+	orbits = [
+		[  8000.0, 0.0,  30.0 ],
+		[  8000.0, 0.1,  30.0 ],
+		[  8000.0, 0.7,  63.4 ],
+		[  8000.0, 0.1,   0.0 ],
+		[  8000.0, 0.1, 180.0 ],
+		[  8000.0, 0.0,   0.0 ],
+		[  8000.0, 0.2,  90.0 ],
+		[  8000.0, 0.3, 150.0 ],
+		[ -20000.0, 1.5, 40.0 ],
+		[ -20000.0, 3.0,  0.0 ]
+	]
+	coes = []
+	for a, e, i in orbits:
+		max_ta = 360.0 if e < 1 else 0.9 * np.degrees( np.arccos( -1 / e ) )
+		for ta in np.linspace( -max_ta, max_ta, 7 ):
+			coes.append( [ a, e, i, ta, 40.0, 200.0 ] )
+
+	states = oc.coes2states_ta( coes, mu )
+	coes   = oc.states2coes( states, mu )
+	coes_s = np.array( [ oc.state2coes( state, { 'mu': mu } )
+		for state in states ] )
+
+	def wrap( angles ):
+		return ( angles + 180.0 ) % 360.0 - 180.0
+
+	circular = coes_s[ :, 1 ] < 1e-8
+	assert coes[ :, 0 ] == pytest.approx( coes_s[ :, 0 ], rel = 1e-12 )
+	assert coes[ :, 1 ] == pytest.approx( coes_s[ :, 1 ], abs = 1e-12 )
+	assert coes[ :, 2 ] == pytest.approx( coes_s[ :, 2 ], abs = 1e-10 )
+	assert wrap( coes[ :, 5 ] - coes_s[ :, 5 ] ) == pytest.approx( 0, abs = 1e-10 )
+	assert wrap( coes[ ~circular, 3: ] - coes_s[ ~circular, 3: ] ) ==\
+		pytest.approx( 0, abs = 1e-9 )
+	assert wrap( coes[ circular, 3 ] + coes[ circular, 4 ] -
+		coes_s[ circular, 3 ] - coes_s[ circular, 4 ] ) ==\
+		pytest.approx( 0, abs = 1e-9 )
+
+def test_states2coes_exactly_circular():
+	'''
+	A zero eccentricity vector should give aop = 0 with ta measured
+	from the ascending node, or from the x-axis if also equatorial
+	'''
+	states = np.array( [
+		[ 0.0, 4.0, 0.0,  0.0, 0.0, 1.0 ],
+		[ 0.0, 4.0, 0.0, -1.0, 0.0, 0.0 ]
+	] )
+	coes   = oc.states2coes( states, mu = 4.0 )
+	coes_s = np.array( [ oc.state2coes( state, { 'mu': 4.0 } )
+		for state in states ] )
+
+	assert coes == pytest.approx( coes_s, abs = 1e-12 )
+	assert coes[ :, 4 ] == pytest.approx( [ 0.0, 0.0 ] )
+
+def test_coes2states_roundtrip():
+	coes = np.array( [
+		[  7000.0, 0.001,  51.6,  10.0,  20.0,  30.0 ],
+		[ 26600.0, 0.7,    63.4, 180.0, 270.0,  45.0 ],
+		[ 42164.0, 0.0002,  0.05, 90.0, 200.0, 300.0 ],
+		[ -9000.0, 1.8,   120.0, -60.0,  10.0,  80.0 ]
+	] )
+	states = oc.coes2states_ta( coes )
+
+	assert oc.coes2states_ta( coes[ 1 ] ) == pytest.approx( states[ 1 ] )
+	coes[ :, 3: ] %= 360.0
+	assert oc.states2coes( states ) == pytest.approx( coes, rel = 1e-9 )
+
+def test_coes2states_ta_vs_coes2state_anomaly():
+	'''
+	coes2states_ta takes the true anomaly where coes2state takes the
+	mean anomaly, so they only agree for circular orbits or
+	at periapsis / apoapsis, or after converting the anomaly
+	'''
+	e, M = 0.3, 60.0
+	coes = [ 26600.0, e, 63.4, M, 270.0, 45.0 ]
+	assert oc.coes2states_ta( coes ) != pytest.approx(
+		oc.coes2state( coes ), abs = 1.0 )
+
+	E = M * nt.d2r
+	for n in range( 50 ):
+		E -= ( E - e * np.sin( E ) - M * nt.d2r ) / ( 1 - e * np.cos( E ) )
+	ta = 2 * np.arctan( np.sqrt( ( 1 + e ) / ( 1 - e ) ) * np.tan( E / 2 ) )
+	assert oc.coes2states_ta( coes[ :3 ] + [ ta * nt.r2d ] + coes[ 4: ] ) ==\
+		pytest.approx( oc.coes2state( coes ), rel = 1e-9 )
+
+	for anomaly in [ 0.0, 180.0 ]:
+		coes[ 3 ] = anomaly
+		assert oc.coes2states_ta( coes ) == pytest.approx(
+			oc.coes2state( coes ), rel = 1e-9 )
@@ -0,0 +1,93 @@
+'''
+AWP | Astrodynamics with Python by Alfonso Gonzalez
+https://github.com/alfonsogonzalez/AWP
+https://www.youtube.com/c/AlfonsoGonzalezSpaceEngineering
+
+Porkchop Tools Unit Tests
+'''
+
+# 3rd party libraries
+import pytest
+import numpy    as np
+import spiceypy as spice
+
+# AWP library
+import porkchop_tools as pct
+import lamberts_tools as lt
+import planetary_data as pd
+import spice_data     as sd
+
+# Treat all warnings as errors
+pytestmark = pytest.mark.filterwarnings( 'error' )
+
+def test_calc_porkchop_matches_lambert():
+	'''
+	Grid cells should match single Lambert solves, and the
+	1979-1980 Earth to Mars window should have a minimum
+	departure C3 of about 8 km^2 / s^2
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0 = spice.str2et( '1979-10-01' )
+	et1 = spice.str2et( '1980-06-01' )
+	ets_depart = np.linspace( et0, et0 + 200 * 86400.0, 41 )
+	ets_arrive = np.linspace( et1, et1 + 300 * 86400.0, 31 )
+
+	porkchop = pct.calc_porkchop( 3, 4, ets_depart, ets_arrive, {
+		'park0': [ pd.earth[ 'mu' ], pd.earth[ 'radius' ] + 200.0 ]
+		} )
+
+	assert porkchop[ 'C3' ].shape == ( 31, 41 )
+	assert 7.5 < np.nanmin( porkchop[ 'C3' ] ) < 9.0
+
+	for i1, i0 in [ ( 0, 0 ), ( 10, 20 ), ( 30, 40 ), ( 25, 5 ) ]:
+		state0 = spice.spkgeo( 3, ets_depart[ i0 ], 'ECLIPJ2000', 0 )[ 0 ]
+		state1 = spice.spkgeo( 4, ets_arrive[ i1 ], 'ECLIPJ2000', 0 )[ 0 ]
+		tm     = 1 if np.cross( state0[ :3 ], state1[ :3 ] )[ 2 ] >= 0 else -1
+		v0, v1 = lt.lamberts_universal_variables( state0[ :3 ], state1[ :3 ],
+			ets_arrive[ i1 ] - ets_depart[ i0 ], { 'tm': tm } )
+
+		vinf0 = np.linalg.norm( v0 - state0[ 3: ] )
+		vinf1 = np.linalg.norm( v1 - state1[ 3: ] )
+		assert porkchop[ 'solved' ][ i1, i0 ]
+		assert porkchop[ 'C3'          ][ i1, i0 ] == pytest.approx( vinf0 ** 2 )
+		assert porkchop[ 'vinf_arrive' ][ i1, i0 ] == pytest.approx( vinf1 )
+		assert porkchop[ 'dv_total'    ][ i1, i0 ] == pytest.approx( vinf1 +
+			pct.calc_park_dv( vinf0, [ pd.earth[ 'mu' ], pd.earth[ 'radius' ] + 200.0 ] ) )
+
+def test_calc_porkchop_arrival_before_departure():
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0      = spice.str2et( '1980-01-01' )
+	ets      = np.linspace( et0, et0 + 100 * 86400.0, 11 )
+	porkchop = pct.calc_porkchop( 3, 4, ets, ets )
+
+	upper = np.triu_indices( 11 )
+	assert np.all( np.isnan( porkchop[ 'C3'   ][ upper ] ) )
+	assert np.all( np.isnan( porkchop[ 'tofs' ][ upper ] ) )
+	assert not np.any( porkchop[ 'solved' ][ upper ] )
+
+def test_calc_porkchop_sweep_matches_batch():
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	et0 = spice.str2et( '1979-10-01' )
+	et1 = spice.str2et( '1980-06-01' )
+	ets_depart = np.linspace( et0, et0 + 200 * 86400.0, 21 )
+	ets_arrive = np.linspace( et1, et1 + 300 * 86400.0, 16 )
+
+	batch = pct.calc_porkchop( 3, 4, ets_depart, ets_arrive )
+	sweep = pct.calc_porkchop( 3, 4, ets_depart, ets_arrive,
+		{ 'solver': 'sweep' } )
+
+	'''
+	The sweep also accepts solutions limited by floating point
+	resolution in psi, which the batched bisection can miss
+	'''
+	both = batch[ 'solved' ] & sweep[ 'solved' ]
+	assert np.all( sweep[ 'solved' ][ batch[ 'solved' ] ] )
+	assert np.mean( both ) > 0.95
+	assert sweep[ 'C3' ][ both ] == pytest.approx( batch[ 'C3' ][ both ], rel = 1e-9 )
+	assert sweep[ 'steps' ].shape == ( 16, 21 )
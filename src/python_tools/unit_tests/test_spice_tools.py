@@ -70,3 +70,79 @@ def test_read_write_bsp( plot = False ):
 	assert np.all( latlons[ :, 2 ] >= -30.0 )
 
 	os.remove( filename )
+
+def test_fit_ephemeris_table_tolerance():
+	'''
+	Fit a Chebyshev ephemeris table to the Moon w.r.t Earth
+	and ensure that evaluating it at random times (both one at a time
+	and as an array) is within the requested tolerance of SPICE
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	tol   = 1e-3 # km
+	et0   = spice.str2et( '1980-01-01' )
+	etf   = et0 + 60 * 24 * 3600.0
+	table = st.fit_ephemeris_table( 301, et0, etf, 'J2000', 399,
+		{ 'tol': tol } )
+	assert table[ 'max_error' ] <= tol
+
+	ets    = np.linspace( et0, etf, 1001 )
+	rs     = st.calc_ephemeris( 301, ets, 'J2000', 399 )[ :, :3 ]
+	errors = np.linalg.norm(
+		st.eval_ephemeris_table( table, ets ) - rs, axis = 1 )
+	assert np.all( errors <= tol )
+
+	for n in range( 0, len( ets ), 100 ):
+		assert nt.norm( st.eval_ephemeris_table( table, ets[ n ] ) -\
+			rs[ n ] ) <= tol
+
+	with pytest.raises( RuntimeError ):
+		st.eval_ephemeris_table( table, etf + 1.0 )
+	with pytest.raises( RuntimeError ):
+		st.eval_ephemeris_table( table, ets - 1.0 )
+
+def test_fit_ephemeris_table_span_boundaries():
+	'''
+	Fitting must not evaluate the table past its own span, where
+	segment boundaries round past etf, and the end points of the
+	span can always be evaluated
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	rng = np.random.default_rng( 0 )
+	et  = spice.str2et( '1978-01-01' )
+	for n in range( 200 ):
+		et0   = et  + rng.uniform( 0.0, 300.0 ) * 24 * 3600.0
+		etf   = et0 + rng.uniform( 1.0,  60.0 ) * 24 * 3600.0
+		table = st.fit_ephemeris_table( 5, et0, etf, 'ECLIPJ2000', 10 )
+		rs    = st.calc_ephemeris( 5, [ et0, etf ], 'ECLIPJ2000', 10 )[ :, :3 ]
+		assert st.eval_ephemeris_table( table, np.array( [ et0, etf ] ) ) ==\
+			pytest.approx( rs, abs = 1e-3 )
+
+def test_fit_ephemeris_table_refinement():
+	'''
+	Only segments over tolerance are split, so segment lengths vary,
+	and the table still spans exactly [ et0, etf ] within tolerance
+	when evaluated with ephemeris_table_func
+	'''
+	spice.furnsh( sd.leapseconds_kernel )
+	spice.furnsh( sd.de432 )
+
+	tol    = 1e-3 # km
+	et0    = spice.str2et( '1978-01-01' )
+	etf    = et0 + 2 * 365.25 * 24 * 3600.0
+	table  = st.fit_ephemeris_table( 301, et0, etf, 'ECLIPJ2000', 10,
+		{ 'tol': tol, 'n_segments': 3 } )
+	bounds = table[ 'bounds' ]
+	assert bounds[ 0 ] == et0 and bounds[ -1 ] == etf
+	assert np.all( np.diff( bounds ) > 0.0 )
+	assert np.ptp( np.diff( bounds ) ) > 0.0
+
+	eval_func = st.ephemeris_table_func( table )
+	ets       = np.random.default_rng( 0 ).uniform( et0, etf, 500 )
+	rs        = st.calc_ephemeris( 301, ets, 'ECLIPJ2000', 10 )[ :, :3 ]
+	for et, r in zip( ets, rs ):
+		assert nt.norm( eval_func( et ) - r ) <= tol
+